@@ -9,10 +9,15 @@ from fastapi.middleware.cors import CORSMiddleware
 # from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 
-from src.database.database import create_tables
+from src.database.database import SessionLocal, create_tables
 from src.api.routes import router as api_router
 from src.web.routes import router as web_router
-from src.web.templates import create_templates
+from src.web.templates import precompile_templates
+from src.services.risk_service import RiskService
+from src.services.student_service import StudentService
+from src.services.rescore_worker import RescoreWorker, rescore_worker_enabled
+from src.services.compaction_worker import CompactionWorker, compaction_interval
+from src.services.dashboard_events import dashboard_events
 
 
 @asynccontextmanager
@@ -25,14 +30,45 @@ async def lifespan(app: FastAPI):
     create_tables()
     print("✅ Database tables đã được tạo")
     
-    # Tạo web templates
-    create_templates()
-    print("✅ Web templates đã được tạo")
+    # Điền dòng tổng hợp tín hiệu và con trỏ đánh giá mới nhất cho dữ liệu tạo trước khi có chúng
+    db = SessionLocal()
+    try:
+        signals_backfilled = StudentService(db).backfill_signals()
+        backfilled = RiskService(db).backfill_latest_pointers()
+    finally:
+        db.close()
+    if signals_backfilled:
+        print(f"✅ Đã tạo số liệu tín hiệu cho {signals_backfilled} sinh viên")
+    if backfilled:
+        print(f"✅ Đã cập nhật đánh giá mới nhất cho {backfilled} sinh viên")
+    
+    # Biên dịch trước web templates (trong bộ nhớ, không ghi file)
+    compiled = precompile_templates()
+    print(f"✅ Đã biên dịch {compiled} web templates")
+    
+    # Worker nền đánh giá lại rủi ro cho sinh viên có dữ liệu mới
+    rescore_worker = None
+    if rescore_worker_enabled():
+        rescore_worker = RescoreWorker()
+        rescore_worker.start()
+        print("✅ Worker đánh giá lại rủi ro đã khởi động")
+    
+    # Compaction định kỳ bảng risk_evaluations (RISK_COMPACTION_INTERVAL > 0)
+    compaction_worker = None
+    if compaction_interval() > 0:
+        compaction_worker = CompactionWorker()
+        compaction_worker.start()
+        print("✅ Worker compaction đã khởi động")
     
     yield
     
     # Shutdown
     print("🛑 Đang tắt hệ thống...")
+    if rescore_worker:
+        await rescore_worker.stop()
+    if compaction_worker:
+        await compaction_worker.stop()
+    await dashboard_events.stop()
 
 
 # Tạo FastAPI app
@@ -50,6 +86,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
 # Mount static files (optional)
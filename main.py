@@ -5,6 +5,7 @@ Hệ thống đánh giá rủi ro bỏ học của sinh viên
 """
 
 import typer
+from datetime import date, datetime
 from rich.console import Console
 from rich.table import Table
 from pathlib import Path
@@ -12,6 +13,9 @@ from pathlib import Path
 from src.utils.data_loader import DataLoader
 from src.risk_assessment.calculator import RiskCalculator
 from src.risk_assessment.config import RiskConfig
+from src.risk_assessment.parallel import calculate_risks_parallel, iter_chunks
+from src.risk_assessment.batch import SignalBatch
+from src.risk_assessment.sweep import ThresholdSweep, build_grid
 
 app = typer.Typer()
 console = Console()
@@ -19,11 +23,18 @@ console = Console()
 
 @app.command()
 def main(
-    input_file: str = typer.Option("data/sample_students.json", "--input", "-i", help="Đường dẫn file JSON đầu vào"),
+    input_file: str = typer.Option("data/sample_students.json", "--input", "-i", help="Đường dẫn file JSON/NDJSON đầu vào"),
     output_file: str = typer.Option("results.csv", "--output", "-o", help="Đường dẫn file CSV đầu ra"),
     attendance_threshold: float = typer.Option(0.75, "--attendance", help="Ngưỡng tỷ lệ đi học (0-1)"),
     assignment_threshold: float = typer.Option(0.50, "--assignment", help="Ngưỡng tỷ lệ nộp bài tập (0-1)"),
-    contact_threshold: int = typer.Option(2, "--contact", help="Ngưỡng số lần liên lạc thất bại")
+    contact_threshold: int = typer.Option(2, "--contact", help="Ngưỡng số lần liên lạc thất bại"),
+    workers: int = typer.Option(1, "--workers", "-w", min=1, help="Số process tính toán song song"),
+    chunk_size: int = typer.Option(5000, "--chunk-size", min=1, help="Số sinh viên mỗi chunk khi chạy song song"),
+    stream: bool = typer.Option(False, "--stream", help="Đọc JSON/NDJSON và ghi CSV theo luồng (bộ nhớ cố định, không hiển thị bảng)"),
+    attendance_window: int = typer.Option(None, "--attendance-window", min=1, help="Chỉ xét điểm danh trong N ngày gần nhất"),
+    assignment_window: int = typer.Option(None, "--assignment-window", min=1, help="Chỉ xét bài tập trong N ngày gần nhất"),
+    contact_window: int = typer.Option(None, "--contact-window", min=1, help="Chỉ xét liên lạc trong N ngày gần nhất"),
+    as_of: datetime = typer.Option(None, "--as-of", formats=["%Y-%m-%d"], help="Ngày kết thúc cửa sổ thời gian (mặc định: hôm nay)")
 ):
     """
     Hệ thống đánh giá rủi ro bỏ học của sinh viên
@@ -39,8 +50,12 @@ def main(
         config = RiskConfig(
             attendance_threshold=attendance_threshold,
             assignment_threshold=assignment_threshold,
-            contact_failed_threshold=contact_threshold
+            contact_failed_threshold=contact_threshold,
+            attendance_window_days=attendance_window,
+            assignment_window_days=assignment_window,
+            contact_window_days=contact_window
         )
+        as_of_date = as_of.date() if as_of else None
         
         console.print(f"[bold blue]Hệ thống đánh giá rủi ro bỏ học[/bold blue]")
         console.print(f"📁 File đầu vào: {input_file}")
@@ -48,17 +63,34 @@ def main(
         console.print(f"   - Ngưỡng đi học: {attendance_threshold*100}%")
         console.print(f"   - Ngưỡng bài tập: {assignment_threshold*100}%")
         console.print(f"   - Ngưỡng liên lạc: {contact_threshold} lần thất bại")
+        if config.has_windows():
+            console.print(f"   - Cửa sổ (ngày): đi học={attendance_window or 'tất cả'}, "
+                          f"bài tập={assignment_window or 'tất cả'}, liên lạc={contact_window or 'tất cả'}")
+            console.print(f"   - Tính đến ngày: {as_of_date or 'hôm nay'}")
         console.print()
         
-        # Load dữ liệu
-        console.print("[yellow]Đang load dữ liệu...[/yellow]")
-        students = DataLoader.load_students_from_json(input_file)
-        console.print(f"✅ Đã load {len(students)} sinh viên")
+        if stream:
+            run_streaming(input_file, output_file, config, workers, chunk_size, as_of_date)
+            return
         
-        # Tính toán rủi ro
-        console.print("[yellow]Đang tính toán rủi ro...[/yellow]")
-        calculator = RiskCalculator(config)
-        results = calculator.calculate_risks(students)
+        if workers > 1:
+            # Load dữ liệu thô (JSON hoặc NDJSON), validate và tính toán trong các process con
+            console.print("[yellow]Đang load dữ liệu...[/yellow]")
+            records = list(DataLoader.iter_records(input_file))
+            console.print(f"✅ Đã load {len(records)} sinh viên")
+            
+            console.print(f"[yellow]Đang tính toán rủi ro ({workers} process, {chunk_size} sinh viên/chunk)...[/yellow]")
+            results = list(calculate_risks_parallel(records, config, workers, chunk_size, as_of_date))
+        else:
+            # Load dữ liệu (JSON hoặc NDJSON)
+            console.print("[yellow]Đang load dữ liệu...[/yellow]")
+            students = list(DataLoader.iter_students(input_file))
+            console.print(f"✅ Đã load {len(students)} sinh viên")
+            
+            # Tính toán rủi ro
+            console.print("[yellow]Đang tính toán rủi ro...[/yellow]")
+            calculator = RiskCalculator(config)
+            results = calculator.calculate_risks(students, as_of=as_of_date)
         
         # Hiển thị kết quả
         display_results(results)
@@ -77,6 +109,27 @@ def main(
         raise typer.Exit(1)
 
 
+def run_streaming(input_file: str, output_file: str, config: RiskConfig, workers: int, chunk_size: int, as_of: date = None):
+    """Đọc, tính toán và ghi kết quả theo luồng, không giữ toàn bộ dữ liệu trong bộ nhớ"""
+    console.print("[yellow]Đang tính toán rủi ro theo luồng...[/yellow]")
+    
+    if workers > 1:
+        records = DataLoader.iter_records(input_file)
+        results = calculate_risks_parallel(records, config, workers, chunk_size, as_of)
+    else:
+        students = DataLoader.iter_students(input_file)
+        results = RiskCalculator(config).iter_risks(students, batch_size=chunk_size, as_of=as_of)
+    
+    if output_file:
+        count = DataLoader.write_results_to_csv(results, output_file)
+        console.print(f"Kết quả đã được lưu vào: {output_file}")
+    else:
+        count = sum(1 for _ in results)
+    
+    console.print(f"✅ Đã xử lý {count} sinh viên")
+    console.print(f"\n[bold green]✅ Hoàn thành![/bold green]")
+
+
 def display_results(results):
     """Hiển thị kết quả dưới dạng bảng"""
     table = Table(title="Kết quả đánh giá rủi ro")
@@ -104,6 +157,205 @@ def display_results(results):
     console.print(table)
 
 
+def parse_values(text: str, cast=float) -> list:
+    """Parse danh sách ngưỡng: "0.6,0.7,0.8" hoặc khoảng "start:stop:step" (bao gồm stop)"""
+    values = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if ":" in part:
+            start, stop, *rest = [float(x) for x in part.split(":")]
+            step = rest[0] if rest else 1
+            if step <= 0:
+                raise typer.BadParameter(f"Bước nhảy phải lớn hơn 0: {part}")
+            count = int(round((stop - start) / step)) + 1
+            values.extend(cast(round(start + i * step, 10)) for i in range(max(count, 0)))
+        else:
+            values.append(cast(part))
+    
+    if not values:
+        raise typer.BadParameter(f"Không có giá trị ngưỡng nào: {text!r}")
+    return sorted(set(values))
+
+
+@app.command()
+def sweep(
+    input_file: str = typer.Option("data/sample_students.json", "--input", "-i", help="Đường dẫn file JSON/NDJSON đầu vào"),
+    attendance: str = typer.Option("0.5:0.95:0.05", "--attendance", help="Các ngưỡng đi học, vd \"0.6,0.75\" hoặc \"0.5:0.95:0.05\""),
+    assignment: str = typer.Option("0.3:0.75:0.05", "--assignment", help="Các ngưỡng nộp bài tập"),
+    contact: str = typer.Option("1:10", "--contact", help="Các ngưỡng số lần liên lạc thất bại"),
+    output_file: str = typer.Option(None, "--output", "-o", help="Lưu kết quả sweep ra file CSV"),
+    chunk_size: int = typer.Option(5000, "--chunk-size", min=1, help="Số sinh viên mỗi batch khi đọc dữ liệu")
+):
+    """Thử nhiều bộ ngưỡng cùng lúc và hiển thị phân bố LOW/MEDIUM/HIGH cho từng bộ"""
+    try:
+        configs = build_grid(
+            parse_values(attendance),
+            parse_values(assignment),
+            parse_values(contact, cast=int)
+        )
+        
+        console.print(f"[bold blue]Sweep ngưỡng rủi ro[/bold blue]")
+        console.print(f"📁 File đầu vào: {input_file}")
+        console.print(f"🔢 Số bộ ngưỡng: {len(configs)}")
+        
+        # Đọc dữ liệu một lần, chỉ giữ lại số liệu đếm của từng sinh viên
+        console.print("[yellow]Đang load dữ liệu...[/yellow]")
+        batches = [
+            SignalBatch.from_students(chunk)
+            for chunk in iter_chunks(DataLoader.iter_students(input_file), chunk_size)
+        ]
+        signals = SignalBatch.concat(batches)
+        console.print(f"✅ Đã load {len(signals)} sinh viên")
+        
+        calculator = RiskCalculator()
+        level_table = [calculator.get_risk_level(score) for score in range(4)]
+        distributions = ThresholdSweep(signals).evaluate(configs, level_table)
+        levels = list(dict.fromkeys(level_table))
+        
+        table = Table(title="Phân bố rủi ro theo bộ ngưỡng")
+        table.add_column("Attendance", justify="right")
+        table.add_column("Assignment", justify="right")
+        table.add_column("Contact", justify="right")
+        for level in levels:
+            table.add_column(level, justify="right")
+        
+        for config, distribution in zip(configs, distributions):
+            table.add_row(
+                f"{config.attendance_threshold:g}",
+                f"{config.assignment_threshold:g}",
+                str(config.contact_failed_threshold),
+                *[str(distribution[level]) for level in levels]
+            )
+        console.print(table)
+        
+        if output_file:
+            import csv
+            with open(output_file, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                writer.writerow(['Attendance Threshold', 'Assignment Threshold', 'Contact Threshold', *levels])
+                for config, distribution in zip(configs, distributions):
+                    writer.writerow([
+                        config.attendance_threshold,
+                        config.assignment_threshold,
+                        config.contact_failed_threshold,
+                        *[distribution[level] for level in levels]
+                    ])
+            console.print(f"Kết quả đã được lưu vào: {output_file}")
+        
+        console.print(f"\n[bold green]✅ Hoàn thành![/bold green]")
+        
+    except FileNotFoundError as e:
+        console.print(f"[bold red]❌ Lỗi: {e}[/bold red]")
+        raise typer.Exit(1)
+    except typer.BadParameter:
+        raise
+    except Exception as e:
+        console.print(f"[bold red]❌ Lỗi không mong muốn: {e}[/bold red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def migrate(
+    input_file: str = typer.Option("data/sample_students.json", "--input", "-i", help="Đường dẫn file JSON/NDJSON cần migrate"),
+    batch_size: int = typer.Option(500, "--batch-size", min=1, help="Số sinh viên ghi trong một transaction"),
+    restart: bool = typer.Option(False, "--restart", help="Bỏ qua checkpoint, chạy lại từ đầu file")
+):
+    """Migrate hàng loạt dữ liệu JSON/NDJSON vào database (tiếp tục từ checkpoint nếu bị gián đoạn)"""
+    try:
+        from src.database.database import SessionLocal, create_tables
+        from src.services.risk_service import RiskService
+        from src.services.student_service import StudentService
+        from src.utils.data_migration import migrate_json_to_database_bulk
+        
+        # Tạo database nếu chưa có
+        create_tables()
+        
+        # Dữ liệu tạo trước khi có bảng tổng hợp tín hiệu / con trỏ đánh giá mới nhất
+        db = SessionLocal()
+        try:
+            StudentService(db).backfill_signals()
+            RiskService(db).backfill_latest_pointers()
+        finally:
+            db.close()
+        
+        console.print(f"[bold blue]Migration dữ liệu vào database[/bold blue]")
+        console.print(f"📁 File đầu vào: {input_file}")
+        
+        summary = migrate_json_to_database_bulk(input_file, batch_size=batch_size, resume=not restart)
+        
+        if summary["resumed_from"]:
+            console.print(f"⏩ Tiếp tục từ bản ghi thứ {summary['resumed_from']}")
+        console.print(f"\n📈 Thống kê:", style="green")
+        console.print(f"   Bản ghi đã xử lý: {summary['records']}", style="white")
+        console.print(f"   Sinh viên mới: {summary['students_created']}", style="white")
+        console.print(f"   Bỏ qua (đã tồn tại): {summary['skipped']}", style="white")
+        console.print(f"   Điểm danh: {summary['attendance_inserted']}", style="white")
+        console.print(f"   Bài tập: {summary['assignments_inserted']}", style="white")
+        console.print(f"   Liên lạc: {summary['contacts_inserted']}", style="white")
+        
+        for error in summary["errors"][:20]:
+            console.print(f"   ⚠️  Bản ghi {error['index']} ({error['student_id']}): {error['error']}", style="yellow")
+        if len(summary["errors"]) > 20:
+            console.print(f"   ... và {len(summary['errors']) - 20} lỗi khác", style="yellow")
+        
+        if not summary["completed"]:
+            raise typer.Exit(1)
+        console.print(f"\n[bold green]✅ Hoàn thành![/bold green]")
+        
+    except FileNotFoundError as e:
+        console.print(f"[bold red]❌ Lỗi: {e}[/bold red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def compact(
+    retention_days: int = typer.Option(None, "--retention-days", min=0, help="Chuyển đánh giá cũ hơn N ngày sang bảng archive"),
+    vacuum: bool = typer.Option(False, "--vacuum", help="VACUUM database sau khi compaction để trả lại dung lượng")
+):
+    """Gộp các đánh giá rủi ro giống nhau liên tiếp và archive lịch sử cũ"""
+    try:
+        from src.database.database import SessionLocal, create_tables
+        from src.services.compaction_service import CompactionService
+        
+        # Tạo database nếu chưa có
+        create_tables()
+        
+        db = SessionLocal()
+        try:
+            console.print("🧹 Đang compaction bảng risk_evaluations...", style="blue")
+            summary = CompactionService(db).compact(retention_days=retention_days, vacuum=vacuum)
+        finally:
+            db.close()
+        
+        console.print(f"\n📈 Thống kê:", style="green")
+        console.print(f"   Đã gộp: {summary['collapsed']} dòng", style="white")
+        console.print(f"   Đã archive: {summary['archived']} dòng", style="white")
+        console.print(f"   Còn lại: {summary['remaining']} dòng", style="white")
+        console.print(f"\n[bold green]✅ Hoàn thành![/bold green]")
+        
+    except Exception as e:
+        console.print(f"❌ Lỗi: {e}", style="red")
+        raise typer.Exit(1)
+
+
+@app.command()
+def generate_templates(
+    output_dir: str = typer.Option("templates", "--output", "-o", help="Thư mục ghi các file HTML")
+):
+    """Xuất web templates ra file HTML (web app render từ bộ nhớ, không cần bước này)"""
+    try:
+        from src.web.templates import create_templates
+        
+        count = create_templates(output_dir)
+        console.print(f"✅ Đã ghi {count} templates vào: {output_dir}", style="green")
+        
+    except Exception as e:
+        console.print(f"❌ Lỗi: {e}", style="red")
+        raise typer.Exit(1)
+
+
 @app.command()
 def export_current_results(
     output_file: str = typer.Option("results.csv", "--output", "-o", help="Output CSV file path")
@@ -111,52 +363,19 @@ def export_current_results(
     """Export kết quả đánh giá rủi ro hiện tại từ database ra CSV"""
     try:
         from src.database.database import SessionLocal, create_tables
-        from src.services.student_service import StudentService
         from src.services.risk_service import RiskService
+        from src.services.export_service import ExportService
         
         # Tạo database nếu chưa có
         create_tables()
         
         # Kết nối database
         db = SessionLocal()
-        student_service = StudentService(db)
-        risk_service = RiskService(db)
-        
-        # Lấy tất cả sinh viên và đánh giá rủi ro mới nhất
-        all_students = student_service.get_all_students()
-        results = []
+        RiskService(db).backfill_latest_pointers()
         
-        console.print("📊 Đang thu thập dữ liệu từ database...", style="blue")
-        
-        for student in all_students:
-            latest_risk = risk_service.get_latest_risk_evaluation(student.student_id)
-            
-            if latest_risk:
-                results.append({
-                    'Student ID': student.student_id,
-                    'Student Name': student.student_name,
-                    'Score': latest_risk.score,
-                    'Risk Level': latest_risk.risk_level,
-                    'Note': latest_risk.note,
-                    'Evaluated At': latest_risk.evaluated_at.strftime('%Y-%m-%d %H:%M:%S')
-                })
-            else:
-                # Sinh viên chưa được đánh giá
-                results.append({
-                    'Student ID': student.student_id,
-                    'Student Name': student.student_name,
-                    'Score': 'N/A',
-                    'Risk Level': 'N/A',
-                    'Note': 'Chưa được đánh giá',
-                    'Evaluated At': 'N/A'
-                })
-        
-        # Lưu vào CSV
-        DataLoader.save_results_to_csv(results, output_file)
-        
-        # Hiển thị thống kê
-        total_students = len(results)
-        evaluated_students = len([r for r in results if r['Score'] != 'N/A'])
+        # Ghi thẳng từng dòng ra CSV, không giữ toàn bộ kết quả trong bộ nhớ
+        console.print("📊 Đang export dữ liệu từ database...", style="blue")
+        total_students, evaluated_students = ExportService(db).write_csv(output_file)
         
         console.print(f"\n📈 Thống kê:", style="green")
         console.print(f"   Tổng sinh viên: {total_students}", style="white")
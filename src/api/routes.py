@@ -1,21 +1,146 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import codecs
+import io
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
-from src.database.database import get_db
+from src.database.database import ReadSessionLocal, get_db, get_read_db
 from src.services.student_service import StudentService
 from src.services.risk_service import RiskService
+from src.services.export_service import ExportService
+from src.services.dashboard_events import dashboard_events
 from src.models.student import (
-    StudentCreate, StudentResponse, RiskEvaluationResponse,
-    Attendance, Assignment, Contact
+    StudentCreate, StudentResponse, RiskEvaluationResponse, StudentRow, RiskEvaluationRow,
+    STUDENT_ROWS_ADAPTER, RISK_EVALUATION_ROWS_ADAPTER,
+    Attendance, Assignment, Contact, WhatIfRequest, WhatIfResult,
+    BulkEvaluationRequest, BulkEvaluationResponse, BulkIngestResponse
 )
 from src.models.config import SystemConfig, ConfigUpdateRequest, ConfigResponse
 from src.services.config_service import ConfigService
+from src.services.version_service import VersionService, DATA_VERSION, CONFIG_VERSION
 from src.risk_assessment.config import RiskConfig
+from src.utils.conditional import http_date, is_not_modified, make_etag
+from src.utils.cursor import encode_cursor, decode_cursor
+from src.utils.data_loader import DataLoader
 
 router = APIRouter()
 
+# Số điểm tối đa của lưới ngưỡng trong một request what-if
+MAX_WHAT_IF_GRID = 100000
+
+# Body của bulk ingest lớn hơn ngưỡng này (byte) được ghi tạm ra đĩa thay vì giữ trong bộ nhớ
+BULK_SPOOL_MAX_SIZE = 1 << 20
+
+# Khoảng cách (giây) giữa các dòng keep-alive của kênh SSE để proxy không đóng kết nối
+SSE_KEEPALIVE_INTERVAL = 15
+
+
+def _read_cursor(cursor: str, **expected) -> dict:
+    """Giải mã cursor và kiểm tra nó được tạo cho đúng bộ lọc/sắp xếp hiện tại"""
+    try:
+        payload = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if any(payload.get(name) != value for name, value in expected.items()) or "id" not in payload:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor không khớp với tham số truy vấn hiện tại"
+        )
+    return payload
+
+
+def _evaluation_after(cursor: Optional[str], **expected) -> Optional[tuple]:
+    """Khoá (evaluated_at, id) từ cursor của danh sách đánh giá rủi ro"""
+    if not cursor:
+        return None
+    payload = _read_cursor(cursor, **expected)
+    try:
+        return datetime.fromisoformat(payload["key"]), int(payload["id"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor không hợp lệ")
+
+
+def _lookahead(limit: Optional[int]) -> Optional[int]:
+    """Số dòng cần đọc: dư một dòng so với limit để biết còn trang sau hay không"""
+    return None if limit is None else limit + 1
+
+
+def _evaluation_page(response: Response, evaluations: list, limit: Optional[int], **expected) -> list:
+    """
+    Cắt danh sách đánh giá (đọc bằng _lookahead) về limit dòng
+    
+    Chỉ đặt header X-Next-Cursor khi có dòng dư, tức là chắc chắn còn trang sau.
+    """
+    if limit is None or len(evaluations) <= limit:
+        return evaluations
+    
+    evaluations = evaluations[:limit]
+    last = evaluations[-1]
+    response.headers["X-Next-Cursor"] = encode_cursor(
+        {**expected, "key": last.evaluated_at.isoformat(), "id": last.id}
+    )
+    return evaluations
+
+
+def _not_modified(request: Request, response: Response, etag: str, last_modified: Optional[datetime]) -> Optional[Response]:
+    """
+    Đặt ETag/Last-Modified cho response; trả về response 304 nếu client đã có bản này
+    
+    Cache-Control: no-cache để trình duyệt luôn hỏi lại (kèm If-None-Match) thay vì tự dùng cache.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    
+    if is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return None
+
+
+def _check_version(request: Request, response: Response, db: Session, name: str = DATA_VERSION) -> Optional[Response]:
+    """
+    Kiểm tra điều kiện theo phiên bản chung (data/config), trước khi chạy query dữ liệu
+    
+    Phiên bản được đọc trước dữ liệu: nếu có lần ghi xen giữa, body chỉ mới hơn ETag
+    (client tải lại thêm một lần), không bao giờ cũ hơn.
+    """
+    version, updated_at = VersionService(db).get_stamp(name)
+    return _not_modified(request, response, make_etag(name, version), updated_at)
+
+
+def _check_student_version(request: Request, response: Response, db: Session, student_id: str) -> Optional[Response]:
+    """Kiểm tra điều kiện theo phiên bản riêng của sinh viên (không có sinh viên thì để route trả 404)"""
+    stamp = VersionService(db).get_student_stamp(student_id)
+    if stamp is None:
+        return None
+    
+    db_id, version, updated_at = stamp
+    return _not_modified(request, response, make_etag("student", db_id, version), updated_at)
+
+
+def _json_rows(adapter, row_type, rows, response: Response) -> Response:
+    """
+    Serialize dòng cột thẳng ra JSON bytes bằng TypeAdapter dựng sẵn
+    
+    Bỏ qua bước ORM object -> response_model -> jsonable_encoder; header đã đặt trên
+    response (ETag, X-Next-Cursor...) được chuyển sang response trả về.
+    """
+    names = tuple(row_type.__annotations__)
+    content = adapter.dump_json([dict(zip(names, row)) for row in rows])
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers={name: value for name, value in response.headers.items() if name != "content-length"}
+    )
+
 
 # Student Management APIs
 @router.post("/students/", response_model=StudentResponse, status_code=status.HTTP_201_CREATED)
@@ -34,55 +159,114 @@ def create_student(student_data: StudentCreate, db: Session = Depends(get_db)):
     return student_service.create_student(student_data)
 
 
+@router.post("/students/bulk", response_model=BulkIngestResponse)
+async def bulk_ingest_students(request: Request, db: Session = Depends(get_db)):
+    """
+    Nạp hàng loạt sinh viên kèm điểm danh, bài tập và liên lạc
+    
+    Body là mảng JSON hoặc NDJSON (mỗi dòng một sinh viên) cùng dạng với file dữ liệu mẫu;
+    sinh viên đã tồn tại được thêm dữ liệu, lỗi của từng bản ghi trả về trong errors.
+    Body được đọc theo chunk vào file tạm (trong bộ nhớ tới BULK_SPOOL_MAX_SIZE) rồi parse
+    tăng dần, nên bộ nhớ không phụ thuộc kích thước upload.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=BULK_SPOOL_MAX_SIZE)
+    try:
+        # Kiểm tra UTF-8 ngay khi nhận để body hỏng bị từ chối trước khi ghi bất cứ thứ gì
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            async for chunk in request.stream():
+                decoder.decode(chunk)
+                spool.write(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Body phải là văn bản UTF-8"
+            )
+        spool.seek(0)
+        
+        student_service = StudentService(db)
+        records = DataLoader.iter_records_from_stream(io.TextIOWrapper(spool, encoding="utf-8"))
+        return await run_in_threadpool(student_service.bulk_ingest, records)
+    finally:
+        spool.close()
+
+
 @router.get("/students/", response_model=List[StudentResponse])
 def get_all_students(
+    request: Request,
+    response: Response,
     risk_level: str = None,
     sort_by: str = "student_id",
     sort_order: str = "asc",
-    page: int = 1,
-    limit: int = 20,
-    db: Session = Depends(get_db)
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=1000),
+    cursor: str = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Lấy danh sách sinh viên với filter và sort"""
-    student_service = StudentService(db)
-    risk_service = RiskService(db)
+    """
+    Lấy danh sách sinh viên với filter và sort
+    
+    Không có cursor: phân trang theo page, tổng số trả về trong header X-Total-Count.
+    Có cursor (lấy từ header X-Next-Cursor của trang trước): phân trang keyset, bỏ qua page.
+    """
+    not_modified = _check_version(request, response, db)
+    if not_modified:
+        return not_modified
     
-    # Lấy tất cả sinh viên
-    all_students = student_service.get_all_students()
+    student_service = StudentService(db)
     
     # Filter theo risk level nếu có
     if risk_level and risk_level.upper() in ["LOW", "MEDIUM", "HIGH"]:
-        filtered_students = []
-        for student in all_students:
-            latest_risk = risk_service.get_latest_risk_evaluation(student.student_id)
-            if latest_risk and latest_risk.risk_level == risk_level.upper():
-                filtered_students.append(student)
-        all_students = filtered_students
-    
-    # Sort
-    reverse = sort_order.lower() == "desc"
-    if sort_by == "student_name":
-        all_students.sort(key=lambda x: x.student_name, reverse=reverse)
-    elif sort_by == "risk_level":
-        # Sort theo risk level (HIGH > MEDIUM > LOW)
-        risk_order = {"HIGH": 3, "MEDIUM": 2, "LOW": 1}
-        all_students.sort(key=lambda x: risk_order.get(
-            risk_service.get_latest_risk_evaluation(x.student_id).risk_level if risk_service.get_latest_risk_evaluation(x.student_id) else "LOW", 0
-        ), reverse=reverse)
-    else:  # sort_by == "student_id" (default)
-        all_students.sort(key=lambda x: x.student_id, reverse=reverse)
-    
-    # Pagination
-    start_idx = (page - 1) * limit
-    end_idx = start_idx + limit
-    paginated_students = all_students[start_idx:end_idx]
-    
-    return paginated_students
+        risk_level = risk_level.upper()
+    else:
+        risk_level = None
+    
+    if sort_by not in ["student_id", "student_name", "risk_level"]:
+        sort_by = "student_id"
+    sort_order = "desc" if sort_order.lower() == "desc" else "asc"
+    
+    after = None
+    if cursor:
+        payload = _read_cursor(cursor, risk_level=risk_level, sort_by=sort_by, sort_order=sort_order)
+        after = (payload.get("key"), payload["id"])
+    
+    # Filter, sort và phân trang trong một câu SQL
+    students, total, next_key = student_service.list_students(
+        risk_level=risk_level,
+        sort_by=sort_by,
+        sort_order=sort_order,
+        page=page,
+        limit=limit,
+        after=after,
+        as_rows=True
+    )
+    
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    if next_key is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor({
+            "risk_level": risk_level,
+            "sort_by": sort_by,
+            "sort_order": sort_order,
+            "key": next_key[0],
+            "id": next_key[1]
+        })
+    return _json_rows(STUDENT_ROWS_ADAPTER, StudentRow, students, response)
 
 
 @router.get("/students/{student_id}/profile")
-def get_student_profile(student_id: str, db: Session = Depends(get_db)):
+def get_student_profile(
+    student_id: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db)
+):
     """Lấy hồ sơ đầy đủ của sinh viên"""
+    not_modified = _check_student_version(request, response, db, student_id)
+    if not_modified:
+        return not_modified
+    
     student_service = StudentService(db)
     profile = student_service.get_student_profile(student_id)
     
@@ -173,23 +357,48 @@ def predict_dropout_risk(
 
 
 @router.get("/students/{student_id}/risk-evaluations", response_model=List[RiskEvaluationResponse])
-def get_student_risk_evaluations(student_id: str, db: Session = Depends(get_db)):
-    """Lấy tất cả kết quả đánh giá rủi ro của sinh viên"""
+def get_student_risk_evaluations(
+    student_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(None, ge=1, le=1000),
+    cursor: str = None,
+    db: Session = Depends(get_read_db)
+):
+    """Lấy kết quả đánh giá rủi ro của sinh viên (mới nhất trước; có limit thì phân trang bằng cursor)"""
+    not_modified = _check_student_version(request, response, db, student_id)
+    if not_modified:
+        return not_modified
+    
     risk_service = RiskService(db)
-    evaluations = risk_service.get_all_risk_evaluations(student_id)
+    after = _evaluation_after(cursor, student_id=student_id)
+    evaluations = risk_service.get_all_risk_evaluations(
+        student_id, limit=_lookahead(limit), after=after, as_rows=True
+    )
     
-    if not evaluations:
+    # Trang sau cursor có thể rỗng (dữ liệu đã đổi); chỉ trang đầu rỗng mới là không tìm thấy
+    if not evaluations and after is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Không tìm thấy kết quả đánh giá rủi ro cho sinh viên: {student_id}"
         )
     
-    return evaluations
+    evaluations = _evaluation_page(response, evaluations, limit, student_id=student_id)
+    return _json_rows(RISK_EVALUATION_ROWS_ADAPTER, RiskEvaluationRow, evaluations, response)
 
 
 @router.get("/students/{student_id}/latest-risk", response_model=RiskEvaluationResponse)
-def get_latest_risk_evaluation(student_id: str, db: Session = Depends(get_db)):
+def get_latest_risk_evaluation(
+    student_id: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db)
+):
     """Lấy kết quả đánh giá rủi ro mới nhất của sinh viên"""
+    not_modified = _check_student_version(request, response, db, student_id)
+    if not_modified:
+        return not_modified
+    
     risk_service = RiskService(db)
     evaluation = risk_service.get_latest_risk_evaluation(student_id)
     
@@ -219,23 +428,86 @@ def get_student_risk_summary(student_id: str, db: Session = Depends(get_db)):
 
 # Risk Analytics APIs
 @router.get("/risk/high-risk-students", response_model=List[RiskEvaluationResponse])
-def get_high_risk_students(db: Session = Depends(get_db)):
-    """Lấy danh sách sinh viên có rủi ro cao"""
+def get_high_risk_students(
+    request: Request,
+    response: Response,
+    limit: int = Query(None, ge=1, le=1000),
+    cursor: str = None,
+    db: Session = Depends(get_read_db)
+):
+    """Lấy danh sách sinh viên có rủi ro cao (có limit thì phân trang bằng cursor)"""
+    not_modified = _check_version(request, response, db)
+    if not_modified:
+        return not_modified
+    
     risk_service = RiskService(db)
-    return risk_service.get_high_risk_students()
+    after = _evaluation_after(cursor, risk_level="HIGH")
+    evaluations = risk_service.get_high_risk_students(limit=_lookahead(limit), after=after, as_rows=True)
+    evaluations = _evaluation_page(response, evaluations, limit, risk_level="HIGH")
+    return _json_rows(RISK_EVALUATION_ROWS_ADAPTER, RiskEvaluationRow, evaluations, response)
 
 
 @router.get("/risk/medium-risk-students", response_model=List[RiskEvaluationResponse])
-def get_medium_risk_students(db: Session = Depends(get_db)):
-    """Lấy danh sách sinh viên có rủi ro trung bình"""
+def get_medium_risk_students(
+    request: Request,
+    response: Response,
+    limit: int = Query(None, ge=1, le=1000),
+    cursor: str = None,
+    db: Session = Depends(get_read_db)
+):
+    """Lấy danh sách sinh viên có rủi ro trung bình (có limit thì phân trang bằng cursor)"""
+    not_modified = _check_version(request, response, db)
+    if not_modified:
+        return not_modified
+    
+    risk_service = RiskService(db)
+    after = _evaluation_after(cursor, risk_level="MEDIUM")
+    evaluations = risk_service.get_medium_risk_students(limit=_lookahead(limit), after=after, as_rows=True)
+    evaluations = _evaluation_page(response, evaluations, limit, risk_level="MEDIUM")
+    return _json_rows(RISK_EVALUATION_ROWS_ADAPTER, RiskEvaluationRow, evaluations, response)
+
+
+@router.post("/risk/evaluate-all", response_model=BulkEvaluationResponse)
+def evaluate_all_students(
+    request: BulkEvaluationRequest = None,
+    db: Session = Depends(get_db)
+):
+    """Đánh giá rủi ro hàng loạt cho tất cả (hoặc một nhóm) sinh viên"""
     risk_service = RiskService(db)
-    return risk_service.get_medium_risk_students()
+    student_ids = request.student_ids if request else None
+    return risk_service.evaluate_students(student_ids)
+
+
+@router.post("/risk/what-if", response_model=List[WhatIfResult])
+def risk_what_if(request: WhatIfRequest, db: Session = Depends(get_db)):
+    """Thử nhiều bộ ngưỡng và trả về phân bố mức rủi ro cho từng bộ"""
+    grid_size = (
+        len(request.attendance_thresholds)
+        * len(request.assignment_thresholds)
+        * len(request.contact_failed_thresholds)
+    )
+    if grid_size > MAX_WHAT_IF_GRID:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Lưới ngưỡng quá lớn ({grid_size} điểm, tối đa {MAX_WHAT_IF_GRID})"
+        )
+    
+    risk_service = RiskService(db)
+    return risk_service.what_if(
+        request.attendance_thresholds,
+        request.assignment_thresholds,
+        request.contact_failed_thresholds
+    )
 
 
 # Configuration APIs
 @router.get("/config", response_model=ConfigResponse)
-def get_system_config(db: Session = Depends(get_db)):
+def get_system_config(request: Request, response: Response, db: Session = Depends(get_read_db)):
     """Lấy cấu hình hệ thống hiện tại"""
+    not_modified = _check_version(request, response, db, CONFIG_VERSION)
+    if not_modified:
+        return not_modified
+    
     config_service = ConfigService(db)
     config = config_service.get_config()
     return ConfigResponse(
@@ -281,90 +553,60 @@ def reset_system_config(db: Session = Depends(get_db)):
 
 
 @router.get("/dashboard/stats")
-def get_dashboard_stats(db: Session = Depends(get_db)):
+def get_dashboard_stats(request: Request, response: Response, db: Session = Depends(get_read_db)):
     """Lấy thống kê cho dashboard"""
-    student_service = StudentService(db)
-    risk_service = RiskService(db)
+    not_modified = _check_version(request, response, db)
+    if not_modified:
+        return not_modified
     
-    # Lấy dữ liệu
-    all_students = student_service.get_all_students()
-    high_risk_students = risk_service.get_high_risk_students()
-    medium_risk_students = risk_service.get_medium_risk_students()
-    
-    # Tính toán thống kê
-    total_students = len(all_students)
-    high_risk_count = len(high_risk_students)
-    medium_risk_count = len(medium_risk_students)
-    low_risk_count = total_students - high_risk_count - medium_risk_count
-    
-    return {
-        "total_students": total_students,
-        "high_risk_count": high_risk_count,
-        "medium_risk_count": medium_risk_count,
-        "low_risk_count": low_risk_count,
-        "risk_distribution": {
-            "low": low_risk_count,
-            "medium": medium_risk_count,
-            "high": high_risk_count
-        }
-    }
+    risk_service = RiskService(db)
+    return risk_service.get_dashboard_stats()
+
+
+@router.get("/events/dashboard")
+async def stream_dashboard_events():
+    """
+    Kênh server-sent events cho dashboard
+    
+    Sự kiện stats (thống kê và delta so với lần trước) và high_risk (đánh giá rủi ro cao mới)
+    được đẩy từ một producer dùng chung khi dữ liệu thay đổi.
+    """
+    async def generate():
+        queue = dashboard_events.subscribe()
+        try:
+            yield await asyncio.to_thread(dashboard_events.initial_event)
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            dashboard_events.unsubscribe(queue)
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/export/csv")
-def export_results_to_csv(db: Session = Depends(get_db)):
-    """Export kết quả đánh giá rủi ro ra file CSV"""
-    from fastapi.responses import FileResponse
-    import csv
-    import os
-    from datetime import datetime
-    
-    student_service = StudentService(db)
-    risk_service = RiskService(db)
-    
-    # Lấy tất cả sinh viên và đánh giá rủi ro mới nhất
-    all_students = student_service.get_all_students()
-    results = []
-    
-    for student in all_students:
-        latest_risk = risk_service.get_latest_risk_evaluation(student.student_id)
-        
-        if latest_risk:
-            results.append({
-                'Student ID': student.student_id,
-                'Student Name': student.student_name,
-                'Score': latest_risk.score,
-                'Risk Level': latest_risk.risk_level,
-                'Note': latest_risk.note,
-                'Evaluated At': latest_risk.evaluated_at.strftime('%Y-%m-%d %H:%M:%S')
-            })
-        else:
-            # Sinh viên chưa được đánh giá
-            results.append({
-                'Student ID': student.student_id,
-                'Student Name': student.student_name,
-                'Score': 'N/A',
-                'Risk Level': 'N/A',
-                'Note': 'Chưa được đánh giá',
-                'Evaluated At': 'N/A'
-            })
-    
-    # Tạo file CSV
+def export_results_to_csv():
+    """Export kết quả đánh giá rủi ro ra file CSV (stream, không ghi file tạm)"""
     csv_filename = f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    csv_path = csv_filename
     
-    with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['Student ID', 'Student Name', 'Score', 'Risk Level', 'Note', 'Evaluated At']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for result in results:
-            writer.writerow(result)
-    
-    # Trả về file để download
-    return FileResponse(
-        path=csv_path,
-        filename=csv_filename,
-        media_type='text/csv'
+    def generate():
+        # Session riêng sống cùng response, đóng khi stream kết thúc
+        db = ReadSessionLocal()
+        try:
+            yield from ExportService(db).iter_csv()
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        generate(),
+        media_type='text/csv',
+        headers={"Content-Disposition": f'attachment; filename="{csv_filename}"'}
     )
 
 
@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
@@ -7,15 +9,69 @@ from pathlib import Path
 db_dir = Path("database")
 db_dir.mkdir(exist_ok=True)
 
-# Cấu hình database
-SQLALCHEMY_DATABASE_URL = "sqlite:///database/student_risk.db"
+# Cấu hình database (ghi đè bằng biến môi trường)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///database/student_risk.db")
+# Engine chỉ đọc cho các route GET; mặc định cùng database với engine ghi
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL", SQLALCHEMY_DATABASE_URL)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+# Pragma áp dụng cho mỗi kết nối SQLite mới
+SQLITE_PRAGMAS = {
+    # WAL: người đọc không chặn người ghi và ngược lại
+    "journal_mode": "WAL",
+    # An toàn với WAL, chỉ fsync khi checkpoint
+    "synchronous": "NORMAL",
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Số âm = KiB
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": "MEMORY",
+}
+
+
+def _engine_options(url: str) -> dict:
+    """Tham số create_engine: connect_args cho SQLite và cấu hình pool từ biến môi trường"""
+    options = {}
+    database_url = make_url(url)
+    
+    if database_url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        # SQLite in-memory dùng pool riêng, không nhận các tham số của QueuePool
+        if database_url.database in (None, "", ":memory:"):
+            return options
+    
+    options["pool_size"] = int(os.getenv("DATABASE_POOL_SIZE", "10"))
+    options["max_overflow"] = int(os.getenv("DATABASE_MAX_OVERFLOW", "20"))
+    options["pool_timeout"] = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+    options["pool_pre_ping"] = os.getenv("DATABASE_POOL_PRE_PING", "0").lower() in ("1", "true", "yes")
+    return options
+
+
+def _apply_sqlite_pragmas(engine, read_only: bool = False):
+    """Đăng ký listener đặt pragma cho mỗi kết nối SQLite của engine"""
+    if engine.dialect.name != "sqlite":
+        return
+    
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            if read_only:
+                # Kết nối đọc không bao giờ giữ khoá ghi
+                cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
+_apply_sqlite_pragmas(engine)
+
+read_engine = create_engine(SQLALCHEMY_READ_DATABASE_URL, **_engine_options(SQLALCHEMY_READ_DATABASE_URL))
+_apply_sqlite_pragmas(read_engine, read_only=True)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Tạo Base chung cho toàn bộ ứng dụng
 Base = declarative_base()
@@ -30,9 +86,52 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """Dependency để lấy database session chỉ đọc (cho các route GET không ghi dữ liệu)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def create_tables():
     """Tạo tất cả bảng trong database"""
     # Import tất cả models để đảm bảo chúng được đăng ký với Base
-    from src.models.student import StudentDB, AttendanceDB, AssignmentDB, ContactDB, RiskEvaluationDB, SystemConfigDB
+    from src.models.student import (
+        StudentDB, AttendanceDB, AssignmentDB, ContactDB, StudentSignalDB,
+        RiskEvaluationDB, RiskEvaluationArchiveDB, SystemConfigDB, DataVersionDB,
+        MigrationCheckpointDB
+    )
+    
+    from src.services.version_service import seed_versions
+    
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema()
+    seed_versions(engine)
+
+
+def upgrade_schema():
+    """Thêm các cột/index mới vào bảng đã tồn tại (create_all không tự thêm cột)"""
+    inspector = inspect(engine)
     
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                
+                column_type = column.type.compile(dialect=engine.dialect)
+                default = ""
+                if column.default is not None and column.default.is_scalar:
+                    value = column.default.arg
+                    default = f" DEFAULT {int(value) if isinstance(value, bool) else repr(value)}"
+                
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}"))
+            
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
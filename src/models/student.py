@@ -1,7 +1,8 @@
 from datetime import date, datetime
-from typing import List, Optional
-from pydantic import BaseModel, Field
-from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, Text, ForeignKey
+from typing import Dict, List, Optional
+from typing_extensions import TypedDict
+from pydantic import BaseModel, Field, TypeAdapter
+from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 # Import Base từ database module
@@ -55,11 +56,32 @@ class StudentDB(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Đánh giá rủi ro mới nhất (phi chuẩn hoá), cập nhật cùng transaction với mỗi đánh giá mới
+    latest_evaluation_id = Column(Integer)
+    latest_risk_level = Column(String(20))
+    latest_risk_score = Column(Integer)
+    latest_evaluated_at = Column(DateTime)
+    # Hạng của latest_risk_level (HIGH=3, MEDIUM=2, LOW/chưa đánh giá=1), lưu sẵn để sắp xếp theo index
+    latest_risk_rank = Column(Integer, nullable=False, default=1)
+    
+    # Phiên bản dữ liệu riêng của sinh viên (ETag), tăng cùng transaction với mỗi lần ghi liên quan
+    data_version = Column(Integer, nullable=False, default=0)
+    
     # Relationships
     attendance_records = relationship("AttendanceDB", back_populates="student", cascade="all, delete-orphan")
     assignment_records = relationship("AssignmentDB", back_populates="student", cascade="all, delete-orphan")
     contact_records = relationship("ContactDB", back_populates="student", cascade="all, delete-orphan")
     risk_evaluations = relationship("RiskEvaluationDB", back_populates="student", cascade="all, delete-orphan")
+    signals = relationship("StudentSignalDB", back_populates="student", uselist=False, cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Phục vụ phân trang keyset khi sắp xếp theo tên
+        Index("ix_students_name_id", "student_name", "id"),
+        # Danh sách/đếm sinh viên theo mức rủi ro hiện tại
+        Index("ix_students_latest_risk", "latest_risk_level", "latest_evaluated_at", "latest_evaluation_id"),
+        # Phục vụ phân trang keyset khi sắp xếp theo mức rủi ro
+        Index("ix_students_risk_rank_id", "latest_risk_rank", "id"),
+    )
 
 
 class AttendanceDB(Base):
@@ -67,7 +89,7 @@ class AttendanceDB(Base):
     __tablename__ = "attendance"
     
     id = Column(Integer, primary_key=True, index=True)
-    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False, index=True)
     date = Column(DateTime, nullable=False)
     status = Column(String(20), nullable=False)  # ATTEND or ABSENT
     
@@ -79,7 +101,7 @@ class AssignmentDB(Base):
     __tablename__ = "assignments"
     
     id = Column(Integer, primary_key=True, index=True)
-    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False, index=True)
     date = Column(DateTime, nullable=False)
     name = Column(String(100), nullable=False)
     submitted = Column(Boolean, default=False)
@@ -92,13 +114,32 @@ class ContactDB(Base):
     __tablename__ = "contacts"
     
     id = Column(Integer, primary_key=True, index=True)
-    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False, index=True)
     date = Column(DateTime, nullable=False)
     status = Column(String(20), nullable=False)  # SUCCESS or FAILED
     
     student = relationship("StudentDB", back_populates="contact_records")
 
 
+class StudentSignalDB(Base):
+    """Database model cho số liệu tín hiệu rủi ro, cập nhật dần khi thêm dữ liệu"""
+    __tablename__ = "student_signals"
+    
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    total_sessions = Column(Integer, nullable=False, default=0)
+    attended_sessions = Column(Integer, nullable=False, default=0)
+    total_assignments = Column(Integer, nullable=False, default=0)
+    submitted_assignments = Column(Integer, nullable=False, default=0)
+    total_contacts = Column(Integer, nullable=False, default=0)
+    failed_contacts = Column(Integer, nullable=False, default=0)
+    # Tăng mỗi lần có dữ liệu mới; dirty = cần đánh giá lại rủi ro
+    revision = Column(Integer, nullable=False, default=0)
+    dirty = Column(Boolean, nullable=False, default=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    student = relationship("StudentDB", back_populates="signals")
+
+
 class RiskEvaluationDB(Base):
     """Database model cho kết quả đánh giá rủi ro"""
     __tablename__ = "risk_evaluations"
@@ -108,9 +149,39 @@ class RiskEvaluationDB(Base):
     score = Column(Integer, nullable=False)
     risk_level = Column(String(20), nullable=False)  # LOW, MEDIUM, HIGH
     note = Column(Text, nullable=True)
+    # Digest của tín hiệu + cấu hình đã dùng, để bỏ qua lần đánh giá trùng lặp
+    input_digest = Column(String(40), nullable=True)
     evaluated_at = Column(DateTime, default=datetime.utcnow)
+    # Sau khi compaction: dòng này đại diện cho repeat_count lần đánh giá giống nhau
+    # liên tiếp, từ first_evaluated_at (None = chính evaluated_at) tới evaluated_at
+    first_evaluated_at = Column(DateTime, nullable=True)
+    repeat_count = Column(Integer, nullable=False, default=1)
+    # Phiên bản cấu hình hệ thống (ngưỡng rủi ro) đã dùng khi đánh giá
+    config_version = Column(Integer, nullable=True)
     
     student = relationship("StudentDB", back_populates="risk_evaluations")
+    
+    __table_args__ = (
+        # Lịch sử đánh giá của một sinh viên theo thời gian (mới nhất, keyset)
+        Index("ix_risk_evaluations_student_time", "student_id", "evaluated_at", "id"),
+    )
+
+
+class RiskEvaluationArchiveDB(Base):
+    """Database model cho đánh giá rủi ro cũ đã chuyển khỏi bảng risk_evaluations"""
+    __tablename__ = "risk_evaluations_archive"
+    
+    id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, nullable=False, index=True)
+    score = Column(Integer, nullable=False)
+    risk_level = Column(String(20), nullable=False)
+    note = Column(Text, nullable=True)
+    input_digest = Column(String(40), nullable=True)
+    evaluated_at = Column(DateTime)
+    first_evaluated_at = Column(DateTime, nullable=True)
+    repeat_count = Column(Integer, nullable=False, default=1)
+    config_version = Column(Integer, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
 
 
 class SystemConfigDB(Base):
@@ -123,6 +194,26 @@ class SystemConfigDB(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class MigrationCheckpointDB(Base):
+    """Database model cho checkpoint của lệnh migrate (trạng thái vận hành, tách khỏi system_config)"""
+    __tablename__ = "migration_checkpoints"
+    
+    source_key = Column(String(40), primary_key=True)  # sha1 của đường dẫn file nguồn
+    file_path = Column(Text, nullable=False)
+    fingerprint = Column(String(100), nullable=False)
+    records = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DataVersionDB(Base):
+    """Database model cho bộ đếm phiên bản dữ liệu, tăng trong cùng transaction với mỗi lần ghi"""
+    __tablename__ = "data_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 # Pydantic models for API
 class StudentCreate(BaseModel):
     """Model để tạo sinh viên mới"""
@@ -142,6 +233,62 @@ class StudentResponse(BaseModel):
         from_attributes = True
 
 
+class BulkEvaluationRequest(BaseModel):
+    """Model request cho đánh giá rủi ro hàng loạt"""
+    student_ids: Optional[List[str]] = Field(None, description="Danh sách mã sinh viên; bỏ trống để đánh giá tất cả")
+
+
+class BulkEvaluationResponse(BaseModel):
+    """Model response cho đánh giá rủi ro hàng loạt"""
+    evaluated: int
+    written: int
+    not_found: List[str]
+    distribution: Dict[str, int]
+    evaluated_at: datetime
+
+
+class BulkStudentRecord(BaseModel):
+    """Một sinh viên trong request nạp dữ liệu hàng loạt (sinh viên mới cần student_name)"""
+    student_id: str
+    student_name: Optional[str] = None
+    attendance: List[Attendance] = []
+    assignments: List[Assignment] = []
+    contacts: List[Contact] = []
+
+
+class BulkIngestError(BaseModel):
+    """Lỗi của một bản ghi khi nạp dữ liệu hàng loạt"""
+    index: int
+    student_id: Optional[str] = None
+    error: str
+
+
+class BulkIngestResponse(BaseModel):
+    """Model response cho nạp dữ liệu hàng loạt"""
+    records: int
+    students_created: int
+    students_updated: int
+    attendance_inserted: int
+    assignments_inserted: int
+    contacts_inserted: int
+    errors: List[BulkIngestError]
+
+
+class WhatIfRequest(BaseModel):
+    """Model request cho what-if: lưới các ngưỡng cần thử"""
+    attendance_thresholds: List[float] = Field(..., min_length=1, description="Các ngưỡng tỷ lệ đi học (0-1)")
+    assignment_thresholds: List[float] = Field(..., min_length=1, description="Các ngưỡng tỷ lệ nộp bài tập (0-1)")
+    contact_failed_thresholds: List[int] = Field(..., min_length=1, description="Các ngưỡng số lần liên lạc thất bại")
+
+
+class WhatIfResult(BaseModel):
+    """Phân bố mức rủi ro cho một bộ ngưỡng"""
+    attendance_threshold: float
+    assignment_threshold: float
+    contact_failed_threshold: int
+    distribution: Dict[str, int]
+
+
 class RiskEvaluationResponse(BaseModel):
     """Model response cho kết quả đánh giá rủi ro"""
     id: int
@@ -150,6 +297,36 @@ class RiskEvaluationResponse(BaseModel):
     risk_level: str
     note: Optional[str]
     evaluated_at: datetime
+    first_evaluated_at: Optional[datetime] = None
+    repeat_count: int = 1
+    config_version: Optional[int] = None
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+
+# Dòng cột cho đường serialize nhanh của các endpoint danh sách (không qua ORM object/response_model);
+# cùng trường và thứ tự với StudentResponse / RiskEvaluationResponse
+class StudentRow(TypedDict):
+    id: int
+    student_id: str
+    student_name: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class RiskEvaluationRow(TypedDict):
+    id: int
+    student_id: int
+    score: int
+    risk_level: str
+    note: Optional[str]
+    evaluated_at: datetime
+    first_evaluated_at: Optional[datetime]
+    repeat_count: int
+    config_version: Optional[int]
+
+
+# Dựng schema serialize một lần, dùng lại cho mọi request
+STUDENT_ROWS_ADAPTER = TypeAdapter(List[StudentRow])
+RISK_EVALUATION_ROWS_ADAPTER = TypeAdapter(List[RiskEvaluationRow]) 
\ No newline at end of file
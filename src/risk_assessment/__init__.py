@@ -1,4 +1,5 @@
 from .calculator import RiskCalculator
 from .config import RiskConfig
+from .batch import SignalBatch
 
-__all__ = ['RiskCalculator', 'RiskConfig'] 
\ No newline at end of file
+__all__ = ['RiskCalculator', 'RiskConfig', 'SignalBatch'] 
\ No newline at end of file
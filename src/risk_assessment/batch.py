@@ -0,0 +1,140 @@
+"""
+Batch Risk Scoring
+Tính toán rủi ro theo cột (NumPy) cho toàn bộ danh sách sinh viên
+"""
+
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+from src.models.student import Student
+
+
+# Bit của từng tín hiệu trong note code
+ATTENDANCE_BIT = 1
+ASSIGNMENT_BIT = 2
+CONTACT_BIT = 4
+
+
+@dataclass
+class SignalBatch:
+    """Số liệu tín hiệu của nhiều sinh viên, lưu dưới dạng mảng NumPy"""
+    student_ids: List[str]
+    attended_sessions: np.ndarray
+    total_sessions: np.ndarray
+    submitted_assignments: np.ndarray
+    total_assignments: np.ndarray
+    failed_contacts: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.student_ids)
+
+    @classmethod
+    def from_students(cls, students: Sequence[Student]) -> "SignalBatch":
+        """Đóng gói số liệu đếm của danh sách Student thành mảng"""
+        n = len(students)
+
+        def column(values):
+            return np.fromiter(values, dtype=np.int64, count=n)
+
+        return cls(
+            student_ids=[s.student_id for s in students],
+            attended_sessions=column(
+                sum(1 for a in s.attendance if a.status == "ATTEND") for s in students
+            ),
+            total_sessions=column(len(s.attendance) for s in students),
+            submitted_assignments=column(
+                sum(1 for a in s.assignments if a.submitted) for s in students
+            ),
+            total_assignments=column(len(s.assignments) for s in students),
+            failed_contacts=column(
+                sum(1 for c in s.contacts if c.status == "FAILED") for s in students
+            )
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> "SignalBatch":
+        """
+        Tạo batch từ các tuple
+        (student_id, attended, total_sessions, submitted, total_assignments, failed_contacts)
+        """
+        if not rows:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls([], empty, empty, empty, empty, empty)
+
+        student_ids, *columns = zip(*rows)
+        arrays = [np.asarray(col, dtype=np.int64) for col in columns]
+        return cls(list(student_ids), *arrays)
+
+    @classmethod
+    def concat(cls, batches: Sequence["SignalBatch"]) -> "SignalBatch":
+        """Nối nhiều batch thành một"""
+        if not batches:
+            return cls.from_rows([])
+
+        return cls(
+            student_ids=[sid for b in batches for sid in b.student_ids],
+            attended_sessions=np.concatenate([b.attended_sessions for b in batches]),
+            total_sessions=np.concatenate([b.total_sessions for b in batches]),
+            submitted_assignments=np.concatenate([b.submitted_assignments for b in batches]),
+            total_assignments=np.concatenate([b.total_assignments for b in batches]),
+            failed_contacts=np.concatenate([b.failed_contacts for b in batches])
+        )
+
+
+@dataclass
+class BatchScores:
+    """Kết quả tính toán theo cột cho một SignalBatch"""
+    attendance_risk: np.ndarray
+    assignment_risk: np.ndarray
+    contact_risk: np.ndarray
+    score: np.ndarray
+    risk_levels: np.ndarray
+    note_codes: np.ndarray
+
+
+def score_signals(
+    batch: SignalBatch,
+    attendance_threshold: float,
+    assignment_threshold: float,
+    contact_failed_threshold: int,
+    level_table: Sequence[str]
+) -> BatchScores:
+    """
+    Tính 3 tín hiệu, điểm số, mức rủi ro và note code cho cả batch
+
+    level_table[score] là mức rủi ro ứng với điểm số 0-3.
+    Note code là tổ hợp bit ATTENDANCE_BIT | ASSIGNMENT_BIT | CONTACT_BIT.
+    """
+    # Chia với mẫu số an toàn; sinh viên không có dữ liệu không bị đánh dấu
+    has_sessions = batch.total_sessions > 0
+    attendance_rate = batch.attended_sessions / np.maximum(batch.total_sessions, 1)
+    attendance_risk = has_sessions & (attendance_rate < attendance_threshold)
+
+    has_assignments = batch.total_assignments > 0
+    submission_rate = batch.submitted_assignments / np.maximum(batch.total_assignments, 1)
+    assignment_risk = has_assignments & (submission_rate < assignment_threshold)
+
+    contact_risk = batch.failed_contacts >= contact_failed_threshold
+
+    score = (
+        attendance_risk.astype(np.int8)
+        + assignment_risk.astype(np.int8)
+        + contact_risk.astype(np.int8)
+    )
+    risk_levels = np.asarray(level_table, dtype=object)[score]
+    note_codes = (
+        attendance_risk * ATTENDANCE_BIT
+        + assignment_risk * ASSIGNMENT_BIT
+        + contact_risk * CONTACT_BIT
+    ).astype(np.int8)
+
+    return BatchScores(
+        attendance_risk=attendance_risk,
+        assignment_risk=assignment_risk,
+        contact_risk=contact_risk,
+        score=score,
+        risk_levels=risk_levels,
+        note_codes=note_codes
+    )
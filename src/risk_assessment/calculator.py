@@ -1,6 +1,13 @@
-from typing import List
+from datetime import date
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
 from src.models.student import Student, RiskResult
 from src.risk_assessment.config import RiskConfig
+from src.risk_assessment.batch import (
+    SignalBatch, BatchScores, score_signals,
+    ATTENDANCE_BIT, ASSIGNMENT_BIT, CONTACT_BIT
+)
+from src.risk_assessment.windows import StudentEvents, window_bounds
 
 
 class RiskCalculator:
@@ -9,31 +16,43 @@ class RiskCalculator:
     def __init__(self, config: RiskConfig = None):
         self.config = config or RiskConfig()
     
-    def calculate_attendance_risk(self, student: Student) -> bool:
+    @staticmethod
+    def _in_window(events: list, window_days: Optional[int], as_of: Optional[date]) -> list:
+        """Lọc sự kiện trong cửa sổ window_days ngày kết thúc tại as_of (None = không lọc)"""
+        if window_days is None:
+            return events
+        
+        start, end = window_bounds(window_days, as_of or date.today())
+        return [e for e in events if start <= e.date.toordinal() <= end]
+    
+    def calculate_attendance_risk(self, student: Student, as_of: date = None) -> bool:
         """Tính toán rủi ro từ điểm danh"""
-        if not student.attendance:
+        attendance = self._in_window(student.attendance, self.config.attendance_window_days, as_of)
+        if not attendance:
             return False
         
-        total_sessions = len(student.attendance)
-        attended_sessions = sum(1 for a in student.attendance if a.status == "ATTEND")
+        total_sessions = len(attendance)
+        attended_sessions = sum(1 for a in attendance if a.status == "ATTEND")
         attendance_rate = attended_sessions / total_sessions
         
         return attendance_rate < self.config.attendance_threshold
     
-    def calculate_assignment_risk(self, student: Student) -> bool:
+    def calculate_assignment_risk(self, student: Student, as_of: date = None) -> bool:
         """Tính toán rủi ro từ bài tập"""
-        if not student.assignments:
+        assignments = self._in_window(student.assignments, self.config.assignment_window_days, as_of)
+        if not assignments:
             return False
         
-        total_assignments = len(student.assignments)
-        submitted_assignments = sum(1 for a in student.assignments if a.submitted)
+        total_assignments = len(assignments)
+        submitted_assignments = sum(1 for a in assignments if a.submitted)
         submission_rate = submitted_assignments / total_assignments
         
         return submission_rate < self.config.assignment_threshold
     
-    def calculate_contact_risk(self, student: Student) -> bool:
+    def calculate_contact_risk(self, student: Student, as_of: date = None) -> bool:
         """Tính toán rủi ro từ liên lạc"""
-        failed_contacts = sum(1 for c in student.contacts if c.status == "FAILED")
+        contacts = self._in_window(student.contacts, self.config.contact_window_days, as_of)
+        failed_contacts = sum(1 for c in contacts if c.status == "FAILED")
         return failed_contacts >= self.config.contact_failed_threshold
     
     def generate_note(self, attendance_risk: bool, assignment_risk: bool, contact_risk: bool) -> str:
@@ -52,26 +71,30 @@ class RiskCalculator:
         
         return ", ".join(risk_factors) + " risk factors"
     
-    def calculate_risk(self, student: Student, thresholds=None) -> RiskResult:
+    def get_risk_level(self, score: int, thresholds=None) -> str:
+        """Xác định mức rủi ro từ điểm số"""
+        if thresholds:
+            if score >= thresholds.high_threshold:
+                return "HIGH"
+            elif score >= thresholds.medium_threshold:
+                return "MEDIUM"
+            else:
+                return "LOW"
+        
+        # Sử dụng config mặc định
+        return self.config.get_risk_level(score)
+    
+    def calculate_risk(self, student: Student, thresholds=None, as_of: date = None) -> RiskResult:
         """Tính toán rủi ro tổng thể cho một sinh viên"""
-        attendance_risk = self.calculate_attendance_risk(student)
-        assignment_risk = self.calculate_assignment_risk(student)
-        contact_risk = self.calculate_contact_risk(student)
+        attendance_risk = self.calculate_attendance_risk(student, as_of)
+        assignment_risk = self.calculate_assignment_risk(student, as_of)
+        contact_risk = self.calculate_contact_risk(student, as_of)
         
         # Tính điểm số (0-3)
         score = sum([attendance_risk, assignment_risk, contact_risk])
         
         # Xác định mức rủi ro dựa trên ngưỡng
-        if thresholds:
-            if score >= thresholds.high_threshold:
-                risk_level = "HIGH"
-            elif score >= thresholds.medium_threshold:
-                risk_level = "MEDIUM"
-            else:
-                risk_level = "LOW"
-        else:
-            # Sử dụng config mặc định
-            risk_level = self.config.get_risk_level(score)
+        risk_level = self.get_risk_level(score, thresholds)
         
         # Tạo ghi chú
         note = self.generate_note(attendance_risk, assignment_risk, contact_risk)
@@ -83,10 +106,68 @@ class RiskCalculator:
             note=note
         )
     
-    def calculate_risks(self, students: List[Student]) -> List[RiskResult]:
-        """Tính toán rủi ro cho danh sách sinh viên"""
-        results = []
-        for student in students:
-            result = self.calculate_risk(student)
-            results.append(result)
-        return results 
\ No newline at end of file
+    def calculate_risks(self, students: List[Student], thresholds=None, as_of: date = None) -> List[RiskResult]:
+        """Tính toán rủi ro cho danh sách sinh viên (theo batch NumPy)"""
+        if self.config.has_windows():
+            # Đếm theo cửa sổ thời gian bằng mảng ngày đã sắp xếp + tổng tiền tố
+            batch = StudentEvents.from_students(students).signal_batch(self.config, as_of)
+        else:
+            batch = SignalBatch.from_students(students)
+        return self.calculate_risks_from_signals(batch, thresholds)
+    
+    def iter_risks(
+        self,
+        students: Iterable[Student],
+        batch_size: int = 5000,
+        thresholds=None,
+        as_of: date = None
+    ) -> Iterator[RiskResult]:
+        """Tính toán rủi ro theo luồng, mỗi lần một batch sinh viên"""
+        iterator = iter(students)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield from self.calculate_risks(batch, thresholds, as_of)
+    
+    def score_batch(self, batch: SignalBatch, thresholds=None) -> BatchScores:
+        """Tính tín hiệu, điểm số, mức rủi ro và note code cho cả batch"""
+        return score_signals(
+            batch,
+            attendance_threshold=self.config.attendance_threshold,
+            assignment_threshold=self.config.assignment_threshold,
+            contact_failed_threshold=self.config.contact_failed_threshold,
+            level_table=[self.get_risk_level(score, thresholds) for score in range(4)]
+        )
+    
+    def get_note_table(self) -> List[str]:
+        """Ghi chú chỉ có 8 tổ hợp: tạo sẵn một lần rồi tra theo note code"""
+        return [
+            self.generate_note(
+                bool(code & ATTENDANCE_BIT),
+                bool(code & ASSIGNMENT_BIT),
+                bool(code & CONTACT_BIT)
+            )
+            for code in range(8)
+        ]
+    
+    def calculate_risks_from_signals(self, batch: SignalBatch, thresholds=None) -> List[RiskResult]:
+        """Tính toán rủi ro từ số liệu đã đóng gói theo cột"""
+        scores = self.score_batch(batch, thresholds)
+        notes = self.get_note_table()
+        
+        # Các giá trị đã hợp lệ theo cấu trúc nên bỏ qua bước validate của pydantic
+        return [
+            RiskResult.model_construct(
+                student_id=student_id,
+                score=score,
+                risk_level=risk_level,
+                note=notes[note_code]
+            )
+            for student_id, score, risk_level, note_code in zip(
+                batch.student_ids,
+                scores.score.tolist(),
+                scores.risk_levels.tolist(),
+                scores.note_codes.tolist()
+            )
+        ] 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Optional
 
 
 @dataclass
@@ -18,6 +18,11 @@ class RiskConfig:
     # Mapping điểm số sang mức rủi ro
     score_mapping: Dict[str, str] = None
     
+    # Cửa sổ thời gian (số ngày gần nhất) cho từng tín hiệu; None = toàn bộ lịch sử
+    attendance_window_days: Optional[int] = None
+    assignment_window_days: Optional[int] = None
+    contact_window_days: Optional[int] = None
+    
     def __post_init__(self):
         if self.score_mapping is None:
             self.score_mapping = {
@@ -26,6 +31,17 @@ class RiskConfig:
                 "3": "HIGH"
             }
     
+    def has_windows(self) -> bool:
+        """Có tín hiệu nào dùng cửa sổ thời gian không"""
+        return any(
+            window is not None
+            for window in (
+                self.attendance_window_days,
+                self.assignment_window_days,
+                self.contact_window_days
+            )
+        )
+    
     def get_risk_level(self, score: int) -> str:
         """Lấy mức rủi ro dựa trên điểm số"""
         if score <= 1:
@@ -0,0 +1,53 @@
+"""
+Parallel Risk Scoring
+Chia dữ liệu thành từng chunk và tính toán rủi ro song song bằng process pool
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+from src.models.student import Student, RiskResult
+from src.risk_assessment.calculator import RiskCalculator
+from src.risk_assessment.config import RiskConfig
+
+
+def iter_chunks(items: Iterable, chunk_size: int) -> Iterator[list]:
+    """Chia một iterable thành các list có tối đa chunk_size phần tử"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def score_chunk(config: RiskConfig, records: List[dict], as_of: date = None) -> List[RiskResult]:
+    """Validate và tính toán rủi ro cho một chunk (chạy trong process con)"""
+    students = [Student(**record) for record in records]
+    return RiskCalculator(config).calculate_risks(students, as_of=as_of)
+
+
+def calculate_risks_parallel(
+    records: Iterable[dict],
+    config: RiskConfig,
+    workers: int,
+    chunk_size: int,
+    as_of: date = None
+) -> Iterator[RiskResult]:
+    """
+    Tính toán rủi ro song song, trả kết quả theo đúng thứ tự đầu vào
+
+    Chỉ giữ tối đa 2 * workers chunk đang xử lý để bộ nhớ không tăng theo kích thước đầu vào.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in iter_chunks(records, chunk_size):
+            pending.append(executor.submit(score_chunk, config, chunk, as_of))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,126 @@
+"""
+Threshold Sweep
+Đánh giá nhiều bộ ngưỡng RiskConfig trên cùng một tập sinh viên mà không cần tính lại từng người
+"""
+
+from itertools import product
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.risk_assessment.batch import SignalBatch
+from src.risk_assessment.config import RiskConfig
+
+
+def build_grid(
+    attendance_thresholds: Sequence[float],
+    assignment_thresholds: Sequence[float],
+    contact_thresholds: Sequence[int]
+) -> List[RiskConfig]:
+    """Tạo lưới RiskConfig từ tích Descartes của các ngưỡng"""
+    return [
+        RiskConfig(
+            attendance_threshold=attendance,
+            assignment_threshold=assignment,
+            contact_failed_threshold=contact
+        )
+        for attendance, assignment, contact in product(
+            attendance_thresholds, assignment_thresholds, contact_thresholds
+        )
+    ]
+
+
+def _prefix(counts: np.ndarray, axis: int, size: int) -> np.ndarray:
+    """counts[..., k, ...] -> tổng các bucket <= k (k < size) dọc theo axis"""
+    return np.take(np.cumsum(counts, axis=axis), np.arange(size), axis=axis)
+
+
+def _suffix(counts: np.ndarray, axis: int, size: int) -> np.ndarray:
+    """counts[..., k, ...] -> tổng các bucket > k (k < size) dọc theo axis"""
+    reversed_cumsum = np.flip(np.cumsum(np.flip(counts, axis=axis), axis=axis), axis=axis)
+    return np.take(reversed_cumsum, np.arange(1, size + 1), axis=axis)
+
+
+class ThresholdSweep:
+    """
+    Tính phân bố mức rủi ro cho nhiều bộ ngưỡng trong một lượt
+
+    Tỷ lệ đi học, tỷ lệ nộp bài và số liên lạc thất bại được tính một lần.
+    Với mỗi trục ngưỡng, vị trí của từng sinh viên được xác định bằng binary
+    search trên mảng ngưỡng đã sắp xếp; số sinh viên theo từng tổ hợp tín hiệu
+    sau đó là tổng tiền tố của một histogram 3 chiều, nên mỗi điểm lưới có giá O(1).
+    """
+
+    def __init__(self, batch: SignalBatch):
+        self.size = len(batch)
+        self.has_sessions = batch.total_sessions > 0
+        self.attendance_rate = batch.attended_sessions / np.maximum(batch.total_sessions, 1)
+        self.has_assignments = batch.total_assignments > 0
+        self.submission_rate = batch.submitted_assignments / np.maximum(batch.total_assignments, 1)
+        self.failed_contacts = batch.failed_contacts
+
+    def score_counts(self, configs: Sequence[RiskConfig]) -> np.ndarray:
+        """Trả về mảng (len(configs), 4): số sinh viên có điểm 0, 1, 2, 3 cho từng config"""
+        attendance_values = np.unique([c.attendance_threshold for c in configs])
+        assignment_values = np.unique([c.assignment_threshold for c in configs])
+        contact_values = np.unique([c.contact_failed_threshold for c in configs])
+        na, nb, nc = len(attendance_values), len(assignment_values), len(contact_values)
+
+        # Bucket = số ngưỡng <= giá trị; tín hiệu bật tại ngưỡng thứ k khi k >= bucket
+        # (tỷ lệ < ngưỡng). Sinh viên không có dữ liệu nằm ở bucket cuối, không bao giờ bật.
+        attendance_bucket = np.where(
+            self.has_sessions,
+            np.searchsorted(attendance_values, self.attendance_rate, side="right"),
+            na
+        )
+        assignment_bucket = np.where(
+            self.has_assignments,
+            np.searchsorted(assignment_values, self.submission_rate, side="right"),
+            nb
+        )
+        # Liên lạc: tín hiệu bật tại ngưỡng thứ k khi k < bucket (số thất bại >= ngưỡng)
+        contact_bucket = np.searchsorted(contact_values, self.failed_contacts, side="right")
+
+        shape = (na + 1, nb + 1, nc + 1)
+        flat_index = np.ravel_multi_index((attendance_bucket, assignment_bucket, contact_bucket), shape)
+        histogram = np.bincount(flat_index, minlength=int(np.prod(shape))).reshape(shape)
+
+        def count(attendance: bool, assignment: bool, contact: bool) -> np.ndarray:
+            """Số sinh viên có các tín hiệu được chọn đều bật, cho mọi điểm lưới"""
+            counts = histogram
+            counts = _prefix(counts, 0, na) if attendance else counts.sum(axis=0, keepdims=True)
+            counts = _prefix(counts, 1, nb) if assignment else counts.sum(axis=1, keepdims=True)
+            counts = _suffix(counts, 2, nc) if contact else counts.sum(axis=2, keepdims=True)
+            return np.broadcast_to(counts, (na, nb, nc)).astype(np.int64)
+
+        n_a, n_b, n_c = count(True, False, False), count(False, True, False), count(False, False, True)
+        n_ab, n_ac, n_bc = count(True, True, False), count(True, False, True), count(False, True, True)
+        n_abc = count(True, True, True)
+
+        # Inclusion-exclusion để ra số sinh viên theo đúng từng điểm số
+        exactly_3 = n_abc
+        exactly_2 = n_ab + n_ac + n_bc - 3 * n_abc
+        exactly_1 = n_a + n_b + n_c - 2 * (n_ab + n_ac + n_bc) + 3 * n_abc
+        exactly_0 = self.size - exactly_1 - exactly_2 - exactly_3
+        cube = np.stack([exactly_0, exactly_1, exactly_2, exactly_3], axis=-1)
+
+        index = (
+            np.searchsorted(attendance_values, [c.attendance_threshold for c in configs]),
+            np.searchsorted(assignment_values, [c.assignment_threshold for c in configs]),
+            np.searchsorted(contact_values, [c.contact_failed_threshold for c in configs])
+        )
+        return cube[index]
+
+    def evaluate(self, configs: Sequence[RiskConfig], level_table: Sequence[str]) -> List[Dict[str, int]]:
+        """Phân bố mức rủi ro cho từng config; level_table[score] là mức rủi ro của điểm 0-3"""
+        if not configs:
+            return []
+
+        distributions = []
+        for counts in self.score_counts(configs).tolist():
+            distribution = {level: 0 for level in dict.fromkeys(level_table)}
+            for score, count in enumerate(counts):
+                distribution[level_table[score]] += count
+            distributions.append(distribution)
+
+        return distributions
@@ -0,0 +1,123 @@
+"""
+Rolling Window Signals
+Đếm sự kiện trong "N ngày gần nhất" bằng mảng ngày đã sắp xếp và tổng tiền tố
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.models.student import Student
+from src.risk_assessment.batch import SignalBatch
+from src.risk_assessment.config import RiskConfig
+
+
+# Khoảng cách giữa các sinh viên trong khoá (student_index, ngày); lớn hơn date.max.toordinal()
+DAY_KEY_SPAN = 1 << 22
+
+
+def window_bounds(window_days: int, as_of: date) -> Tuple[int, int]:
+    """Khoảng ngày (ordinal, bao gồm hai đầu) của cửa sổ window_days ngày kết thúc tại as_of"""
+    end = as_of.toordinal()
+    return end - window_days + 1, end
+
+
+@dataclass
+class EventSeries:
+    """
+    Sự kiện của nhiều sinh viên, sắp xếp theo (sinh viên, ngày)
+
+    keys[k] = student_index * DAY_KEY_SPAN + ngày, nên mọi sinh viên nằm trong
+    một mảng đã sắp xếp duy nhất; hits_prefix[k] là số sự kiện "trúng" (ATTEND,
+    đã nộp, FAILED) trong k phần tử đầu.
+    """
+    size: int
+    keys: np.ndarray
+    hits_prefix: np.ndarray
+
+    @classmethod
+    def from_arrays(cls, size: int, student_index, days, hits) -> "EventSeries":
+        """Tạo từ các mảng phẳng chưa sắp xếp (chỉ số sinh viên, ngày ordinal, cờ trúng)"""
+        student_index = np.asarray(student_index, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int64)
+        hits = np.asarray(hits, dtype=np.int64)
+
+        keys = student_index * DAY_KEY_SPAN + days
+        order = np.argsort(keys, kind="stable")
+        hits_prefix = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(hits[order], out=hits_prefix[1:])
+
+        return cls(size=size, keys=keys[order], hits_prefix=hits_prefix)
+
+    def counts(self, start_day: Optional[int] = None, end_day: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Số sự kiện và số sự kiện trúng của từng sinh viên trong [start_day, end_day]
+
+        Mỗi sinh viên chỉ cần hai lần binary search, không quét lại lịch sử.
+        Ngày bắt đầu được chặn ở 0: cửa sổ dài hơn ordinal của as_of không được
+        lấn sang khoảng khoá của sinh viên đứng trước. Khoảng rỗng (start_day >
+        end_day, ví dụ window_days <= 0) cho số đếm 0 thay vì số âm.
+        """
+        base = np.arange(self.size, dtype=np.int64) * DAY_KEY_SPAN
+        low = np.searchsorted(self.keys, base + (0 if start_day is None else max(start_day, 0)), side="left")
+        high = np.searchsorted(
+            self.keys,
+            base + (DAY_KEY_SPAN - 1 if end_day is None else end_day),
+            side="right"
+        )
+        high = np.maximum(high, low)
+        return high - low, self.hits_prefix[high] - self.hits_prefix[low]
+
+
+@dataclass
+class StudentEvents:
+    """Lịch sử điểm danh, bài tập và liên lạc của một danh sách sinh viên"""
+    student_ids: List[str]
+    attendance: EventSeries
+    assignments: EventSeries
+    contacts: EventSeries
+
+    @classmethod
+    def from_students(cls, students: Sequence[Student]) -> "StudentEvents":
+        """Đóng gói lịch sử của danh sách Student"""
+        def series(events_of, is_hit):
+            index, days, hits = [], [], []
+            for i, student in enumerate(students):
+                for event in events_of(student):
+                    index.append(i)
+                    days.append(event.date.toordinal())
+                    hits.append(is_hit(event))
+            return EventSeries.from_arrays(len(students), index, days, hits)
+
+        return cls(
+            student_ids=[s.student_id for s in students],
+            attendance=series(lambda s: s.attendance, lambda a: a.status == "ATTEND"),
+            assignments=series(lambda s: s.assignments, lambda a: a.submitted),
+            contacts=series(lambda s: s.contacts, lambda c: c.status == "FAILED")
+        )
+
+    def signal_batch(self, config: RiskConfig, as_of: Optional[date] = None) -> SignalBatch:
+        """
+        SignalBatch với mỗi tín hiệu đếm trong cửa sổ của nó (hoặc toàn bộ lịch sử nếu không đặt cửa sổ)
+        """
+        as_of = as_of or date.today()
+
+        def counts(series: EventSeries, window_days: Optional[int]):
+            if window_days is None:
+                return series.counts()
+            return series.counts(*window_bounds(window_days, as_of))
+
+        total_sessions, attended_sessions = counts(self.attendance, config.attendance_window_days)
+        total_assignments, submitted_assignments = counts(self.assignments, config.assignment_window_days)
+        _, failed_contacts = counts(self.contacts, config.contact_window_days)
+
+        return SignalBatch(
+            student_ids=list(self.student_ids),
+            attended_sessions=attended_sessions,
+            total_sessions=total_sessions,
+            submitted_assignments=submitted_assignments,
+            total_assignments=total_assignments,
+            failed_contacts=failed_contacts
+        )
@@ -0,0 +1,190 @@
+"""
+Risk Evaluation Compaction
+Gộp các đánh giá rủi ro giống nhau liên tiếp và chuyển lịch sử cũ sang bảng archive
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import bindparam, delete, insert, select, text, tuple_, update
+from sqlalchemy.orm import Session
+
+from src.models.student import RiskEvaluationDB, RiskEvaluationArchiveDB, StudentDB
+from src.services.student_service import IN_CLAUSE_CHUNK_SIZE
+from src.services.version_service import VersionService
+
+# Số dòng đọc mỗi lần khi quét bảng risk_evaluations
+COMPACTION_READ_SIZE = 10000
+
+# Các cột được chép sang bảng archive
+ARCHIVE_COLUMNS = (
+    "id", "student_id", "score", "risk_level", "note", "input_digest",
+    "evaluated_at", "first_evaluated_at", "repeat_count", "config_version"
+)
+
+
+class CompactionService:
+    """Service để thu gọn bảng risk_evaluations"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def compact(self, retention_days: Optional[int] = None, vacuum: bool = False) -> dict:
+        """
+        Chạy toàn bộ quy trình compaction và trả về thống kê
+        
+        1. Gộp các đánh giá liên tiếp giống nhau (score, risk_level, note) của cùng
+           sinh viên thành một dòng: giữ dòng cuối cùng, ghi lại first_evaluated_at
+           và repeat_count.
+        2. Nếu có retention_days: chuyển các dòng cũ hơn sang risk_evaluations_archive
+           (đánh giá mới nhất của mỗi sinh viên luôn được giữ lại).
+        3. ANALYZE (và VACUUM nếu vacuum=True) để cập nhật thống kê, trả lại dung lượng.
+        """
+        collapsed = self.collapse_runs()
+        archived = self.archive_older_than(retention_days) if retention_days is not None else 0
+        
+        if archived:
+            VersionService(self.db).bump()
+        self.db.commit()
+        
+        self.optimize(vacuum=vacuum)
+        
+        return {
+            "collapsed": collapsed,
+            "archived": archived,
+            "remaining": self.db.query(RiskEvaluationDB.id).count()
+        }
+    
+    def collapse_runs(self) -> int:
+        """
+        Gộp các đánh giá giống nhau liên tiếp, trả về số dòng đã xoá
+        
+        Bảng được quét theo từng trang COMPACTION_READ_SIZE dòng (keyset trên index
+        (student_id, evaluated_at, id)); mỗi trang được ghi và commit riêng nên bộ nhớ
+        và kích thước transaction không phụ thuộc kích thước bảng. Dòng đại diện của run
+        còn dở ở cuối trang cũng được ghi, nên dữ liệu đã commit luôn nhất quán.
+        """
+        key_columns = (RiskEvaluationDB.student_id, RiskEvaluationDB.evaluated_at, RiskEvaluationDB.id)
+        query = select(
+            *key_columns,
+            RiskEvaluationDB.score,
+            RiskEvaluationDB.risk_level,
+            RiskEvaluationDB.note,
+            RiskEvaluationDB.first_evaluated_at,
+            RiskEvaluationDB.repeat_count
+        ).order_by(*key_columns).limit(COMPACTION_READ_SIZE)
+        
+        collapsed = 0
+        run = None
+        last_key = None
+        while True:
+            page_query = query
+            if last_key is not None:
+                page_query = query.where(tuple_(*key_columns) > tuple_(*last_key))
+            rows = self.db.execute(page_query).all()
+            if not rows:
+                break
+            last_key = (rows[-1].student_id, rows[-1].evaluated_at, rows[-1].id)
+            
+            merged = []
+            deleted_ids = []
+            for row in rows:
+                key = (row.student_id, row.score, row.risk_level, row.note)
+                if run is not None and run["key"] == key:
+                    # Dòng trước thuộc cùng run: xoá nó, dòng hiện tại đại diện cho cả run
+                    deleted_ids.append(run["id"])
+                    run["id"] = row.id
+                    run["repeat_count"] += row.repeat_count or 1
+                    run["size"] += 1
+                    continue
+                
+                if run is not None and run["size"] > 1:
+                    merged.append(dict(run))
+                run = {
+                    "key": key,
+                    "id": row.id,
+                    "first_evaluated_at": row.first_evaluated_at or row.evaluated_at,
+                    "repeat_count": row.repeat_count or 1,
+                    "size": 1
+                }
+            if run is not None and run["size"] > 1:
+                merged.append(dict(run))
+            
+            self._write_runs(merged, deleted_ids)
+            collapsed += len(deleted_ids)
+        
+        return collapsed
+    
+    def _write_runs(self, merged: List[dict], deleted_ids: List[int]):
+        """Ghi dòng đại diện của các run, xoá các dòng đã gộp và commit (một trang quét)"""
+        if not deleted_ids:
+            return
+        
+        table = RiskEvaluationDB.__table__
+        self.db.execute(
+            update(table).where(table.c.id == bindparam("b_id")).values(
+                first_evaluated_at=bindparam("b_first_evaluated_at"),
+                repeat_count=bindparam("b_repeat_count")
+            ),
+            [
+                {
+                    "b_id": run["id"],
+                    "b_first_evaluated_at": run["first_evaluated_at"],
+                    "b_repeat_count": run["repeat_count"]
+                }
+                for run in merged
+            ]
+        )
+        self._delete_ids(deleted_ids)
+        
+        version_service = VersionService(self.db)
+        version_service.bump()
+        version_service.bump_students({run["key"][0] for run in merged})
+        self.db.commit()
+    
+    def archive_older_than(self, retention_days: int) -> int:
+        """
+        Chuyển các đánh giá cũ hơn retention_days ngày sang bảng archive (chưa commit)
+        
+        Đánh giá mà StudentDB.latest_evaluation_id đang trỏ tới không bao giờ bị chuyển.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        latest_ids = select(StudentDB.latest_evaluation_id).where(
+            StudentDB.latest_evaluation_id.is_not(None)
+        )
+        expired = (
+            (RiskEvaluationDB.evaluated_at < cutoff) &
+            RiskEvaluationDB.id.not_in(latest_ids)
+        )
+        
+        columns = [getattr(RiskEvaluationDB, name) for name in ARCHIVE_COLUMNS]
+        self.db.execute(
+            insert(RiskEvaluationArchiveDB).from_select(
+                list(ARCHIVE_COLUMNS), select(*columns).where(expired)
+            )
+        )
+        archived = self.db.execute(
+            delete(RiskEvaluationDB).where(expired).returning(
+                RiskEvaluationDB.student_id
+            ).execution_options(synchronize_session=False)
+        ).scalars().all()
+        VersionService(self.db).bump_students(set(archived))
+        return len(archived)
+    
+    def optimize(self, vacuum: bool = False):
+        """ANALYZE (và VACUUM) database của session; chạy ngoài transaction"""
+        bind = self.db.get_bind()
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if vacuum and bind.dialect.name == "sqlite":
+                conn.execute(text("VACUUM"))
+            conn.execute(text("ANALYZE"))
+    
+    def _delete_ids(self, ids: List[int]):
+        """Xoá các dòng risk_evaluations theo id, chia nhỏ mệnh đề IN"""
+        for start in range(0, len(ids), IN_CLAUSE_CHUNK_SIZE):
+            chunk = ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+            self.db.execute(
+                delete(RiskEvaluationDB).where(
+                    RiskEvaluationDB.id.in_(chunk)
+                ).execution_options(synchronize_session=False)
+            )
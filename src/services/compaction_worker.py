@@ -0,0 +1,69 @@
+"""
+Scheduled Compaction Worker
+Định kỳ thu gọn bảng risk_evaluations (bật bằng biến môi trường RISK_COMPACTION_INTERVAL)
+"""
+
+import asyncio
+import logging
+import os
+
+from src.database.database import SessionLocal
+from src.services.compaction_service import CompactionService
+
+logger = logging.getLogger(__name__)
+
+
+class CompactionWorker:
+    """Worker chạy nền, gọi CompactionService.compact theo chu kỳ"""
+
+    def __init__(self, interval: float = None, retention_days: int = None, vacuum: bool = None):
+        self.interval = interval or compaction_interval()
+        if retention_days is None and os.getenv("RISK_RETENTION_DAYS"):
+            retention_days = int(os.getenv("RISK_RETENTION_DAYS"))
+        self.retention_days = retention_days
+        if vacuum is None:
+            vacuum = os.getenv("RISK_COMPACTION_VACUUM", "0").lower() in ("1", "true", "yes")
+        self.vacuum = vacuum
+        self._task = None
+
+    def run_once(self) -> dict:
+        """Chạy compaction một lần với session riêng"""
+        db = SessionLocal()
+        try:
+            return CompactionService(db).compact(retention_days=self.retention_days, vacuum=self.vacuum)
+        finally:
+            db.close()
+
+    async def run(self):
+        """Vòng lặp chính: chạy compaction trong thread riêng để không chặn event loop"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                summary = await asyncio.to_thread(self.run_once)
+                if summary["collapsed"] or summary["archived"]:
+                    logger.info(
+                        "Compaction: gộp %d, archive %d, còn %d đánh giá",
+                        summary["collapsed"], summary["archived"], summary["remaining"]
+                    )
+            except Exception:
+                logger.exception("Lỗi khi compaction")
+
+    def start(self):
+        """Khởi động worker trên event loop hiện tại"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Dừng worker"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def compaction_interval() -> float:
+    """Chu kỳ compaction (giây) từ RISK_COMPACTION_INTERVAL; 0 hoặc không đặt = tắt"""
+    return float(os.getenv("RISK_COMPACTION_INTERVAL", "0"))
@@ -1,10 +1,14 @@
 import json
-from typing import Optional
+from typing import Optional, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from src.models.student import SystemConfigDB
 from src.models.config import SystemConfig, RiskThresholdConfig, ConfigUpdateRequest
+from src.services.version_service import VersionService, VersionedCache, CONFIG_VERSION
+
+# Cấu hình đã parse, dùng chung trong process cho tới khi phiên bản cấu hình thay đổi
+_config_cache = VersionedCache()
 
 
 class ConfigService:
@@ -27,9 +31,22 @@ class ConfigService:
         )
     
     def get_config(self) -> SystemConfig:
-        """Lấy cấu hình hiện tại từ database"""
+        """
+        Lấy cấu hình hiện tại (đối tượng dùng chung trong cache, không sửa trực tiếp)
+        
+        Mỗi lần gọi chỉ đọc dòng phiên bản cấu hình; chỉ query, parse JSON và validate lại
+        khi phiên bản thay đổi (kể cả do worker/process khác ghi).
+        """
+        return self.get_versioned_config()[1]
+    
+    def get_versioned_config(self) -> Tuple[int, SystemConfig]:
+        """Lấy (phiên bản cấu hình, cấu hình hiện tại)"""
+        version = VersionService(self.db).get_version(CONFIG_VERSION)
+        return version, _config_cache.get("system_config", version, self._load_config)
+    
+    def _load_config(self) -> SystemConfig:
+        """Đọc cấu hình từ database; chưa có thì dùng mặc định (không ghi trong lúc đọc)"""
         try:
-            # Lấy cấu hình từ database
             config_record = self.db.query(SystemConfigDB).filter(
                 SystemConfigDB.config_key == "system_config"
             ).first()
@@ -37,11 +54,7 @@ class ConfigService:
             if config_record:
                 config_data = json.loads(config_record.config_value)
                 return SystemConfig(**config_data)
-            else:
-                # Tạo cấu hình mặc định nếu chưa có
-                default_config = self.get_default_config()
-                self.save_config(default_config)
-                return default_config
+            return self.get_default_config()
                 
         except Exception as e:
             print(f"Lỗi khi lấy cấu hình: {e}")
@@ -67,6 +80,7 @@ class ConfigService:
                 )
                 self.db.add(new_config)
             
+            VersionService(self.db).bump(CONFIG_VERSION)
             self.db.commit()
             return True
             
@@ -78,7 +92,8 @@ class ConfigService:
     def update_config(self, update_request: ConfigUpdateRequest) -> Optional[SystemConfig]:
         """Cập nhật cấu hình"""
         try:
-            current_config = self.get_config()
+            # Bản sao: không sửa đối tượng đang nằm trong cache
+            current_config = self.get_config().model_copy(deep=True)
             
             # Cập nhật các trường được cung cấp
             if update_request.risk_thresholds:
@@ -108,6 +123,11 @@ class ConfigService:
         config = self.get_config()
         return config.risk_thresholds
     
+    def get_versioned_thresholds(self) -> Tuple[int, RiskThresholdConfig]:
+        """Lấy (phiên bản cấu hình, ngưỡng rủi ro) để gắn phiên bản vào kết quả đánh giá"""
+        version, config = self.get_versioned_config()
+        return version, config.risk_thresholds
+    
     def reset_to_default(self) -> bool:
         """Reset về cấu hình mặc định"""
         default_config = self.get_default_config()
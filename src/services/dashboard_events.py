@@ -0,0 +1,193 @@
+"""
+Dashboard Event Stream
+Một producer dùng chung theo dõi phiên bản dữ liệu và đẩy sự kiện (SSE) tới mọi dashboard đang mở
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import List, Optional, Set
+
+from src.database.database import ReadSessionLocal
+from src.models.student import RiskEvaluationDB, StudentDB
+from src.services.risk_service import RiskService
+from src.services.version_service import VersionService
+
+logger = logging.getLogger(__name__)
+
+# Số sự kiện tối đa chờ gửi cho mỗi client; client chậm sẽ mất sự kiện cũ nhất
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Số đánh giá rủi ro cao mới tối đa trong một sự kiện high_risk
+HIGH_RISK_EVENT_LIMIT = 50
+
+# Các trường thống kê được tính delta giữa hai sự kiện stats
+STATS_COUNTERS = ("total_students", "high_risk_count", "medium_risk_count", "low_risk_count")
+
+
+def format_sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    """Đóng gói một sự kiện theo định dạng text/event-stream"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, default=str, ensure_ascii=False))
+    return "\n".join(lines) + "\n\n"
+
+
+class DashboardEventBroker:
+    """
+    Producer duy nhất của mỗi process, fan-out sự kiện tới các hàng đợi của client
+
+    Mỗi chu kỳ chỉ đọc một dòng data_versions (và chỉ khi có client); thống kê và
+    đánh giá rủi ro cao mới chỉ được truy vấn khi phiên bản dữ liệu thay đổi, nên chi phí
+    tăng theo số lần ghi chứ không theo số dashboard đang mở.
+
+    Trạng thái đã gửi (_version, _stats, _last_high_id) được đọc/ghi từ thread của producer
+    (poll) và thread của từng client mới (initial_event), nên luôn được giữ bởi _lock.
+    """
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or float(os.getenv("DASHBOARD_EVENTS_INTERVAL", "1"))
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task = None
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        """Quên trạng thái đã gửi (khi không còn client nào)"""
+        with self._lock:
+            self._version = None
+            self._stats = None
+            self._last_high_id = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """Đăng ký một client mới; producer được khởi động khi cần"""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        self.start()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Huỷ đăng ký client"""
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            self._reset_state()
+
+    def publish(self, message: str):
+        """Gửi một sự kiện tới mọi client (chạy trên event loop)"""
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def initial_event(self) -> str:
+        """Sự kiện stats đầy đủ cho client vừa kết nối (chạy trong thread)"""
+        db = ReadSessionLocal()
+        try:
+            with self._lock:
+                version = VersionService(db).get_version()
+                stats = RiskService(db).get_dashboard_stats()
+                if self._version is None:
+                    # Producer chưa có mốc: lấy luôn trạng thái vừa gửi để không gửi trùng
+                    self._version, self._stats = version, stats
+                    self._new_high_risk(db)
+        finally:
+            db.close()
+        return format_sse("stats", {"version": version, "stats": stats, "delta": None}, event_id=version)
+
+    def poll(self) -> List[str]:
+        """Kiểm tra phiên bản dữ liệu, trả về các sự kiện cần gửi (chạy trong thread)"""
+        db = ReadSessionLocal()
+        try:
+            with self._lock:
+                version = VersionService(db).get_version()
+                if version == self._version:
+                    return []
+
+                messages = []
+                stats = RiskService(db).get_dashboard_stats()
+                if stats != self._stats:
+                    delta = None
+                    if self._stats is not None:
+                        delta = {name: stats[name] - self._stats[name] for name in STATS_COUNTERS}
+                    messages.append(format_sse("stats", {"version": version, "stats": stats, "delta": delta}, event_id=version))
+
+                evaluations = self._new_high_risk(db)
+                if evaluations:
+                    messages.append(format_sse("high_risk", {"version": version, "evaluations": evaluations}, event_id=version))
+
+                self._version = version
+                self._stats = stats
+                return messages
+        finally:
+            db.close()
+
+    def _new_high_risk(self, db) -> List[dict]:
+        """Các đánh giá HIGH thêm sau lần kiểm tra trước, mới nhất trước (người gọi giữ _lock)"""
+        if self._last_high_id is None:
+            # Lần đầu chỉ ghi nhận mốc, không gửi lại lịch sử
+            self._last_high_id = db.query(RiskEvaluationDB.id).order_by(RiskEvaluationDB.id.desc()).limit(1).scalar() or 0
+            return []
+
+        rows = db.query(
+            RiskEvaluationDB.id,
+            StudentDB.student_id,
+            StudentDB.student_name,
+            RiskEvaluationDB.score,
+            RiskEvaluationDB.note,
+            RiskEvaluationDB.evaluated_at
+        ).join(
+            StudentDB, StudentDB.id == RiskEvaluationDB.student_id
+        ).filter(
+            RiskEvaluationDB.id > self._last_high_id,
+            RiskEvaluationDB.risk_level == "HIGH"
+        ).order_by(RiskEvaluationDB.id.desc()).limit(HIGH_RISK_EVENT_LIMIT).all()
+
+        if rows:
+            self._last_high_id = rows[0].id
+        return [
+            {
+                "id": row.id,
+                "student_id": row.student_id,
+                "student_name": row.student_name,
+                "score": row.score,
+                "risk_level": "HIGH",
+                "note": row.note,
+                "evaluated_at": row.evaluated_at.isoformat()
+            }
+            for row in rows
+        ]
+
+    async def run(self):
+        """Vòng lặp producer: chạy poll trong thread riêng để không chặn event loop"""
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self._subscribers:
+                continue
+            try:
+                for message in await asyncio.to_thread(self.poll):
+                    self.publish(message)
+            except Exception:
+                logger.exception("Lỗi khi theo dõi dữ liệu dashboard")
+
+    def start(self):
+        """Khởi động producer trên event loop hiện tại"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Dừng producer"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Producer dùng chung cho mọi kết nối SSE của process
+dashboard_events = DashboardEventBroker()
@@ -0,0 +1,91 @@
+"""
+Streaming CSV Export
+Xuất đánh giá rủi ro mới nhất của mọi sinh viên ra CSV theo luồng, bộ nhớ không đổi
+"""
+
+import csv
+import io
+from typing import Iterator, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.models.student import RiskEvaluationDB, StudentDB
+
+# Cột của file CSV export
+EXPORT_CSV_COLUMNS = ['Student ID', 'Student Name', 'Score', 'Risk Level', 'Note', 'Evaluated At']
+
+# Số dòng đọc từ database (và ghi ra mỗi chunk) mỗi lần
+EXPORT_READ_SIZE = 1000
+
+
+class ExportService:
+    """Service để export kết quả đánh giá rủi ro"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def iter_rows(self) -> Iterator[list]:
+        """
+        Một dòng CSV cho mỗi sinh viên, theo thứ tự id
+        
+        Một câu query LEFT JOIN qua StudentDB.latest_evaluation_id, đọc theo từng lô
+        yield_per thay vì một query đánh giá cho mỗi sinh viên.
+        """
+        query = select(
+            StudentDB.student_id,
+            StudentDB.student_name,
+            RiskEvaluationDB.score,
+            RiskEvaluationDB.risk_level,
+            RiskEvaluationDB.note,
+            RiskEvaluationDB.evaluated_at
+        ).outerjoin(
+            RiskEvaluationDB, RiskEvaluationDB.id == StudentDB.latest_evaluation_id
+        ).order_by(StudentDB.id).execution_options(yield_per=EXPORT_READ_SIZE)
+        
+        for row in self.db.execute(query):
+            if row.risk_level is None:
+                # Sinh viên chưa được đánh giá
+                yield [row.student_id, row.student_name, 'N/A', 'N/A', 'Chưa được đánh giá', 'N/A']
+            else:
+                yield [
+                    row.student_id,
+                    row.student_name,
+                    row.score,
+                    row.risk_level,
+                    row.note,
+                    row.evaluated_at.strftime('%Y-%m-%d %H:%M:%S')
+                ]
+    
+    def iter_csv(self) -> Iterator[str]:
+        """Nội dung CSV theo từng chunk EXPORT_READ_SIZE dòng (cho StreamingResponse)"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_CSV_COLUMNS)
+        
+        pending = 0
+        for row in self.iter_rows():
+            writer.writerow(row)
+            pending += 1
+            if pending >= EXPORT_READ_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        
+        yield buffer.getvalue()
+    
+    def write_csv(self, output_path: str) -> Tuple[int, int]:
+        """Ghi CSV ra file theo luồng, trả về (tổng số sinh viên, số đã đánh giá)"""
+        total = 0
+        evaluated = 0
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_CSV_COLUMNS)
+            for row in self.iter_rows():
+                writer.writerow(row)
+                total += 1
+                if row[2] != 'N/A':
+                    evaluated += 1
+        
+        return total, evaluated
@@ -0,0 +1,74 @@
+"""
+Background Re-scoring Worker
+Định kỳ đánh giá lại rủi ro cho các sinh viên có dữ liệu mới (dirty)
+"""
+
+import asyncio
+import logging
+import os
+
+from src.database.database import SessionLocal
+from src.services.risk_service import RiskService
+
+logger = logging.getLogger(__name__)
+
+
+class RescoreWorker:
+    """
+    Worker chạy nền, xử lý các sinh viên dirty theo từng batch
+
+    Mỗi process (mỗi worker uvicorn) có thể chạy một worker: RiskService.rescore_dirty_students
+    nhận batch bằng UPDATE ... RETURNING trong transaction ghi, nên các process không đánh giá
+    trùng sinh viên. Đặt RISK_RESCORE_ENABLED=0 để tắt worker ở một process.
+    """
+
+    def __init__(self, interval: float = None, batch_size: int = None):
+        self.interval = interval or float(os.getenv("RISK_RESCORE_INTERVAL", "5"))
+        self.batch_size = batch_size or int(os.getenv("RISK_RESCORE_BATCH_SIZE", "500"))
+        self._task = None
+
+    def drain(self) -> int:
+        """Xử lý hết các sinh viên dirty hiện có, trả về tổng số đã đánh giá lại"""
+        db = SessionLocal()
+        try:
+            risk_service = RiskService(db)
+            total = 0
+            while True:
+                processed = risk_service.rescore_dirty_students(self.batch_size)
+                total += processed
+                if processed < self.batch_size:
+                    return total
+        finally:
+            db.close()
+
+    async def run(self):
+        """Vòng lặp chính: chạy drain trong thread riêng để không chặn event loop"""
+        while True:
+            try:
+                processed = await asyncio.to_thread(self.drain)
+                if processed:
+                    logger.info("Đã đánh giá lại rủi ro cho %d sinh viên", processed)
+            except Exception:
+                logger.exception("Lỗi khi đánh giá lại rủi ro")
+
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Khởi động worker trên event loop hiện tại"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Dừng worker"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def rescore_worker_enabled() -> bool:
+    """Cho phép tắt worker bằng biến môi trường RISK_RESCORE_ENABLED=0"""
+    return os.getenv("RISK_RESCORE_ENABLED", "1").lower() not in ("0", "false", "no")
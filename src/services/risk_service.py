@@ -1,12 +1,24 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+import hashlib
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import exists, func, insert, select, update, bindparam, tuple_
 from datetime import datetime
 
-from src.models.student import RiskEvaluationDB, RiskEvaluationResponse
+from src.models.student import (
+    RiskEvaluationDB, RiskEvaluationResponse, RiskEvaluationRow, StudentDB, StudentSignalDB
+)
+from src.risk_assessment.batch import SignalBatch
 from src.risk_assessment.calculator import RiskCalculator
 from src.risk_assessment.config import RiskConfig
-from src.services.student_service import StudentService
+from src.risk_assessment.sweep import ThresholdSweep, build_grid
+from src.services.student_service import StudentService, IN_CLAUSE_CHUNK_SIZE, RISK_LEVEL_ORDER, risk_rank
+from src.services.version_service import VersionService, VersionedCache
+
+# Thống kê dashboard, tính lại khi phiên bản dữ liệu thay đổi
+_stats_cache = VersionedCache()
+
+# Các cột đọc khi as_rows=True (đúng các trường của RiskEvaluationRow)
+EVALUATION_ROW_COLUMNS = tuple(getattr(RiskEvaluationDB, name) for name in RiskEvaluationRow.__annotations__)
 
 
 class RiskService:
@@ -19,119 +31,520 @@ class RiskService:
     
     def predict_dropout_risk(self, student_id: str, config: RiskConfig = None) -> RiskEvaluationDB:
         """Dự đoán rủi ro bỏ học cho sinh viên"""
-        # Lấy hồ sơ sinh viên
-        student_profile = self.student_service.get_student_profile(student_id)
-        if not student_profile:
+        # Chỉ đọc dòng tổng hợp tín hiệu, không tải lịch sử điểm danh/bài tập/liên lạc
+        signals = self.student_service.get_student_signals(student_id)
+        if not signals:
             raise ValueError(f"Không tìm thấy sinh viên với ID: {student_id}")
         
         # Lấy ngưỡng rủi ro từ cấu hình
         from src.services.config_service import ConfigService
         config_service = ConfigService(self.db)
-        thresholds = config_service.get_risk_thresholds()
+        config_version, thresholds = config_service.get_versioned_thresholds()
         
         # Tính toán rủi ro
         if config:
             self.risk_calculator.config = config
         
-        risk_result = self.risk_calculator.calculate_risk(student_profile, thresholds)
+        batch = SignalBatch.from_rows([self._signal_row(student_id, signals)])
+        batch = self._apply_windows([signals.student_id], batch)
         
-        # Lấy student database ID
-        db_student = self.student_service.get_student_by_id(student_id)
+        # Tín hiệu và ngưỡng không đổi so với lần đánh giá gần nhất: dùng lại kết quả cũ
+        input_digest = self._input_digests(batch, thresholds)[0]
+        latest_evaluation = self._get_latest_by_db_id(signals.student_id)
+        if latest_evaluation and latest_evaluation.input_digest == input_digest:
+            return latest_evaluation
+        
+        risk_result = self.risk_calculator.calculate_risks_from_signals(batch, thresholds)[0]
         
         # Lưu kết quả vào database
         db_risk_evaluation = RiskEvaluationDB(
-            student_id=db_student.id,
+            student_id=signals.student_id,
             score=risk_result.score,
             risk_level=risk_result.risk_level,
             note=risk_result.note,
-            evaluated_at=datetime.utcnow()
+            input_digest=input_digest,
+            evaluated_at=datetime.utcnow(),
+            config_version=config_version
         )
         
         self.db.add(db_risk_evaluation)
+        self.db.flush()
+        self._update_latest_pointers([db_risk_evaluation])
+        VersionService(self.db).bump()
         self.db.commit()
         self.db.refresh(db_risk_evaluation)
         
         return db_risk_evaluation
     
+    def evaluate_students(self, student_ids: Optional[List[str]] = None, config: RiskConfig = None) -> dict:
+        """
+        Đánh giá rủi ro hàng loạt cho tất cả (hoặc một nhóm) sinh viên
+        
+        Tín hiệu được đọc bằng truy vấn theo tập, tính toán theo batch
+        và ghi toàn bộ kết quả bằng một lệnh insert, một lần commit.
+        """
+        if config:
+            self.risk_calculator.config = config
+        
+        db_ids, batch = self.student_service.load_signals(student_ids)
+        summary = self._record_evaluations(db_ids, batch)
+        self.db.commit()
+        
+        not_found = []
+        if student_ids is not None:
+            found = set(batch.student_ids)
+            not_found = [sid for sid in dict.fromkeys(student_ids) if sid not in found]
+        
+        summary["not_found"] = not_found
+        return summary
+    
+    def rescore_dirty_students(self, batch_size: int = 500) -> int:
+        """
+        Đánh giá lại một batch sinh viên có dữ liệu mới (dirty), trả về số sinh viên đã xử lý
+        
+        Batch được nhận bằng một câu UPDATE ... SET dirty=0 ... RETURNING, mở transaction ghi
+        ngay từ đầu; đánh giá được thêm và commit trong cùng transaction đó. Vì vậy nhiều
+        process (mỗi worker uvicorn một RescoreWorker) không bao giờ nhận trùng sinh viên,
+        còn lỗi giữa chừng sẽ rollback cả cờ dirty. Dữ liệu ghi sau khi nhận batch bật lại
+        cờ dirty và được xử lý ở lượt sau.
+        """
+        dirty_ids = select(StudentSignalDB.student_id).where(
+            StudentSignalDB.dirty.is_(True)
+        ).limit(batch_size).scalar_subquery()
+        
+        claimed_ids = self.db.execute(
+            update(StudentSignalDB).where(
+                StudentSignalDB.student_id.in_(dirty_ids),
+                # Kiểm tra lại khi database khoá dòng (ví dụ PostgreSQL READ COMMITTED)
+                StudentSignalDB.dirty.is_(True)
+            ).values(
+                dirty=False
+            ).returning(
+                StudentSignalDB.student_id
+            ).execution_options(synchronize_session=False)
+        ).scalars().all()
+        
+        if not claimed_ids:
+            self.db.rollback()
+            return 0
+        
+        try:
+            db_ids, batch = self.student_service.load_signals(db_ids=claimed_ids)
+            self._record_evaluations(db_ids, batch)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        
+        return len(claimed_ids)
+    
+    def _record_evaluations(self, db_ids: List[int], batch: SignalBatch) -> dict:
+        """Tính toán cho cả batch và thêm các dòng RiskEvaluationDB bằng một lệnh insert (chưa commit)"""
+        from src.services.config_service import ConfigService
+        config_version, thresholds = ConfigService(self.db).get_versioned_thresholds()
+        
+        batch = self._apply_windows(db_ids, batch)
+        scores = self.risk_calculator.score_batch(batch, thresholds)
+        notes = self.risk_calculator.get_note_table()
+        evaluated_at = datetime.utcnow()
+        
+        # Bỏ qua sinh viên có đánh giá gần nhất cùng digest (không đổi tín hiệu lẫn ngưỡng)
+        input_digests = self._input_digests(batch, thresholds)
+        latest_digests = self._get_latest_digests(db_ids)
+        
+        rows = [
+            {
+                "student_id": db_id,
+                "score": score,
+                "risk_level": risk_level,
+                "note": notes[note_code],
+                "input_digest": input_digest,
+                "evaluated_at": evaluated_at,
+                "config_version": config_version
+            }
+            for db_id, score, risk_level, note_code, input_digest in zip(
+                db_ids,
+                scores.score.tolist(),
+                scores.risk_levels.tolist(),
+                scores.note_codes.tolist(),
+                input_digests
+            )
+            if latest_digests.get(db_id) != input_digest
+        ]
+        
+        if rows:
+            inserted = self.db.execute(
+                insert(RiskEvaluationDB).returning(
+                    RiskEvaluationDB.id,
+                    RiskEvaluationDB.student_id,
+                    RiskEvaluationDB.risk_level,
+                    RiskEvaluationDB.score,
+                    RiskEvaluationDB.evaluated_at
+                ),
+                rows
+            ).all()
+            self._update_latest_pointers(inserted)
+            VersionService(self.db).bump()
+        
+        distribution = {"LOW": 0, "MEDIUM": 0, "HIGH": 0}
+        for risk_level in scores.risk_levels.tolist():
+            distribution[risk_level] = distribution.get(risk_level, 0) + 1
+        
+        return {
+            "evaluated": len(db_ids),
+            "written": len(rows),
+            "distribution": distribution,
+            "evaluated_at": evaluated_at
+        }
+    
+    def _input_digests(self, batch: SignalBatch, thresholds=None) -> List[str]:
+        """
+        Digest của trạng thái tín hiệu từng sinh viên cùng với cấu hình đang dùng
+        
+        Hai lần đánh giá có cùng digest chắc chắn cho cùng kết quả.
+        """
+        config = self.risk_calculator.config
+        config_key = repr((
+            config.attendance_threshold,
+            config.assignment_threshold,
+            config.contact_failed_threshold,
+            sorted(config.score_mapping.items()),
+            config.attendance_window_days,
+            config.assignment_window_days,
+            config.contact_window_days,
+            thresholds.model_dump() if thresholds else None
+        ))
+        
+        return [
+            hashlib.sha1(f"{config_key}|{counts}".encode()).hexdigest()
+            for counts in zip(
+                batch.attended_sessions.tolist(),
+                batch.total_sessions.tolist(),
+                batch.submitted_assignments.tolist(),
+                batch.total_assignments.tolist(),
+                batch.failed_contacts.tolist()
+            )
+        ]
+    
+    def _update_latest_pointers(self, evaluations) -> None:
+        """
+        Trỏ StudentDB.latest_* tới các đánh giá vừa thêm (chưa commit)
+        
+        evaluations là các đối tượng/dòng có id, student_id, risk_level, score, evaluated_at.
+        """
+        if not evaluations:
+            return
+        
+        students_table = StudentDB.__table__
+        self.db.execute(
+            update(students_table).where(
+                students_table.c.id == bindparam("b_student_id")
+            ).values(
+                latest_evaluation_id=bindparam("b_evaluation_id"),
+                latest_risk_level=bindparam("b_risk_level"),
+                latest_risk_score=bindparam("b_score"),
+                latest_evaluated_at=bindparam("b_evaluated_at"),
+                latest_risk_rank=bindparam("b_risk_rank"),
+                data_version=students_table.c.data_version + 1
+            ),
+            [
+                {
+                    "b_student_id": evaluation.student_id,
+                    "b_evaluation_id": evaluation.id,
+                    "b_risk_level": evaluation.risk_level,
+                    "b_score": evaluation.score,
+                    "b_evaluated_at": evaluation.evaluated_at,
+                    "b_risk_rank": RISK_LEVEL_ORDER.get(evaluation.risk_level, 1)
+                }
+                for evaluation in evaluations
+            ]
+        )
+    
+    def backfill_latest_pointers(self) -> int:
+        """
+        Điền con trỏ đánh giá mới nhất cho sinh viên đã có đánh giá nhưng chưa có con trỏ
+        
+        Dùng cho database tạo trước khi có các cột latest_*; đồng thời sửa latest_risk_rank
+        của database tạo trước khi có cột này (cột mới mặc định 1). Trả về số sinh viên được
+        điền con trỏ.
+        """
+        latest_id = select(RiskEvaluationDB.id).where(
+            RiskEvaluationDB.student_id == StudentDB.id
+        ).order_by(
+            RiskEvaluationDB.evaluated_at.desc(), RiskEvaluationDB.id.desc()
+        ).limit(1).scalar_subquery()
+        
+        filled = self.db.execute(
+            update(StudentDB).where(
+                StudentDB.latest_evaluation_id.is_(None),
+                exists().where(RiskEvaluationDB.student_id == StudentDB.id)
+            ).values(
+                latest_evaluation_id=latest_id,
+                data_version=StudentDB.data_version + 1
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        
+        if filled:
+            def latest_column(column):
+                return select(column).where(
+                    RiskEvaluationDB.id == StudentDB.latest_evaluation_id
+                ).scalar_subquery()
+            
+            self.db.execute(
+                update(StudentDB).where(
+                    StudentDB.latest_evaluation_id.is_not(None),
+                    StudentDB.latest_risk_level.is_(None)
+                ).values(
+                    latest_risk_level=latest_column(RiskEvaluationDB.risk_level),
+                    latest_risk_score=latest_column(RiskEvaluationDB.score),
+                    latest_evaluated_at=latest_column(RiskEvaluationDB.evaluated_at)
+                ).execution_options(synchronize_session=False)
+            )
+        
+        # Chỉ HIGH/MEDIUM có hạng khác mặc định; lọc qua index ix_students_latest_risk
+        ranked = self.db.execute(
+            update(StudentDB).where(
+                StudentDB.latest_risk_level.in_(("HIGH", "MEDIUM")),
+                StudentDB.latest_risk_rank != risk_rank(StudentDB.latest_risk_level)
+            ).values(
+                latest_risk_rank=risk_rank(StudentDB.latest_risk_level),
+                data_version=StudentDB.data_version + 1
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        
+        if not (filled or ranked):
+            return 0
+        
+        VersionService(self.db).bump()
+        self.db.commit()
+        return filled
+    
+    def _get_latest_by_db_id(self, db_id: int) -> Optional[RiskEvaluationDB]:
+        """Lấy đánh giá mới nhất theo database ID của sinh viên (qua con trỏ trên StudentDB)"""
+        return self.db.query(RiskEvaluationDB).join(
+            StudentDB, StudentDB.latest_evaluation_id == RiskEvaluationDB.id
+        ).filter(StudentDB.id == db_id).first()
+    
+    def _get_latest_digests(self, db_ids: List[int]) -> Dict[int, str]:
+        """Digest của đánh giá mới nhất cho từng sinh viên trong danh sách"""
+        digests = {}
+        for start in range(0, len(db_ids), IN_CLAUSE_CHUNK_SIZE):
+            chunk = db_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+            rows = self.db.query(
+                StudentDB.id, RiskEvaluationDB.input_digest
+            ).join(
+                RiskEvaluationDB, RiskEvaluationDB.id == StudentDB.latest_evaluation_id
+            ).filter(
+                StudentDB.id.in_(chunk)
+            ).all()
+            digests.update(rows)
+        
+        return digests
+    
+    def _apply_windows(self, db_ids: List[int], batch: SignalBatch) -> SignalBatch:
+        """Đếm lại tín hiệu theo cửa sổ thời gian nếu config có đặt cửa sổ"""
+        config = self.risk_calculator.config
+        if not config.has_windows():
+            return batch
+        
+        # Bộ đếm tổng hợp không biết ngày, nên phải đọc cột ngày của lịch sử sự kiện
+        events = self.student_service.load_events(db_ids, batch.student_ids)
+        return events.signal_batch(config, as_of=datetime.utcnow().date())
+    
+    @staticmethod
+    def _signal_row(student_id: str, signals: StudentSignalDB) -> tuple:
+        """Chuyển dòng tổng hợp tín hiệu thành tuple theo thứ tự của SignalBatch.from_rows"""
+        return (
+            student_id,
+            signals.attended_sessions,
+            signals.total_sessions,
+            signals.submitted_assignments,
+            signals.total_assignments,
+            signals.failed_contacts
+        )
+    
     def get_latest_risk_evaluation(self, student_id: str) -> Optional[RiskEvaluationDB]:
         """Lấy kết quả đánh giá rủi ro mới nhất của sinh viên"""
         db_student = self.student_service.get_student_by_id(student_id)
         if not db_student:
             return None
         
-        return self.db.query(RiskEvaluationDB).filter(
-            RiskEvaluationDB.student_id == db_student.id
-        ).order_by(RiskEvaluationDB.evaluated_at.desc()).first()
+        return self._get_latest_by_db_id(db_student.id)
     
-    def get_all_risk_evaluations(self, student_id: str) -> List[RiskEvaluationDB]:
-        """Lấy tất cả kết quả đánh giá rủi ro của sinh viên"""
-        db_student = self.student_service.get_student_by_id(student_id)
-        if not db_student:
+    def get_all_risk_evaluations(
+        self,
+        student_id: str,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None,
+        as_rows: bool = False
+    ) -> List[RiskEvaluationDB]:
+        """
+        Lấy kết quả đánh giá rủi ro của sinh viên (mới nhất trước)
+        
+        limit/after cho phân trang keyset: after = (evaluated_at, id) của dòng cuối trang trước.
+        as_rows=True: trả về dòng cột (Row) thay vì ORM object, cho đường serialize nhanh.
+        """
+        db_student_id = self.db.query(StudentDB.id).filter(StudentDB.student_id == student_id).scalar()
+        if db_student_id is None:
             return []
         
-        return self.db.query(RiskEvaluationDB).filter(
-            RiskEvaluationDB.student_id == db_student.id
-        ).order_by(RiskEvaluationDB.evaluated_at.desc()).all()
+        query = self._evaluation_query(as_rows).filter(
+            RiskEvaluationDB.student_id == db_student_id
+        )
+        return self._page_by_time(query, limit, after)
     
-    def get_high_risk_students(self) -> List[RiskEvaluationDB]:
+    def get_high_risk_students(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None,
+        as_rows: bool = False
+    ) -> List[RiskEvaluationDB]:
         """Lấy danh sách sinh viên có rủi ro cao (chỉ đánh giá mới nhất)"""
-        # Subquery để lấy đánh giá mới nhất cho mỗi sinh viên
-        latest_evaluations = self.db.query(
-            RiskEvaluationDB.student_id,
-            func.max(RiskEvaluationDB.evaluated_at).label('latest_evaluated_at')
-        ).group_by(RiskEvaluationDB.student_id).subquery()
-        
-        return self.db.query(RiskEvaluationDB).join(
-            latest_evaluations,
-            (RiskEvaluationDB.student_id == latest_evaluations.c.student_id) &
-            (RiskEvaluationDB.evaluated_at == latest_evaluations.c.latest_evaluated_at)
-        ).filter(
-            RiskEvaluationDB.risk_level == "HIGH"
-        ).order_by(RiskEvaluationDB.evaluated_at.desc()).all()
+        return self._get_latest_by_level("HIGH", limit, after, as_rows)
     
-    def get_medium_risk_students(self) -> List[RiskEvaluationDB]:
+    def get_medium_risk_students(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None,
+        as_rows: bool = False
+    ) -> List[RiskEvaluationDB]:
         """Lấy danh sách sinh viên có rủi ro trung bình (chỉ đánh giá mới nhất)"""
-        # Subquery để lấy đánh giá mới nhất cho mỗi sinh viên
-        latest_evaluations = self.db.query(
-            RiskEvaluationDB.student_id,
-            func.max(RiskEvaluationDB.evaluated_at).label('latest_evaluated_at')
-        ).group_by(RiskEvaluationDB.student_id).subquery()
+        return self._get_latest_by_level("MEDIUM", limit, after, as_rows)
+    
+    def _evaluation_query(self, as_rows: bool):
+        """Query ORM object RiskEvaluationDB, hoặc chỉ các cột của RiskEvaluationRow"""
+        if as_rows:
+            return self.db.query(*EVALUATION_ROW_COLUMNS)
+        return self.db.query(RiskEvaluationDB)
+    
+    def _get_latest_by_level(
+        self,
+        risk_level: str,
+        limit: Optional[int],
+        after: Optional[tuple],
+        as_rows: bool = False
+    ) -> List[RiskEvaluationDB]:
+        """
+        Đánh giá mới nhất của từng sinh viên có mức rủi ro risk_level
         
-        return self.db.query(RiskEvaluationDB).join(
-            latest_evaluations,
-            (RiskEvaluationDB.student_id == latest_evaluations.c.student_id) &
-            (RiskEvaluationDB.evaluated_at == latest_evaluations.c.latest_evaluated_at)
+        Với ORM object, evaluation.student được nạp luôn từ chính dòng StudentDB đã join.
+        """
+        # Con trỏ latest_* trên StudentDB có index, không cần GROUP BY toàn bộ lịch sử đánh giá
+        query = self._evaluation_query(as_rows).join(
+            StudentDB, StudentDB.latest_evaluation_id == RiskEvaluationDB.id
         ).filter(
-            RiskEvaluationDB.risk_level == "MEDIUM"
-        ).order_by(RiskEvaluationDB.evaluated_at.desc()).all()
+            StudentDB.latest_risk_level == risk_level
+        )
+        if not as_rows:
+            query = query.options(contains_eager(RiskEvaluationDB.student))
+        return self._page_by_time(
+            query, limit, after,
+            time_column=StudentDB.latest_evaluated_at,
+            id_column=StudentDB.latest_evaluation_id
+        )
+    
+    @staticmethod
+    def _page_by_time(
+        query,
+        limit: Optional[int],
+        after: Optional[tuple],
+        time_column=RiskEvaluationDB.evaluated_at,
+        id_column=RiskEvaluationDB.id
+    ) -> List[RiskEvaluationDB]:
+        """Sắp xếp mới nhất trước theo (evaluated_at, id) và seek tới sau khoá after"""
+        if after is not None:
+            # So sánh row value để SQLite seek thẳng trên index (..., thời gian, id)
+            last_evaluated_at, last_id = after
+            query = query.filter(tuple_(time_column, id_column) < tuple_(last_evaluated_at, last_id))
+        
+        query = query.order_by(time_column.desc(), id_column.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+    
+    def get_dashboard_stats(self) -> dict:
+        """
+        Thống kê số sinh viên theo mức rủi ro hiện tại
+        
+        Một truy vấn COUNT ... GROUP BY latest_risk_level; kết quả được cache
+        trong process cho tới khi phiên bản dữ liệu thay đổi.
+        """
+        version = VersionService(self.db).get_version()
+        return _stats_cache.get("dashboard_stats", version, self._compute_dashboard_stats)
+    
+    def _compute_dashboard_stats(self) -> dict:
+        """Đếm sinh viên theo latest_risk_level (sinh viên chưa đánh giá tính là LOW)"""
+        counts = dict(
+            self.db.query(
+                StudentDB.latest_risk_level, func.count(StudentDB.id)
+            ).group_by(StudentDB.latest_risk_level).all()
+        )
+        
+        total_students = sum(counts.values())
+        high_risk_count = counts.get("HIGH", 0)
+        medium_risk_count = counts.get("MEDIUM", 0)
+        low_risk_count = total_students - high_risk_count - medium_risk_count
+        
+        return {
+            "total_students": total_students,
+            "high_risk_count": high_risk_count,
+            "medium_risk_count": medium_risk_count,
+            "low_risk_count": low_risk_count,
+            "risk_distribution": {
+                "low": low_risk_count,
+                "medium": medium_risk_count,
+                "high": high_risk_count
+            }
+        }
+    
+    def what_if(
+        self,
+        attendance_thresholds: List[float],
+        assignment_thresholds: List[float],
+        contact_failed_thresholds: List[int]
+    ) -> List[dict]:
+        """Phân bố LOW/MEDIUM/HIGH của toàn bộ sinh viên cho từng bộ ngưỡng trong lưới"""
+        from src.services.config_service import ConfigService
+        thresholds = ConfigService(self.db).get_risk_thresholds()
+        level_table = [self.risk_calculator.get_risk_level(score, thresholds) for score in range(4)]
+        
+        configs = build_grid(attendance_thresholds, assignment_thresholds, contact_failed_thresholds)
+        sweep = ThresholdSweep(self.student_service.get_signal_batch())
+        distributions = sweep.evaluate(configs, level_table)
+        
+        return [
+            {
+                "attendance_threshold": config.attendance_threshold,
+                "assignment_threshold": config.assignment_threshold,
+                "contact_failed_threshold": config.contact_failed_threshold,
+                "distribution": distribution
+            }
+            for config, distribution in zip(configs, distributions)
+        ]
     
     def get_student_risk_summary(self, student_id: str) -> dict:
         """Lấy tổng quan rủi ro của sinh viên"""
-        student_profile = self.student_service.get_student_profile(student_id)
-        if not student_profile:
+        signals = self.student_service.get_student_signals(student_id)
+        if not signals:
             return None
         
         latest_evaluation = self.get_latest_risk_evaluation(student_id)
         
-        # Tính toán thống kê
-        total_attendance = len(student_profile.attendance)
-        attended_sessions = sum(1 for a in student_profile.attendance if a.status == "ATTEND")
-        attendance_rate = (attended_sessions / total_attendance * 100) if total_attendance > 0 else 0
-        
-        total_assignments = len(student_profile.assignments)
-        submitted_assignments = sum(1 for a in student_profile.assignments if a.submitted)
-        submission_rate = (submitted_assignments / total_assignments * 100) if total_assignments > 0 else 0
+        # Tính toán thống kê từ dòng tổng hợp
+        total_attendance = signals.total_sessions
+        attendance_rate = (signals.attended_sessions / total_attendance * 100) if total_attendance > 0 else 0
         
-        failed_contacts = sum(1 for c in student_profile.contacts if c.status == "FAILED")
+        total_assignments = signals.total_assignments
+        submission_rate = (signals.submitted_assignments / total_assignments * 100) if total_assignments > 0 else 0
         
         return {
             "student_id": student_id,
-            "student_name": student_profile.student_name,
+            "student_name": signals.student.student_name,
             "attendance_rate": round(attendance_rate, 2),
             "submission_rate": round(submission_rate, 2),
-            "failed_contacts": failed_contacts,
+            "failed_contacts": signals.failed_contacts,
             "latest_risk_evaluation": latest_evaluation,
             "total_attendance_sessions": total_attendance,
             "total_assignments": total_assignments,
-            "total_contacts": len(student_profile.contacts)
+            "total_contacts": signals.total_contacts
         } 
\ No newline at end of file
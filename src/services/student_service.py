@@ -1,12 +1,52 @@
-from typing import List, Optional
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
+from sqlalchemy import (
+    Boolean, Date, func, case, select, insert, update, exists, literal, union_all,
+    type_coerce, bindparam, tuple_
+)
 from datetime import datetime, date
 
 from src.models.student import (
-    StudentDB, AttendanceDB, AssignmentDB, ContactDB,
-    StudentCreate, StudentResponse
+    StudentDB, AttendanceDB, AssignmentDB, ContactDB, StudentSignalDB,
+    StudentCreate, StudentResponse, StudentRow, BulkStudentRecord
 )
 from src.models.student import Student, Attendance, Assignment, Contact
+from src.risk_assessment.batch import SignalBatch
+from src.risk_assessment.windows import EventSeries, StudentEvents
+from src.services.version_service import VersionService
+
+# Số phần tử tối đa trong một mệnh đề IN
+IN_CLAUSE_CHUNK_SIZE = 500
+
+# Thứ tự sắp xếp theo mức rủi ro (sinh viên chưa đánh giá được coi như LOW)
+RISK_LEVEL_ORDER = {"HIGH": 3, "MEDIUM": 2, "LOW": 1}
+
+
+def risk_rank(risk_level):
+    """Biểu thức SQL hạng rủi ro (giá trị của StudentDB.latest_risk_rank) từ một cột mức rủi ro"""
+    return case(RISK_LEVEL_ORDER, value=risk_level, else_=1)
+
+# Các cột đọc khi as_rows=True (đúng các trường của StudentRow)
+STUDENT_ROW_COLUMNS = tuple(getattr(StudentDB, name) for name in StudentRow.__annotations__)
+
+# Số sinh viên ghi trong một transaction khi nạp dữ liệu hàng loạt
+BULK_BATCH_SIZE = 500
+
+# Loại dòng trong truy vấn hồ sơ sinh viên (UNION ALL)
+PROFILE_STUDENT = 0
+PROFILE_ATTENDANCE = 1
+PROFILE_ASSIGNMENT = 2
+PROFILE_CONTACT = 3
+
+# Thứ tự các bộ đếm trong StudentSignalDB khi cộng dồn theo batch
+SIGNAL_COUNTERS = (
+    "total_sessions", "attended_sessions",
+    "total_assignments", "submitted_assignments",
+    "total_contacts", "failed_contacts"
+)
 
 
 class StudentService:
@@ -21,7 +61,14 @@ class StudentService:
             student_id=student_data.student_id,
             student_name=student_data.student_name
         )
+        db_student.signals = StudentSignalDB(
+            total_sessions=0, attended_sessions=0,
+            total_assignments=0, submitted_assignments=0,
+            total_contacts=0, failed_contacts=0,
+            revision=0, dirty=False
+        )
         self.db.add(db_student)
+        VersionService(self.db).bump()
         self.db.commit()
         self.db.refresh(db_student)
         return db_student
@@ -38,12 +85,86 @@ class StudentService:
         """Lấy tất cả sinh viên"""
         return self.db.query(StudentDB).all()
     
+    def list_students(
+        self,
+        risk_level: Optional[str] = None,
+        sort_by: str = "student_id",
+        sort_order: str = "asc",
+        page: int = 1,
+        limit: int = 20,
+        after: Optional[tuple] = None,
+        as_rows: bool = False
+    ) -> Tuple[List[StudentDB], Optional[int], Optional[tuple]]:
+        """
+        Lọc, sắp xếp và phân trang sinh viên bằng một câu SQL
+        
+        Mức rủi ro lấy từ con trỏ latest_risk_level trên StudentDB. Có hai chế độ:
+        - after=None: phân trang theo page (OFFSET), tổng số dòng khớp bộ lọc
+          được tính cùng lúc bằng window function.
+        - after=(khoá sắp xếp, id): phân trang keyset, seek thẳng tới vị trí sau
+          dòng cuối của trang trước; không tính tổng số.
+        Trả về (sinh viên của trang, tổng số hoặc None, khoá của trang sau hoặc None).
+        as_rows=True: trả về dòng cột (Row, bắt đầu bằng các trường của StudentRow) thay vì ORM object.
+        """
+        if sort_by == "student_name":
+            sort_key = StudentDB.student_name
+        elif sort_by == "risk_level":
+            sort_key = StudentDB.latest_risk_rank
+        else:  # sort_by == "student_id" (default)
+            sort_key = StudentDB.student_id
+        descending = sort_order.lower() == "desc"
+        
+        entity_columns = list(STUDENT_ROW_COLUMNS) if as_rows else [StudentDB]
+        columns = [*entity_columns, sort_key.label("sort_key")]
+        if after is None:
+            columns.append(func.count().over().label("total"))
+        
+        query = self.db.query(*columns)
+        
+        if risk_level:
+            query = query.filter(StudentDB.latest_risk_level == risk_level)
+        
+        if after is not None:
+            # So sánh row value (khoá, id) để SQLite seek thẳng trên index (khoá, id)
+            last_key, last_id = after
+            position = tuple_(sort_key, StudentDB.id)
+            last_position = tuple_(last_key, last_id)
+            query = query.filter(position < last_position if descending else position > last_position)
+        
+        if descending:
+            page_query = query.order_by(sort_key.desc(), StudentDB.id.desc())
+        else:
+            page_query = query.order_by(sort_key.asc(), StudentDB.id.asc())
+        if after is None:
+            page_query = page_query.offset((page - 1) * limit)
+        
+        # Lấy thêm một dòng để biết còn trang sau hay không
+        rows = page_query.limit(limit + 1).all()
+        
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1].sort_key, rows[-1].id if as_rows else rows[-1][0].id)
+        
+        total = None
+        if after is None:
+            if rows:
+                total = rows[0].total
+            else:
+                # Trang nằm ngoài phạm vi: đếm riêng để vẫn trả về tổng số
+                total = query.with_entities(func.count(StudentDB.id)).scalar()
+        
+        if as_rows:
+            return rows, total, next_key
+        return [row[0] for row in rows], total, next_key
+    
     def add_attendance(self, student_id: str, attendance_data: List[Attendance]):
         """Thêm dữ liệu điểm danh cho sinh viên"""
         student = self.get_student_by_id(student_id)
         if not student:
             raise ValueError(f"Không tìm thấy sinh viên với ID: {student_id}")
         
+        signals = self._get_or_build_signals(student)
         for att in attendance_data:
             db_attendance = AttendanceDB(
                 student_id=student.id,
@@ -52,6 +173,12 @@ class StudentService:
             )
             self.db.add(db_attendance)
         
+        # Cộng dồn bằng biểu thức SQL để các request đồng thời không ghi đè nhau
+        attended = sum(1 for att in attendance_data if att.status == "ATTEND")
+        signals.total_sessions = StudentSignalDB.total_sessions + len(attendance_data)
+        signals.attended_sessions = StudentSignalDB.attended_sessions + attended
+        self._mark_dirty(signals)
+        
         self.db.commit()
     
     def add_assignments(self, student_id: str, assignment_data: List[Assignment]):
@@ -60,6 +187,7 @@ class StudentService:
         if not student:
             raise ValueError(f"Không tìm thấy sinh viên với ID: {student_id}")
         
+        signals = self._get_or_build_signals(student)
         for ass in assignment_data:
             db_assignment = AssignmentDB(
                 student_id=student.id,
@@ -69,6 +197,11 @@ class StudentService:
             )
             self.db.add(db_assignment)
         
+        submitted = sum(1 for ass in assignment_data if ass.submitted)
+        signals.total_assignments = StudentSignalDB.total_assignments + len(assignment_data)
+        signals.submitted_assignments = StudentSignalDB.submitted_assignments + submitted
+        self._mark_dirty(signals)
+        
         self.db.commit()
     
     def add_contacts(self, student_id: str, contact_data: List[Contact]):
@@ -77,6 +210,7 @@ class StudentService:
         if not student:
             raise ValueError(f"Không tìm thấy sinh viên với ID: {student_id}")
         
+        signals = self._get_or_build_signals(student)
         for cont in contact_data:
             db_contact = ContactDB(
                 student_id=student.id,
@@ -85,58 +219,479 @@ class StudentService:
             )
             self.db.add(db_contact)
         
+        failed = sum(1 for cont in contact_data if cont.status == "FAILED")
+        signals.total_contacts = StudentSignalDB.total_contacts + len(contact_data)
+        signals.failed_contacts = StudentSignalDB.failed_contacts + failed
+        self._mark_dirty(signals)
+        
         self.db.commit()
     
-    def get_student_profile(self, student_id: str) -> Optional[Student]:
-        """Lấy hồ sơ đầy đủ của sinh viên"""
-        db_student = self.get_student_by_id(student_id)
-        if not db_student:
-            return None
+    def bulk_ingest(self, records: Iterable[dict], batch_size: int = BULK_BATCH_SIZE) -> dict:
+        """
+        Nạp hàng loạt sinh viên cùng dữ liệu điểm danh, bài tập và liên lạc
+        
+        Bản ghi được xử lý theo batch, mỗi batch một transaction: validate từng bản ghi,
+        tìm sinh viên đã có bằng một truy vấn IN, insert sinh viên mới và sự kiện bằng
+        insert() executemany, cộng dồn bộ đếm tín hiệu và đánh dấu dirty.
+        Bản ghi lỗi được báo lại theo vị trí và không ảnh hưởng các bản ghi khác.
+        """
+        summary = {
+            "records": 0,
+            "students_created": 0,
+            "students_updated": 0,
+            "attendance_inserted": 0,
+            "assignments_inserted": 0,
+            "contacts_inserted": 0,
+            "errors": []
+        }
+        errors = summary["errors"]
+        iterator = iter(records)
+        parse_error = None
+        
+        while parse_error is None:
+            chunk = []
+            try:
+                chunk.extend(islice(iterator, batch_size))
+            except ValueError as e:
+                # Dữ liệu đầu vào hỏng: ghi nốt các bản ghi đọc được rồi dừng
+                parse_error = e
+            if not chunk:
+                break
+            
+            valid = []
+            for offset, record in enumerate(chunk):
+                index = summary["records"] + offset
+                try:
+                    valid.append((index, BulkStudentRecord.model_validate(record)))
+                except ValidationError as e:
+                    student_id = record.get("student_id") if isinstance(record, dict) else None
+                    # ID sai kiểu (ví dụ số) vẫn được báo lại dạng chuỗi cho BulkIngestError
+                    if student_id is not None:
+                        student_id = str(student_id)
+                    errors.append({"index": index, "student_id": student_id, "error": str(e)})
+            summary["records"] += len(chunk)
+            
+            batch_errors = len(errors)
+            try:
+                counts = self.ingest_batch(valid, errors)
+                self.db.commit()
+            except SQLAlchemyError as e:
+                self.db.rollback()
+                # Bản ghi đã bị ingest_batch báo lỗi thì không báo lại lần nữa
+                reported = {error["index"] for error in errors[batch_errors:]}
+                errors.extend(
+                    {"index": index, "student_id": record.student_id, "error": f"Lỗi khi ghi dữ liệu: {e}"}
+                    for index, record in valid
+                    if index not in reported
+                )
+                continue
+            
+            for key, value in counts.items():
+                summary[key] += value
+        
+        if parse_error is not None:
+            errors.append({"index": summary["records"], "student_id": None, "error": str(parse_error)})
+        
+        return summary
+    
+    def ingest_batch(self, valid: List[Tuple[int, BulkStudentRecord]], errors: List[dict]) -> Dict[str, int]:
+        """Ghi một batch bản ghi đã validate (chưa commit), trả về số dòng đã thêm"""
+        counts = dict.fromkeys(
+            ["students_created", "students_updated", "attendance_inserted",
+             "assignments_inserted", "contacts_inserted"], 0
+        )
+        if not valid:
+            return counts
+        
+        student_ids = list(dict.fromkeys(record.student_id for _, record in valid))
+        db_ids = {}
+        for start in range(0, len(student_ids), IN_CLAUSE_CHUNK_SIZE):
+            chunk = student_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+            db_ids.update(
+                self.db.query(StudentDB.student_id, StudentDB.id).filter(StudentDB.student_id.in_(chunk)).all()
+            )
+        existing = set(db_ids.values())
         
-        # Lấy điểm danh
-        attendance_records = self.db.query(AttendanceDB).filter(
-            AttendanceDB.student_id == db_student.id
-        ).all()
+        # Sinh viên mới lấy tên từ bản ghi đầu tiên có student_name
+        new_names = {}
+        for _, record in valid:
+            if record.student_id not in db_ids and record.student_name and record.student_id not in new_names:
+                new_names[record.student_id] = record.student_name
         
-        attendance = [
-            Attendance(
-                date=record.date.date(),
-                status=record.status
+        accepted = []
+        for index, record in valid:
+            if record.student_id in db_ids or record.student_id in new_names:
+                accepted.append(record)
+            else:
+                errors.append({
+                    "index": index,
+                    "student_id": record.student_id,
+                    "error": "Sinh viên mới cần có student_name"
+                })
+        
+        if new_names:
+            created = self.db.execute(
+                insert(StudentDB).returning(StudentDB.student_id, StudentDB.id),
+                [{"student_id": sid, "student_name": name} for sid, name in new_names.items()]
+            ).all()
+            db_ids.update(created)
+        
+        attendance_rows, assignment_rows, contact_rows = [], [], []
+        deltas = {}
+        for record in accepted:
+            db_id = db_ids[record.student_id]
+            delta = deltas.setdefault(db_id, [0] * len(SIGNAL_COUNTERS))
+            for att in record.attendance:
+                attendance_rows.append({
+                    "student_id": db_id,
+                    "date": datetime.combine(att.date, datetime.min.time()),
+                    "status": att.status
+                })
+                delta[1] += att.status == "ATTEND"
+            for ass in record.assignments:
+                assignment_rows.append({
+                    "student_id": db_id,
+                    "date": datetime.combine(ass.date, datetime.min.time()),
+                    "name": ass.name,
+                    "submitted": ass.submitted
+                })
+                delta[3] += ass.submitted
+            for cont in record.contacts:
+                contact_rows.append({
+                    "student_id": db_id,
+                    "date": datetime.combine(cont.date, datetime.min.time()),
+                    "status": cont.status
+                })
+                delta[5] += cont.status == "FAILED"
+            delta[0] += len(record.attendance)
+            delta[2] += len(record.assignments)
+            delta[4] += len(record.contacts)
+        
+        # Insert trực tiếp vào Table (Core) để không đi qua bước bulk-persistence của ORM
+        for model, rows in ((AttendanceDB, attendance_rows), (AssignmentDB, assignment_rows), (ContactDB, contact_rows)):
+            if rows:
+                self.db.execute(insert(model.__table__), rows)
+        
+        now = datetime.utcnow()
+        new_signals = []
+        changed_signals = []
+        for db_id, delta in deltas.items():
+            has_events = any(delta[0::2])
+            if db_id not in existing:
+                new_signals.append({
+                    **dict(zip(SIGNAL_COUNTERS, delta)),
+                    "student_id": db_id,
+                    "revision": int(has_events),
+                    "dirty": has_events,
+                    "updated_at": now
+                })
+            elif has_events:
+                changed_signals.append({
+                    **{f"b_{name}": value for name, value in zip(SIGNAL_COUNTERS, delta)},
+                    "b_student_id": db_id
+                })
+        
+        if new_signals:
+            self.db.execute(insert(StudentSignalDB), new_signals)
+        if changed_signals:
+            # Cộng dồn bằng biểu thức SQL để không ghi đè các request đồng thời
+            signals_table = StudentSignalDB.__table__
+            self.db.execute(
+                update(signals_table).where(
+                    signals_table.c.student_id == bindparam("b_student_id")
+                ).values(
+                    **{name: signals_table.c[name] + bindparam(f"b_{name}") for name in SIGNAL_COUNTERS},
+                    revision=signals_table.c.revision + 1,
+                    dirty=True,
+                    updated_at=now
+                ),
+                changed_signals
             )
-            for record in attendance_records
-        ]
-        
-        # Lấy bài tập
-        assignment_records = self.db.query(AssignmentDB).filter(
-            AssignmentDB.student_id == db_student.id
-        ).all()
-        
-        assignments = [
-            Assignment(
-                date=record.date.date(),
-                name=record.name,
-                submitted=record.submitted
+        
+        if new_signals or changed_signals:
+            version_service = VersionService(self.db)
+            version_service.bump()
+            version_service.bump_students(
+                row["b_student_id"] for row in changed_signals
+            )
+        
+        counts["students_created"] = len(new_names)
+        counts["students_updated"] = len(existing & deltas.keys())
+        counts["attendance_inserted"] = len(attendance_rows)
+        counts["assignments_inserted"] = len(assignment_rows)
+        counts["contacts_inserted"] = len(contact_rows)
+        return counts
+    
+    def _mark_dirty(self, signals: StudentSignalDB):
+        """Đánh dấu sinh viên cần được đánh giá lại rủi ro (và tăng phiên bản dữ liệu)"""
+        signals.revision = StudentSignalDB.revision + 1
+        # Luôn ghi cột dirty: dòng đã nạp với dirty=True thì gán True không được coi là thay đổi,
+        # trong khi worker có thể đã xoá cờ ở transaction khác trước khi request này commit
+        signals.dirty = literal(True, Boolean)
+        version_service = VersionService(self.db)
+        version_service.bump()
+        version_service.bump_students([signals.student_id])
+    
+    def get_student_signals(self, student_id: str) -> Optional[StudentSignalDB]:
+        """Lấy số liệu tín hiệu rủi ro của sinh viên (một dòng, không đọc lịch sử)"""
+        row = self.db.query(StudentDB, StudentSignalDB).outerjoin(
+            StudentSignalDB, StudentSignalDB.student_id == StudentDB.id
+        ).filter(StudentDB.student_id == student_id).first()
+        
+        if not row:
+            return None
+        
+        db_student, signals = row
+        if signals is None:
+            # Dữ liệu cũ chưa có bảng tổng hợp: tính lại một lần rồi lưu
+            signals = self._get_or_build_signals(db_student)
+            self.db.commit()
+        
+        return signals
+    
+    def get_signal_batch(self) -> SignalBatch:
+        """Lấy số liệu tín hiệu của toàn bộ sinh viên dưới dạng SignalBatch (một truy vấn)"""
+        _, batch = self.load_signals()
+        return batch
+    
+    def load_signals(
+        self,
+        student_ids: Optional[List[str]] = None,
+        db_ids: Optional[List[int]] = None
+    ) -> Tuple[List[int], SignalBatch]:
+        """
+        Lấy số liệu tín hiệu của tất cả (hoặc một nhóm) sinh viên bằng truy vấn theo tập
+        
+        Nhóm sinh viên được chọn theo student_ids, hoặc theo database ID (db_ids).
+        Trả về (danh sách database ID, SignalBatch) theo cùng thứ tự.
+        """
+        query = self.db.query(
+            StudentDB.id,
+            StudentDB.student_id,
+            StudentSignalDB.attended_sessions,
+            StudentSignalDB.total_sessions,
+            StudentSignalDB.submitted_assignments,
+            StudentSignalDB.total_assignments,
+            StudentSignalDB.failed_contacts
+        ).join(
+            StudentSignalDB, StudentSignalDB.student_id == StudentDB.id
+        )
+        
+        if student_ids is None and db_ids is None:
+            rows = query.order_by(StudentDB.id).all()
+        else:
+            if db_ids is not None:
+                key_column, keys = StudentDB.id, db_ids
+            else:
+                key_column, keys = StudentDB.student_id, student_ids
+            # Chia nhỏ danh sách IN để không vượt giới hạn tham số của SQLite
+            rows = []
+            unique_ids = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_ids), IN_CLAUSE_CHUNK_SIZE):
+                chunk = unique_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+                rows.extend(query.filter(key_column.in_(chunk)).all())
+        
+        db_ids = [row[0] for row in rows]
+        return db_ids, SignalBatch.from_rows([tuple(row[1:]) for row in rows])
+    
+    def load_events(self, db_ids: List[int], student_ids: List[str]) -> StudentEvents:
+        """
+        Lấy lịch sử sự kiện (chỉ cột ngày và trạng thái) của một nhóm sinh viên
+        
+        db_ids và student_ids cùng thứ tự; dùng cho tín hiệu theo cửa sổ thời gian.
+        """
+        position = {db_id: i for i, db_id in enumerate(db_ids)}
+        
+        def series(columns, hit_of):
+            index, days, hits = [], [], []
+            for start in range(0, len(db_ids), IN_CLAUSE_CHUNK_SIZE):
+                chunk = db_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+                rows = self.db.query(*columns).filter(columns[0].in_(chunk)).all()
+                for db_id, event_date, value in rows:
+                    index.append(position[db_id])
+                    days.append(event_date.toordinal())
+                    hits.append(hit_of(value))
+            return EventSeries.from_arrays(len(db_ids), index, days, hits)
+        
+        return StudentEvents(
+            student_ids=list(student_ids),
+            attendance=series(
+                (AttendanceDB.student_id, AttendanceDB.date, AttendanceDB.status),
+                lambda status: status == "ATTEND"
+            ),
+            assignments=series(
+                (AssignmentDB.student_id, AssignmentDB.date, AssignmentDB.submitted),
+                bool
+            ),
+            contacts=series(
+                (ContactDB.student_id, ContactDB.date, ContactDB.status),
+                lambda status: status == "FAILED"
             )
-            for record in assignment_records
-        ]
-        
-        # Lấy liên lạc
-        contact_records = self.db.query(ContactDB).filter(
-            ContactDB.student_id == db_student.id
-        ).all()
-        
-        contacts = [
-            Contact(
-                date=record.date.date(),
-                status=record.status
+        )
+    
+    def backfill_signals(self) -> int:
+        """
+        Tạo dòng tổng hợp cho các sinh viên chưa có, bằng một câu INSERT ... SELECT
+        
+        Quét toàn bộ sinh viên nên chỉ chạy một lần khi khởi động/migrate (app lifespan,
+        lệnh migrate), cho database tạo trước khi có bảng student_signals; sinh viên tạo
+        sau đó luôn có dòng tổng hợp ngay khi tạo.
+        """
+        def aggregate(model, flag):
+            return select(
+                model.student_id,
+                func.count(model.id).label("total"),
+                func.sum(case((flag, 1), else_=0)).label("hits")
+            ).group_by(model.student_id).subquery()
+        
+        attendance = aggregate(AttendanceDB, AttendanceDB.status == "ATTEND")
+        assignments = aggregate(AssignmentDB, AssignmentDB.submitted.is_(True))
+        contacts = aggregate(ContactDB, ContactDB.status == "FAILED")
+        
+        missing_students = select(
+            StudentDB.id,
+            func.coalesce(attendance.c.total, 0),
+            func.coalesce(attendance.c.hits, 0),
+            func.coalesce(assignments.c.total, 0),
+            func.coalesce(assignments.c.hits, 0),
+            func.coalesce(contacts.c.total, 0),
+            func.coalesce(contacts.c.hits, 0),
+            literal(0),
+            literal(False),
+            func.now()
+        ).outerjoin(
+            attendance, attendance.c.student_id == StudentDB.id
+        ).outerjoin(
+            assignments, assignments.c.student_id == StudentDB.id
+        ).outerjoin(
+            contacts, contacts.c.student_id == StudentDB.id
+        ).where(
+            ~exists().where(StudentSignalDB.student_id == StudentDB.id)
+        )
+        
+        result = self.db.execute(
+            insert(StudentSignalDB).from_select(
+                [
+                    "student_id", "total_sessions", "attended_sessions",
+                    "total_assignments", "submitted_assignments",
+                    "total_contacts", "failed_contacts", "revision", "dirty", "updated_at"
+                ],
+                missing_students
             )
-            for record in contact_records
-        ]
+        )
+        if result.rowcount:
+            self.db.commit()
+        
+        return result.rowcount
+    
+    def _get_or_build_signals(self, student: StudentDB) -> StudentSignalDB:
+        """Lấy dòng tổng hợp tín hiệu, tạo mới từ dữ liệu hiện có nếu chưa tồn tại"""
+        signals = self.db.get(StudentSignalDB, student.id)
+        if signals is not None:
+            return signals
         
-        return Student(
-            student_id=db_student.student_id,
-            student_name=db_student.student_name,
+        total_sessions, attended_sessions = self.db.query(
+            func.count(AttendanceDB.id),
+            func.coalesce(func.sum(case((AttendanceDB.status == "ATTEND", 1), else_=0)), 0)
+        ).filter(AttendanceDB.student_id == student.id).one()
+        
+        total_assignments, submitted_assignments = self.db.query(
+            func.count(AssignmentDB.id),
+            func.coalesce(func.sum(case((AssignmentDB.submitted.is_(True), 1), else_=0)), 0)
+        ).filter(AssignmentDB.student_id == student.id).one()
+        
+        total_contacts, failed_contacts = self.db.query(
+            func.count(ContactDB.id),
+            func.coalesce(func.sum(case((ContactDB.status == "FAILED", 1), else_=0)), 0)
+        ).filter(ContactDB.student_id == student.id).one()
+        
+        signals = StudentSignalDB(
+            student_id=student.id,
+            total_sessions=total_sessions,
+            attended_sessions=attended_sessions,
+            total_assignments=total_assignments,
+            submitted_assignments=submitted_assignments,
+            total_contacts=total_contacts,
+            failed_contacts=failed_contacts,
+            revision=0,
+            dirty=False
+        )
+        self.db.add(signals)
+        self.db.flush()
+        return signals
+    
+    def get_student_profile(self, student_id: str, validate: bool = False) -> Optional[Student]:
+        """
+        Lấy hồ sơ đầy đủ của sinh viên
+        
+        Sinh viên và cả ba loại sự kiện được đọc trong một truy vấn UNION ALL (PROFILE_QUERY) chỉ gồm cột,
+        không tạo ORM entity. Dữ liệu trong database đã được validate khi ghi nên mặc định
+        dựng model bằng model_construct; validate=True để validate lại đầy đủ.
+        """
+        rows = self.db.execute(PROFILE_QUERY, {"profile_student_id": student_id}).all()
+        if not rows or rows[0].kind != PROFILE_STUDENT:
+            return None
+        
+        model = Student if validate else Student.model_construct
+        attendance_model = Attendance if validate else Attendance.model_construct
+        assignment_model = Assignment if validate else Assignment.model_construct
+        contact_model = Contact if validate else Contact.model_construct
+        
+        attendance, assignments, contacts = [], [], []
+        for kind, _, event_date, text, submitted in rows[1:]:
+            if kind == PROFILE_ATTENDANCE:
+                attendance.append(attendance_model(date=event_date, status=text))
+            elif kind == PROFILE_ASSIGNMENT:
+                assignments.append(assignment_model(date=event_date, name=text, submitted=submitted))
+            else:
+                contacts.append(contact_model(date=event_date, status=text))
+        
+        return model(
+            student_id=student_id,
+            student_name=rows[0].text,
             attendance=attendance,
             assignments=assignments,
             contacts=contacts
-        ) 
\ No newline at end of file
+        )
+
+
+def _build_profile_query():
+    """
+    UNION ALL (kind, id, date, text, submitted) của một sinh viên và các sự kiện, sắp theo kind, id
+    
+    Tạo một lần khi import: SQLAlchemy không phải dựng lại câu lệnh và cache key cho mỗi request.
+    """
+    student_id = bindparam("profile_student_id")
+    db_id = select(StudentDB.id).where(StudentDB.student_id == student_id).scalar_subquery()
+    
+    def event_date(column):
+        # Cắt phần giờ ngay trong SQL, driver trả về date
+        return type_coerce(func.date(column), Date)
+    
+    student_part = select(
+        literal(PROFILE_STUDENT).label("kind"),
+        StudentDB.id.label("id"),
+        literal(None, Date).label("date"),
+        StudentDB.student_name.label("text"),
+        literal(None, Boolean).label("submitted")
+    ).where(StudentDB.student_id == student_id)
+    
+    attendance_part = select(
+        literal(PROFILE_ATTENDANCE), AttendanceDB.id, event_date(AttendanceDB.date),
+        AttendanceDB.status, literal(None, Boolean)
+    ).where(AttendanceDB.student_id == db_id)
+    
+    assignment_part = select(
+        literal(PROFILE_ASSIGNMENT), AssignmentDB.id, event_date(AssignmentDB.date),
+        AssignmentDB.name, AssignmentDB.submitted
+    ).where(AssignmentDB.student_id == db_id)
+    
+    contact_part = select(
+        literal(PROFILE_CONTACT), ContactDB.id, event_date(ContactDB.date),
+        ContactDB.status, literal(None, Boolean)
+    ).where(ContactDB.student_id == db_id)
+    
+    return union_all(student_part, attendance_part, assignment_part, contact_part).order_by("kind", "id")
+
+
+PROFILE_QUERY = _build_profile_query()
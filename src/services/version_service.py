@@ -0,0 +1,135 @@
+"""
+Data Versioning
+Bộ đếm phiên bản dữ liệu lưu trong database và cache trong process theo phiên bản
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.models.student import DataVersionDB, StudentDB
+
+# Phiên bản chung của dữ liệu sinh viên, sự kiện và đánh giá rủi ro
+DATA_VERSION = "data"
+# Phiên bản cấu hình hệ thống
+CONFIG_VERSION = "config"
+# Các bộ đếm được tạo sẵn khi tạo bảng (seed_versions)
+VERSION_NAMES = (DATA_VERSION, CONFIG_VERSION)
+
+# Câu lệnh đọc phiên bản dựng sẵn: được gọi trên mọi đường đọc nóng (cache, ETag, cấu hình)
+VERSION_QUERY = select(DataVersionDB.version).where(DataVersionDB.name == bindparam("version_name"))
+STAMP_QUERY = select(DataVersionDB.version, DataVersionDB.updated_at).where(
+    DataVersionDB.name == bindparam("version_name")
+)
+
+
+class VersionService:
+    """Đọc và tăng bộ đếm phiên bản (dùng chung giữa các worker qua database)"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_version(self, name: str = DATA_VERSION) -> int:
+        """Phiên bản hiện tại (0 nếu chưa có lần ghi nào)"""
+        version = self.db.execute(VERSION_QUERY, {"version_name": name}).scalar()
+        return version or 0
+    
+    def get_stamp(self, name: str = DATA_VERSION) -> Tuple[int, Optional[datetime]]:
+        """Phiên bản hiện tại cùng thời điểm thay đổi gần nhất (cho ETag/Last-Modified)"""
+        row = self.db.execute(STAMP_QUERY, {"version_name": name}).first()
+        if row is None:
+            return 0, None
+        return row.version, row.updated_at
+    
+    def get_student_stamp(self, student_id: str) -> Optional[Tuple[int, int, Optional[datetime]]]:
+        """(database ID, phiên bản, thời điểm cập nhật) của một sinh viên; None nếu không tồn tại"""
+        row = self.db.query(StudentDB.id, StudentDB.data_version, StudentDB.updated_at).filter(
+            StudentDB.student_id == student_id
+        ).first()
+        if row is None:
+            return None
+        return row.id, row.data_version or 0, row.updated_at
+    
+    def bump(self, name: str = DATA_VERSION) -> None:
+        """Tăng phiên bản trong transaction hiện tại (người gọi tự commit)"""
+        result = self.db.execute(
+            update(DataVersionDB).where(
+                DataVersionDB.name == name
+            ).values(version=DataVersionDB.version + 1).execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            # Dòng bộ đếm được seed khi tạo bảng; không INSERT ở đây vì hai writer đồng thời
+            # sẽ cùng thấy thiếu dòng và một bên lỗi IntegrityError, mất cả dữ liệu đang ghi
+            raise ValueError(f"Bộ đếm phiên bản chưa được tạo: {name}")
+    
+    def bump_students(self, db_ids: Iterable[int]) -> None:
+        """Tăng phiên bản riêng của các sinh viên (theo database ID) trong transaction hiện tại"""
+        from src.services.student_service import IN_CLAUSE_CHUNK_SIZE
+        
+        db_ids = list(db_ids)
+        for start in range(0, len(db_ids), IN_CLAUSE_CHUNK_SIZE):
+            chunk = db_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+            self.db.execute(
+                update(StudentDB).where(
+                    StudentDB.id.in_(chunk)
+                ).values(data_version=StudentDB.data_version + 1).execution_options(synchronize_session=False)
+            )
+
+
+def seed_versions(engine: Engine) -> None:
+    """
+    Tạo sẵn các dòng bộ đếm (version=0) để bump() chỉ cần UPDATE
+    
+    Gọi từ create_tables(); nhiều process khởi động cùng lúc thì process đến sau bỏ qua.
+    """
+    with engine.connect() as conn:
+        existing = set(conn.execute(select(DataVersionDB.name)).scalars())
+        missing = [
+            {"name": name, "version": 0, "updated_at": None}
+            for name in VERSION_NAMES if name not in existing
+        ]
+        if not missing:
+            return
+        try:
+            conn.execute(insert(DataVersionDB), missing)
+            conn.commit()
+        except IntegrityError:
+            conn.rollback()
+
+
+class VersionedCache:
+    """
+    Cache trong process, mỗi giá trị gắn với phiên bản dữ liệu lúc tính
+    
+    Giá trị chỉ được tính lại khi phiên bản thay đổi, nên nhiều request đọc
+    cùng lúc chỉ tốn một lần tính cho mỗi lần dữ liệu thay đổi.
+    """
+    
+    def __init__(self):
+        self._entries: Dict[str, Tuple[int, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, version: int, compute: Callable[[], Any]) -> Any:
+        """Trả về giá trị đã cache cho version, hoặc gọi compute() và lưu lại"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            
+            value = compute()
+            self._entries[key] = (version, value)
+            return value
+    
+    def clear(self) -> None:
+        """Xoá toàn bộ cache"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,47 @@
+"""
+HTTP Conditional Requests
+ETag / Last-Modified từ bộ đếm phiên bản dữ liệu và kiểm tra If-None-Match / If-Modified-Since
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+def make_etag(*parts) -> str:
+    """ETag yếu ghép từ các thành phần phiên bản, ví dụ W/"data-42" """
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def http_date(value: datetime) -> str:
+    """datetime UTC (không có tzinfo) sang định dạng HTTP-date"""
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _opaque_tag(tag: str) -> str:
+    """Bỏ tiền tố W/ để so sánh yếu (weak comparison)"""
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Client đã có bản mới nhất hay chưa
+
+    If-None-Match được ưu tiên; chỉ xét If-Modified-Since khi request không gửi If-None-Match.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {_opaque_tag(tag.strip()) for tag in if_none_match.split(",")}
+        return "*" in tags or _opaque_tag(etag) in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+    return False
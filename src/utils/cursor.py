@@ -0,0 +1,26 @@
+"""
+Cursor Pagination
+Mã hoá/giải mã cursor (opaque) cho phân trang keyset
+"""
+
+import base64
+import json
+
+
+def encode_cursor(payload: dict) -> str:
+    """Mã hoá vị trí trang (khoá sắp xếp + id) thành chuỗi cursor"""
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Giải mã cursor; ném ValueError nếu cursor không hợp lệ"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Cursor không hợp lệ: {e}")
+
+    if not isinstance(payload, dict):
+        raise ValueError("Cursor không hợp lệ")
+    return payload
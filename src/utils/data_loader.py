@@ -1,15 +1,22 @@
+import csv
 import json
-from typing import List
+from typing import List, Iterable, Iterator, TextIO
 from pathlib import Path
 from src.models.student import Student
 
+# Kích thước mỗi lần đọc file khi parse JSON theo luồng
+READ_CHUNK_SIZE = 1 << 16
+
+# Các cột của file CSV kết quả
+RESULT_CSV_COLUMNS = ['Student ID', 'Score', 'Risk Level', 'Note']
+
 
 class DataLoader:
     """Class để load và xử lý dữ liệu sinh viên từ file JSON"""
     
     @staticmethod
-    def load_students_from_json(file_path: str) -> List[Student]:
-        """Load danh sách sinh viên từ file JSON"""
+    def load_records_from_json(file_path: str) -> List[dict]:
+        """Load dữ liệu thô (chưa validate) từ file JSON"""
         file_path = Path(file_path)
         
         if not file_path.exists():
@@ -17,8 +24,16 @@ class DataLoader:
         
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
+                return json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"File JSON không hợp lệ: {e}")
+    
+    @staticmethod
+    def load_students_from_json(file_path: str) -> List[Student]:
+        """Load danh sách sinh viên từ file JSON"""
+        data = DataLoader.load_records_from_json(file_path)
+        
+        try:
             students = []
             for student_data in data:
                 student = Student(**student_data)
@@ -26,11 +41,159 @@ class DataLoader:
             
             return students
             
-        except json.JSONDecodeError as e:
-            raise ValueError(f"File JSON không hợp lệ: {e}")
         except Exception as e:
             raise ValueError(f"Lỗi khi load dữ liệu: {e}")
     
+    @staticmethod
+    def iter_records(file_path: str) -> Iterator[dict]:
+        """
+        Đọc dữ liệu thô theo luồng, từng sinh viên một
+        
+        Hỗ trợ file JSON có mảng ở cấp cao nhất (parse tăng dần)
+        và NDJSON (mỗi dòng một object).
+        """
+        file_path = Path(file_path)
+        
+        if not file_path.exists():
+            raise FileNotFoundError(f"File không tồn tại: {file_path}")
+        
+        with open(file_path, 'r', encoding='utf-8') as f:
+            yield from DataLoader.iter_records_from_stream(f)
+    
+    @staticmethod
+    def iter_records_from_stream(f: TextIO) -> Iterator[dict]:
+        """Đọc dữ liệu thô từ một luồng văn bản (mảng JSON hoặc NDJSON)"""
+        # Xác định định dạng theo ký tự đầu tiên khác khoảng trắng
+        first_char = ''
+        while True:
+            first_char = f.read(1)
+            if not first_char or not first_char.isspace():
+                break
+        
+        try:
+            if first_char == '[':
+                yield from DataLoader._iter_json_array(f)
+            elif first_char:
+                yield from DataLoader._iter_ndjson(f, first_char)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"File JSON không hợp lệ: {e}")
+    
+    @staticmethod
+    def iter_students(file_path: str) -> Iterator[Student]:
+        """Load sinh viên theo luồng (generator), bộ nhớ không phụ thuộc kích thước file"""
+        for index, student_data in enumerate(DataLoader.iter_records(file_path)):
+            try:
+                yield Student(**student_data)
+            except Exception as e:
+                raise ValueError(f"Lỗi khi load dữ liệu (bản ghi {index}): {e}")
+    
+    @staticmethod
+    def _iter_ndjson(f: TextIO, first_char: str) -> Iterator[dict]:
+        """Đọc NDJSON từng dòng (ký tự đầu tiên đã được đọc trước)"""
+        first_line = first_char + f.readline()
+        yield json.loads(first_line)
+        
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    
+    @staticmethod
+    def _iter_json_array(f: TextIO) -> Iterator[dict]:
+        """Parse tăng dần các phần tử của một mảng JSON (dấu '[' đã được đọc)"""
+        decoder = json.JSONDecoder()
+        buffer = ''
+        pos = 0
+        eof = False
+        expect_value = True
+        has_values = False
+        
+        while True:
+            # Bỏ khoảng trắng, đọc thêm dữ liệu khi hết buffer
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer = f.read(READ_CHUNK_SIZE)
+                pos = 0
+                eof = not buffer
+            
+            if pos >= len(buffer):
+                raise json.JSONDecodeError("Mảng JSON chưa được đóng", buffer, pos)
+            
+            char = buffer[pos]
+            if char == ']':
+                if expect_value and has_values:
+                    raise json.JSONDecodeError("Dấu ',' thừa trước ']'", buffer, pos)
+                DataLoader._expect_end(f, buffer, pos + 1)
+                return
+            
+            if not expect_value:
+                if char != ',':
+                    raise json.JSONDecodeError("Thiếu dấu ',' giữa các phần tử", buffer, pos)
+                pos += 1
+                expect_value = True
+                continue
+            
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # Phần tử kết thúc đúng cuối buffer có thể còn bị cắt dở
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            
+            if not complete:
+                # Đọc thêm ít nhất bằng phần còn dở để phần tử lớn không bị decode lại quá nhiều lần
+                chunk = f.read(max(READ_CHUNK_SIZE, len(buffer) - pos))
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                eof = not chunk
+                continue
+            
+            yield value
+            pos = end
+            expect_value = False
+            has_values = True
+            
+            # Bỏ phần đã xử lý để buffer không lớn dần
+            if pos > READ_CHUNK_SIZE:
+                buffer = buffer[pos:]
+                pos = 0
+    
+    @staticmethod
+    def _expect_end(f: TextIO, buffer: str, pos: int):
+        """Sau dấu ']' đóng mảng chỉ được còn khoảng trắng (như json.load)"""
+        while True:
+            rest = buffer[pos:]
+            remainder = rest.lstrip()
+            if remainder:
+                raise json.JSONDecodeError("Dữ liệu thừa sau mảng JSON", buffer, pos + len(rest) - len(remainder))
+            buffer = f.read(READ_CHUNK_SIZE)
+            pos = 0
+            if not buffer:
+                return
+    
+    @staticmethod
+    def write_results_to_csv(results: Iterable, output_path: str) -> int:
+        """Ghi kết quả ra file CSV theo luồng, trả về số dòng đã ghi"""
+        count = 0
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(RESULT_CSV_COLUMNS)
+            for result in results:
+                writer.writerow([
+                    result.student_id,
+                    result.score,
+                    result.risk_level,
+                    result.note or ''
+                ])
+                count += 1
+        
+        return count
+    
     @staticmethod
     def save_results_to_csv(results: List, output_path: str):
         """Lưu kết quả ra file CSV"""
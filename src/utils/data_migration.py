@@ -3,14 +3,24 @@ Data Migration Utility
 Công cụ để migrate dữ liệu từ file JSON sang database
 """
 
+import hashlib
 import json
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
+from typing import Optional
+from pydantic import ValidationError
+from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from src.database.database import SessionLocal
-from src.services.student_service import StudentService
-from src.models.student import StudentCreate, Attendance, Assignment, Contact
+from src.database.database import SessionLocal, create_tables
+from src.services.student_service import StudentService, BULK_BATCH_SIZE
+from src.models.student import (
+    StudentCreate, Attendance, Assignment, Contact,
+    StudentDB, MigrationCheckpointDB, BulkStudentRecord
+)
+from src.utils.data_loader import DataLoader
 
 
 def migrate_json_to_database(json_file_path: str):
@@ -90,6 +100,147 @@ def migrate_json_to_database(json_file_path: str):
         db.close()
 
 
+def migrate_json_to_database_bulk(
+    json_file_path: str,
+    batch_size: int = BULK_BATCH_SIZE,
+    resume: bool = True
+) -> dict:
+    """
+    Migrate hàng loạt từ file JSON/NDJSON sang database, có thể tiếp tục khi bị gián đoạn
+    
+    Tập student_id đã có được đọc một lần; sinh viên đã tồn tại được bỏ qua như
+    migrate_json_to_database. Mỗi batch nhiều sinh viên được ghi bằng insert
+    executemany trong một transaction, cùng với checkpoint (số bản ghi đã xử lý),
+    nên chạy lại với resume=True sẽ tiếp tục từ batch chưa hoàn thành.
+    """
+    path = Path(json_file_path).resolve()
+    if not path.exists():
+        raise FileNotFoundError(f"File không tồn tại: {path}")
+    
+    db = SessionLocal()
+    student_service = StudentService(db)
+    summary = {
+        "records": 0,
+        "resumed_from": 0,
+        "skipped": 0,
+        "students_created": 0,
+        "attendance_inserted": 0,
+        "assignments_inserted": 0,
+        "contacts_inserted": 0,
+        "errors": [],
+        "completed": False
+    }
+    
+    try:
+        checkpoint_key = _checkpoint_key(path)
+        fingerprint = _file_fingerprint(path)
+        
+        start = 0
+        checkpoint = _load_checkpoint(db, checkpoint_key)
+        if resume and checkpoint and checkpoint.fingerprint == fingerprint:
+            start = checkpoint.records
+        summary["resumed_from"] = summary["records"] = start
+        
+        existing_ids = set(db.scalars(select(StudentDB.student_id)))
+        records = DataLoader.iter_records(str(path))
+        # Bỏ qua các bản ghi đã được ghi ở lần chạy trước (chỉ parse, không truy vấn)
+        for _ in islice(records, start):
+            pass
+        
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            TextColumn("{task.completed} bản ghi"),
+            TextColumn("{task.fields[events]} sự kiện"),
+            TextColumn("[cyan]{task.fields[rate]:.0f} sự kiện/s"),
+            TimeElapsedColumn()
+        ) as progress:
+            task = progress.add_task(f"Migrate {path.name}", total=None, completed=start, events=0, rate=0)
+            events = 0
+            
+            while True:
+                chunk = list(islice(records, batch_size))
+                if not chunk:
+                    break
+                
+                valid = []
+                for offset, record in enumerate(chunk):
+                    index = summary["records"] + offset
+                    student_id = record.get("student_id") if isinstance(record, dict) else None
+                    if student_id in existing_ids:
+                        summary["skipped"] += 1
+                        continue
+                    try:
+                        valid.append((index, BulkStudentRecord.model_validate(record)))
+                    except ValidationError as e:
+                        summary["errors"].append({
+                            "index": index,
+                            "student_id": None if student_id is None else str(student_id),
+                            "error": str(e)
+                        })
+                        continue
+                    # Bản ghi trùng student_id phía sau cũng bị bỏ qua
+                    existing_ids.add(student_id)
+                
+                counts = student_service.ingest_batch(valid, summary["errors"])
+                summary["records"] += len(chunk)
+                _save_checkpoint(db, checkpoint_key, path, fingerprint, summary["records"])
+                db.commit()
+                
+                summary["students_created"] += counts["students_created"]
+                for key in ("attendance_inserted", "assignments_inserted", "contacts_inserted"):
+                    summary[key] += counts[key]
+                    events += counts[key]
+                
+                elapsed = progress.tasks[task].elapsed or 0
+                progress.update(
+                    task,
+                    completed=summary["records"],
+                    events=events,
+                    rate=events / elapsed if elapsed else 0
+                )
+        
+        summary["completed"] = True
+        
+    except Exception as e:
+        db.rollback()
+        summary["errors"].append({"index": summary["records"], "student_id": None, "error": str(e)})
+        print(f"❌ Lỗi trong quá trình migration: {e}")
+        print(f"   Đã ghi {summary['records']} bản ghi; chạy lại để tiếp tục từ checkpoint")
+    finally:
+        db.close()
+    
+    return summary
+
+
+def _checkpoint_key(path: Path) -> str:
+    """Khoá checkpoint trong bảng migration_checkpoints cho một file nguồn"""
+    return hashlib.sha1(str(path).encode("utf-8")).hexdigest()
+
+
+def _file_fingerprint(path: Path) -> str:
+    """Kích thước và thời điểm sửa file; file thay đổi thì checkpoint cũ không còn hiệu lực"""
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _load_checkpoint(db: Session, key: str) -> Optional[MigrationCheckpointDB]:
+    """Đọc checkpoint đã lưu (hoặc None)"""
+    return db.get(MigrationCheckpointDB, key)
+
+
+def _save_checkpoint(db: Session, key: str, path: Path, fingerprint: str, records: int):
+    """Ghi checkpoint trong transaction hiện tại (commit cùng batch dữ liệu)"""
+    record = db.get(MigrationCheckpointDB, key)
+    if record:
+        record.fingerprint = fingerprint
+        record.records = records
+    else:
+        db.add(MigrationCheckpointDB(
+            source_key=key, file_path=str(path), fingerprint=fingerprint, records=records
+        ))
+
+
 def migrate_sample_data():
     """Migrate dữ liệu mẫu từ data/sample_students.json"""
     sample_file = Path("data/sample_students.json")
@@ -99,7 +250,12 @@ def migrate_sample_data():
         return
     
     print("🔄 Bắt đầu migration dữ liệu mẫu...")
-    migrate_json_to_database(str(sample_file))
+    create_tables()
+    summary = migrate_json_to_database_bulk(str(sample_file))
+    print(
+        f"🎉 Đã xử lý {summary['records']} bản ghi: {summary['students_created']} sinh viên mới, "
+        f"bỏ qua {summary['skipped']} sinh viên đã tồn tại, {len(summary['errors'])} lỗi"
+    )
 
 
 if __name__ == "__main__":
@@ -3,16 +3,19 @@ from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
 from typing import List
 
-from src.database.database import get_db
+from src.database.database import get_read_db
 from src.services.student_service import StudentService
 from src.services.risk_service import RiskService
 from src.web.templates import templates
 
 router = APIRouter()
 
+# Các trang truy vấn database dùng `def` thường: FastAPI chạy chúng trong threadpool,
+# SQLAlchemy đồng bộ không chặn event loop. Trang chỉ render template giữ `async def`.
+
 
 @router.get("/", response_class=HTMLResponse)
-async def home_page(request: Request, db: Session = Depends(get_db)):
+async def home_page(request: Request, db: Session = Depends(get_read_db)):
     """Dashboard trang chủ"""
     return templates.TemplateResponse("dashboard.html", {
         "request": request
@@ -20,7 +23,7 @@ async def home_page(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/config", response_class=HTMLResponse)
-async def config_page(request: Request, db: Session = Depends(get_db)):
+async def config_page(request: Request, db: Session = Depends(get_read_db)):
     """Trang cấu hình hệ thống"""
     return templates.TemplateResponse("config.html", {
         "request": request
@@ -28,7 +31,7 @@ async def config_page(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/students", response_class=HTMLResponse)
-async def students_page(request: Request, db: Session = Depends(get_db)):
+async def students_page(request: Request, db: Session = Depends(get_read_db)):
     """Trang danh sách sinh viên với sort và filter"""
     return templates.TemplateResponse("student_list.html", {
         "request": request
@@ -36,10 +39,10 @@ async def students_page(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/students/{student_id}", response_class=HTMLResponse)
-async def student_detail_page(
+def student_detail_page(
     request: Request, 
     student_id: str, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Trang chi tiết sinh viên"""
     student_service = StudentService(db)
@@ -72,12 +75,14 @@ async def student_detail_page(
     # Dữ liệu cho biểu đồ rủi ro
     risk_distribution = [0, 0, 0]  # [LOW, MEDIUM, HIGH]
     for evaluation in risk_evaluations:
+        # Một dòng đã compaction đại diện cho repeat_count lần đánh giá
+        count = evaluation.repeat_count or 1
         if evaluation.risk_level == "LOW":
-            risk_distribution[0] += 1
+            risk_distribution[0] += count
         elif evaluation.risk_level == "MEDIUM":
-            risk_distribution[1] += 1
+            risk_distribution[1] += count
         elif evaluation.risk_level == "HIGH":
-            risk_distribution[2] += 1
+            risk_distribution[2] += count
     
     return templates.TemplateResponse("student_detail.html", {
         "request": request,
@@ -94,18 +99,13 @@ async def student_detail_page(
 
 
 @router.get("/risk/high", response_class=HTMLResponse)
-async def high_risk_page(request: Request, db: Session = Depends(get_db)):
+def high_risk_page(request: Request, db: Session = Depends(get_read_db)):
     """Trang sinh viên có rủi ro cao"""
     risk_service = RiskService(db)
-    student_service = StudentService(db)
     
+    # evaluation.student được nạp cùng query (join qua con trỏ latest_evaluation_id)
     high_risk_evaluations = risk_service.get_high_risk_students()
     
-    # Thêm thông tin sinh viên
-    for evaluation in high_risk_evaluations:
-        student = student_service.get_student_by_db_id(evaluation.student_id)
-        evaluation.student = student
-    
     return templates.TemplateResponse("risk_page.html", {
         "request": request,
         "risk_evaluations": high_risk_evaluations,
@@ -114,18 +114,13 @@ async def high_risk_page(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/risk/medium", response_class=HTMLResponse)
-async def medium_risk_page(request: Request, db: Session = Depends(get_db)):
+def medium_risk_page(request: Request, db: Session = Depends(get_read_db)):
     """Trang sinh viên có rủi ro trung bình"""
     risk_service = RiskService(db)
-    student_service = StudentService(db)
     
+    # evaluation.student được nạp cùng query (join qua con trỏ latest_evaluation_id)
     medium_risk_evaluations = risk_service.get_medium_risk_students()
     
-    # Thêm thông tin sinh viên
-    for evaluation in medium_risk_evaluations:
-        student = student_service.get_student_by_db_id(evaluation.student_id)
-        evaluation.student = student
-    
     return templates.TemplateResponse("risk_page.html", {
         "request": request,
         "risk_evaluations": medium_risk_evaluations,
@@ -3,21 +3,32 @@ Templates Management Module
 Quản lý templates cho web interface
 
 Cấu trúc:
-- src/web/templates.py: Logic tạo templates (file Python)
-- templates/: Thư mục chứa HTML templates (được tạo tự động)
+- src/web/templates.py: Nội dung templates (file Python), nạp thẳng vào bộ nhớ khi chạy
+- templates/: Bản HTML xuất ra bằng lệnh CLI `generate-templates` (không cần khi chạy web)
 """
 
 import os
+import tempfile
 from pathlib import Path
+from typing import Optional
 from fastapi import Request
 from fastapi.templating import Jinja2Templates
+from jinja2 import DictLoader, FileSystemBytecodeCache
 
-# Tạo thư mục templates nếu chưa tồn tại
-templates_dir = Path("templates")
-templates_dir.mkdir(exist_ok=True)
 
-# Jinja2Templates để render HTML templates
-templates = Jinja2Templates(directory="templates")
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """
+    Bytecode cache trên đĩa, dùng chung giữa các worker/process
+    
+    Thư mục lấy từ TEMPLATE_CACHE_DIR (mặc định trong thư mục tạm); không tạo được
+    (ví dụ filesystem chỉ đọc) thì chỉ dùng cache trong bộ nhớ.
+    """
+    cache_dir = Path(os.getenv("TEMPLATE_CACHE_DIR", Path(tempfile.gettempdir()) / "student_risk_templates"))
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return None
+    return FileSystemBytecodeCache(str(cache_dir))
 
 
 def create_base_template():
@@ -266,13 +277,7 @@ function loadDashboardData() {
     // Load statistics
     makeRequest('/api/dashboard/stats')
         .then(data => {
-            document.getElementById('totalStudents').textContent = data.total_students;
-            document.getElementById('highRiskCount').textContent = data.high_risk_count;
-            document.getElementById('mediumRiskCount').textContent = data.medium_risk_count;
-            document.getElementById('lowRiskCount').textContent = data.low_risk_count;
-            
-            // Create risk distribution chart
-            createRiskChart(data.risk_distribution);
+            updateStats(data);
         })
         .catch(error => {
             console.error('Error loading dashboard stats:', error);
@@ -288,9 +293,29 @@ function loadDashboardData() {
         });
 }
 
+let riskChart = null;
+let recentHighRisk = [];
+
+function updateStats(data) {
+    document.getElementById('totalStudents').textContent = data.total_students;
+    document.getElementById('highRiskCount').textContent = data.high_risk_count;
+    document.getElementById('mediumRiskCount').textContent = data.medium_risk_count;
+    document.getElementById('lowRiskCount').textContent = data.low_risk_count;
+    
+    // Create risk distribution chart
+    createRiskChart(data.risk_distribution);
+}
+
 function createRiskChart(data) {
+    // Chart đã có: chỉ cập nhật số liệu thay vì vẽ chồng chart mới
+    if (riskChart) {
+        riskChart.data.datasets[0].data = [data.low, data.medium, data.high];
+        riskChart.update();
+        return;
+    }
+    
     const ctx = document.getElementById('riskChart').getContext('2d');
-    new Chart(ctx, {
+    riskChart = new Chart(ctx, {
         type: 'doughnut',
         data: {
             labels: ['Thấp', 'Trung bình', 'Cao'],
@@ -315,6 +340,7 @@ function createRiskChart(data) {
 }
 
 function displayRecentHighRiskStudents(students) {
+    recentHighRisk = students;
     const container = document.getElementById('recentHighRiskStudents');
     
     if (students.length === 0) {
@@ -342,8 +368,27 @@ function refreshDashboard() {
     showAlert('Dashboard đã được làm mới', 'success');
 }
 
+// Nhận thống kê và sinh viên rủi ro cao mới qua server-sent events thay vì polling
+function subscribeDashboardEvents() {
+    if (!window.EventSource) {
+        return;
+    }
+    
+    const source = new EventSource('/api/events/dashboard');
+    source.addEventListener('stats', event => {
+        updateStats(JSON.parse(event.data).stats);
+    });
+    source.addEventListener('high_risk', event => {
+        const evaluations = JSON.parse(event.data).evaluations;
+        displayRecentHighRiskStudents(evaluations.concat(recentHighRisk).slice(0, 5));
+    });
+}
+
 // Load data when page loads
-document.addEventListener('DOMContentLoaded', loadDashboardData);
+document.addEventListener('DOMContentLoaded', () => {
+    loadDashboardData();
+    subscribeDashboardEvents();
+});
 </script>
 {% endblock %}"""
 
@@ -596,10 +641,13 @@ def create_student_list_template():
 <script>
 let currentPage = 1;
 let totalPages = 1;
+let currentCursor = null;
+let nextCursor = null;
+let previousCursors = [];
 
-// Load students with filters
-function loadStudents(page = 1) {
-    currentPage = page;
+// Load students with filters (cursor = null là trang đầu)
+function loadStudents(cursor = null) {
+    currentCursor = cursor;
     
     const riskFilter = document.getElementById('riskFilter').value;
     const sortBy = document.getElementById('sortBy').value;
@@ -607,7 +655,6 @@ function loadStudents(page = 1) {
     const pageSize = document.getElementById('pageSize').value;
     
     const params = new URLSearchParams({
-        page: page,
         limit: pageSize,
         sort_by: sortBy,
         sort_order: sortOrder
@@ -616,8 +663,23 @@ function loadStudents(page = 1) {
     if (riskFilter) {
         params.append('risk_level', riskFilter);
     }
+    if (cursor) {
+        params.append('cursor', cursor);
+    }
     
-    makeRequest(`/api/students/?${params.toString()}`)
+    // Dùng fetch trực tiếp để đọc header X-Next-Cursor / X-Total-Count
+    fetch(`/api/students/?${params.toString()}`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            nextCursor = response.headers.get('X-Next-Cursor');
+            const total = response.headers.get('X-Total-Count');
+            if (total !== null) {
+                totalPages = Math.max(1, Math.ceil(parseInt(total) / parseInt(pageSize)));
+            }
+            return response.json();
+        })
         .then(students => {
             displayStudents(students);
             updatePagination();
@@ -628,6 +690,25 @@ function loadStudents(page = 1) {
         });
 }
 
+function firstPage() {
+    currentPage = 1;
+    previousCursors = [];
+    loadStudents(null);
+}
+
+function nextPage() {
+    if (!nextCursor) return;
+    previousCursors.push(currentCursor);
+    currentPage += 1;
+    loadStudents(nextCursor);
+}
+
+function previousPage() {
+    if (previousCursors.length === 0) return;
+    currentPage -= 1;
+    loadStudents(previousCursors.pop());
+}
+
 function displayStudents(students) {
     const container = document.getElementById('studentsContainer');
     
@@ -673,41 +754,22 @@ function displayStudents(students) {
 
 function updatePagination() {
     const pagination = document.getElementById('pagination');
-    const pageSize = parseInt(document.getElementById('pageSize').value);
-    
-    // Calculate total pages (simplified - in real app you'd get this from API)
-    totalPages = Math.ceil(20 / pageSize); // Assuming 20 students total for demo
     
-    let paginationHtml = '';
-    
-    // Previous button
-    paginationHtml += `
-        <li class="page-item ${currentPage === 1 ? 'disabled' : ''}">
-            <a class="page-link" href="#" onclick="loadStudents(${currentPage - 1})">Trước</a>
+    pagination.innerHTML = `
+        <li class="page-item ${previousCursors.length === 0 ? 'disabled' : ''}">
+            <a class="page-link" href="#" onclick="previousPage(); return false;">Trước</a>
         </li>
-    `;
-    
-    // Page numbers
-    for (let i = 1; i <= totalPages; i++) {
-        paginationHtml += `
-            <li class="page-item ${currentPage === i ? 'active' : ''}">
-                <a class="page-link" href="#" onclick="loadStudents(${i})">${i}</a>
-            </li>
-        `;
-    }
-    
-    // Next button
-    paginationHtml += `
-        <li class="page-item ${currentPage === totalPages ? 'disabled' : ''}">
-            <a class="page-link" href="#" onclick="loadStudents(${currentPage + 1})">Sau</a>
+        <li class="page-item disabled">
+            <span class="page-link">Trang ${currentPage} / ${Math.max(totalPages, currentPage)}</span>
+        </li>
+        <li class="page-item ${nextCursor ? '' : 'disabled'}">
+            <a class="page-link" href="#" onclick="nextPage(); return false;">Sau</a>
         </li>
     `;
-    
-    pagination.innerHTML = paginationHtml;
 }
 
 function applyFilters() {
-    loadStudents(1); // Reset to first page
+    firstPage(); // Reset to first page
 }
 
 function clearFilters() {
@@ -715,11 +777,11 @@ function clearFilters() {
     document.getElementById('sortBy').value = 'student_id';
     document.getElementById('sortOrder').value = 'asc';
     document.getElementById('pageSize').value = '20';
-    loadStudents(1);
+    firstPage();
 }
 
 function refreshStudents() {
-    loadStudents(currentPage);
+    loadStudents(currentCursor);
     showAlert('Danh sách sinh viên đã được làm mới', 'success');
 }
 
@@ -751,7 +813,7 @@ function exportToCSV() {
 
 // Load students when page loads
 document.addEventListener('DOMContentLoaded', () => {
-    loadStudents(1);
+    firstPage();
 });
 </script>
 {% endblock %}"""
@@ -910,29 +972,129 @@ new Chart(attendanceCtx, {
 {% endblock %}"""
 
 
-def create_templates():
-    """Tạo tất cả templates"""
-    templates_dir = Path("templates")
-    templates_dir.mkdir(exist_ok=True)
-    
-    # Tạo base template
-    with open(templates_dir / "base.html", "w", encoding="utf-8") as f:
-        f.write(create_base_template())
-    
-    # Tạo dashboard template
-    with open(templates_dir / "dashboard.html", "w", encoding="utf-8") as f:
-        f.write(create_dashboard_template())
-    
-    # Tạo student list template
-    with open(templates_dir / "student_list.html", "w", encoding="utf-8") as f:
-        f.write(create_student_list_template())
-    
-    # Tạo student detail template
-    with open(templates_dir / "student_detail.html", "w", encoding="utf-8") as f:
-        f.write(create_student_detail_template())
+def create_risk_page_template():
+    """Tạo template danh sách sinh viên theo mức rủi ro"""
+    return """{% extends "base.html" %}
+
+{% block title %}
+    {% if risk_level == "HIGH" %}
+        Sinh viên có rủi ro cao
+    {% else %}
+        Sinh viên có rủi ro trung bình
+    {% endif %}
+{% endblock %}
+
+{% block content %}
+<div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
+    <h1 class="h2">
+        {% if risk_level == "HIGH" %}
+            <i class="fas fa-exclamation-triangle text-danger"></i> Sinh viên có rủi ro cao
+        {% else %}
+            <i class="fas fa-exclamation-circle text-warning"></i> Sinh viên có rủi ro trung bình
+        {% endif %}
+    </h1>
+    <div class="btn-toolbar mb-2 mb-md-0">
+        <div class="btn-group me-2">
+            <a href="/students" class="btn btn-sm btn-outline-secondary">
+                <i class="fas fa-users"></i> Tất cả sinh viên
+            </a>
+            {% if risk_level == "HIGH" %}
+            <a href="/risk/medium" class="btn btn-sm btn-outline-warning">
+                <i class="fas fa-exclamation-circle"></i> Rủi ro trung bình
+            </a>
+            {% else %}
+            <a href="/risk/high" class="btn btn-sm btn-outline-danger">
+                <i class="fas fa-exclamation-triangle"></i> Rủi ro cao
+            </a>
+            {% endif %}
+        </div>
+    </div>
+</div>
+
+{% if risk_evaluations %}
+<div class="row">
+    {% for evaluation in risk_evaluations %}
+    <div class="col-md-6 col-lg-4 mb-4">
+        <div class="card risk-card {{ risk_level.lower() }}">
+            <div class="card-body">
+                <h5 class="card-title">
+                    <i class="fas fa-user-graduate"></i> 
+                    {% if evaluation.student %}
+                        {{ evaluation.student.student_name }}
+                    {% else %}
+                        Sinh viên #{{ evaluation.student_id }}
+                    {% endif %}
+                </h5>
+                <p class="card-text">
+                    <strong>Mã SV:</strong> 
+                    {% if evaluation.student %}
+                        {{ evaluation.student.student_id }}
+                    {% else %}
+                        #{{ evaluation.student_id }}
+                    {% endif %}<br>
+                    <strong>Điểm số:</strong> {{ evaluation.score }}/5<br>
+                    <strong>Mức rủi ro:</strong> 
+                    <span class="risk-{{ evaluation.risk_level.lower() }}">
+                        {{ evaluation.risk_level }}
+                    </span><br>
+                    <strong>Ngày đánh giá:</strong> {{ evaluation.evaluated_at.strftime('%d/%m/%Y %H:%M') }}
+                </p>
+                {% if evaluation.student %}
+                <a href="/students/{{ evaluation.student.student_id }}" class="btn btn-primary btn-sm">
+                    <i class="fas fa-eye"></i> Xem chi tiết
+                </a>
+                {% endif %}
+            </div>
+        </div>
+    </div>
+    {% endfor %}
+</div>
+{% else %}
+<div class="alert alert-info">
+    <i class="fas fa-info-circle"></i> 
+    {% if risk_level == "HIGH" %}
+        Không có sinh viên nào có rủi ro cao.
+    {% else %}
+        Không có sinh viên nào có rủi ro trung bình.
+    {% endif %}
+</div>
+{% endif %}
+{% endblock %}"""
+
+
+# Tên file template -> hàm tạo nội dung
+TEMPLATE_SOURCES = {
+    "base.html": create_base_template,
+    "dashboard.html": create_dashboard_template,
+    "student_list.html": create_student_list_template,
+    "student_detail.html": create_student_detail_template,
+    "config.html": create_config_template,
+    "risk_page.html": create_risk_page_template,
+}
+
+# Jinja2Templates render từ bộ nhớ: không đọc/ghi thư mục templates/ khi chạy
+templates = Jinja2Templates(
+    directory="templates",
+    loader=DictLoader({name: create() for name, create in TEMPLATE_SOURCES.items()}),
+    bytecode_cache=_bytecode_cache(),
+    auto_reload=False
+)
+
+
+def precompile_templates() -> int:
+    """Biên dịch trước mọi template (nạp từ bytecode cache nếu có), trả về số template"""
+    for name in TEMPLATE_SOURCES:
+        templates.get_template(name)
+    return len(TEMPLATE_SOURCES)
+
+
+def create_templates(output_dir: str = "templates") -> int:
+    """Xuất tất cả templates ra thư mục HTML, trả về số file đã ghi"""
+    templates_dir = Path(output_dir)
+    templates_dir.mkdir(parents=True, exist_ok=True)
     
-    # Tạo config template
-    with open(templates_dir / "config.html", "w", encoding="utf-8") as f:
-        f.write(create_config_template())
+    for name, create in TEMPLATE_SOURCES.items():
+        with open(templates_dir / name, "w", encoding="utf-8") as f:
+            f.write(create())
     
-    print("✅ Web templates đã được tạo") 
\ No newline at end of file
+    return len(TEMPLATE_SOURCES)
@@ -0,0 +1,50 @@
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+# Database riêng cho test, phải đặt trước khi import src.database.database
+_test_dir = tempfile.mkdtemp(prefix="student_risk_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_test_dir) / 'test.db'}"
+os.environ.pop("DATABASE_READ_URL", None)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def make_students():
+    """Sinh danh sách Student ngẫu nhiên (có seed), gồm cả sinh viên không có dữ liệu"""
+    from src.models.student import Assignment, Attendance, Contact, Student
+    
+    def make(count: int, seed: int = 0):
+        rng = random.Random(seed)
+        start = date(2024, 1, 1)
+        
+        def day():
+            return start + timedelta(days=rng.randrange(120))
+        
+        return [
+            Student(
+                student_id=f"R{i:04d}",
+                student_name=f"Sinh viên {i}",
+                attendance=[
+                    Attendance(date=day(), status=rng.choice(["ATTEND", "ABSENT"]))
+                    for _ in range(rng.randrange(0 if i % 7 == 0 else 1, 12))
+                ],
+                assignments=[
+                    Assignment(date=day(), name=f"Bài {j}", submitted=rng.random() < 0.6)
+                    for j in range(rng.randrange(0, 6))
+                ],
+                contacts=[
+                    Contact(date=day(), status=rng.choice(["SUCCESS", "FAILED"]))
+                    for _ in range(rng.randrange(0, 5))
+                ]
+            )
+            for i in range(count)
+        ]
+    
+    return make
@@ -0,0 +1,66 @@
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import app
+from src.database.database import SessionLocal, create_tables
+from src.models.student import BulkIngestResponse
+from src.services.student_service import StudentService
+
+
+def test_non_string_student_id_is_reported_as_error():
+    """Bản ghi có student_id không phải chuỗi bị báo lỗi, response vẫn hợp lệ và các bản ghi khác được ghi"""
+    create_tables()
+    db = SessionLocal()
+    try:
+        summary = StudentService(db).bulk_ingest([
+            {"student_id": "BULK1", "student_name": "Bulk"},
+            {"student_id": 5, "student_name": "Số"}
+        ])
+    finally:
+        db.close()
+    
+    response = BulkIngestResponse.model_validate(summary)
+    assert response.students_created == 1
+    assert [(error.index, error.student_id) for error in response.errors] == [(1, "5")]
+
+
+def test_rollback_does_not_report_errored_records_twice(monkeypatch):
+    """Batch bị rollback: bản ghi đã có lỗi validate chỉ được báo một lần"""
+    create_tables()
+    ingest_batch = StudentService.ingest_batch
+    
+    def failing_ingest_batch(self, valid, errors):
+        ingest_batch(self, valid, errors)
+        raise SQLAlchemyError("disk I/O error")
+    
+    monkeypatch.setattr(StudentService, "ingest_batch", failing_ingest_batch)
+    db = SessionLocal()
+    try:
+        summary = StudentService(db).bulk_ingest([
+            {"student_id": "BULK2", "student_name": "Bulk"},
+            {"student_id": "BULK3"}
+        ])
+    finally:
+        db.close()
+    
+    assert sorted((error["index"], error["student_id"]) for error in summary["errors"]) == [(0, "BULK2"), (1, "BULK3")]
+    assert "student_name" in summary["errors"][0]["error"]
+
+
+def test_bulk_endpoint_streams_ndjson_body():
+    """Body NDJSON được đọc theo chunk; body không phải UTF-8 bị từ chối với 400"""
+    client = TestClient(app)
+    body = "\n".join(
+        json.dumps({"student_id": f"BULKN{i}", "student_name": "NDJSON", "attendance": [
+            {"date": "2024-01-01", "status": "ATTEND"}
+        ]})
+        for i in range(3)
+    )
+    response = client.post("/api/students/bulk", content=body.encode("utf-8"))
+    assert response.status_code == 200
+    assert (response.json()["students_created"], response.json()["attendance_inserted"]) == (3, 3)
+    
+    response = client.post("/api/students/bulk", content=b'[{"student_id": "\xff"}]')
+    assert response.status_code == 400
@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+
+from src.models.config import RiskThresholdConfig
+from src.risk_assessment.batch import SignalBatch
+from src.risk_assessment.calculator import RiskCalculator
+from src.risk_assessment.config import RiskConfig
+
+
+CONFIGS = [
+    RiskConfig(),
+    RiskConfig(attendance_threshold=0.5, assignment_threshold=0.8, contact_failed_threshold=1),
+    RiskConfig(attendance_threshold=1.0, assignment_threshold=0.0, contact_failed_threshold=4),
+]
+
+
+def _scalar(calculator, students, thresholds=None, as_of=None):
+    return [calculator.calculate_risk(student, thresholds, as_of).model_dump() for student in students]
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("thresholds", [None, RiskThresholdConfig(medium_threshold=1, high_threshold=2)])
+def test_batch_matches_scalar(make_students, config, thresholds):
+    """calculate_risks (NumPy theo cột) cho đúng kết quả của calculate_risk từng sinh viên"""
+    students = make_students(300, seed=1)
+    calculator = RiskCalculator(config)
+    
+    batch = [result.model_dump() for result in calculator.calculate_risks(students, thresholds)]
+    assert batch == _scalar(calculator, students, thresholds)
+
+
+def test_batch_matches_scalar_with_windows(make_students):
+    """Với cửa sổ thời gian, đường batch (tổng tiền tố) khớp với lọc từng sự kiện"""
+    students = make_students(300, seed=2)
+    calculator = RiskCalculator(RiskConfig(
+        attendance_window_days=30, assignment_window_days=60, contact_window_days=14
+    ))
+    as_of = date(2024, 3, 15)
+    
+    batch = [result.model_dump() for result in calculator.calculate_risks(students, as_of=as_of)]
+    assert batch == _scalar(calculator, students, as_of=as_of)
+
+
+def test_iter_risks_and_signal_rows_match_batch(make_students):
+    """iter_risks theo từng batch nhỏ và batch dựng từ bộ đếm cho cùng kết quả"""
+    students = make_students(250, seed=3)
+    calculator = RiskCalculator()
+    expected = [result.model_dump() for result in calculator.calculate_risks(students)]
+    
+    streamed = [result.model_dump() for result in calculator.iter_risks(iter(students), batch_size=64)]
+    assert streamed == expected
+    
+    signals = SignalBatch.from_students(students)
+    rows = list(zip(
+        signals.student_ids,
+        signals.attended_sessions.tolist(),
+        signals.total_sessions.tolist(),
+        signals.submitted_assignments.tolist(),
+        signals.total_assignments.tolist(),
+        signals.failed_contacts.tolist()
+    ))
+    from_rows = calculator.calculate_risks_from_signals(SignalBatch.from_rows(rows))
+    assert [result.model_dump() for result in from_rows] == expected
+
+
+def test_empty_input():
+    """Danh sách rỗng trả về danh sách rỗng"""
+    assert RiskCalculator().calculate_risks([]) == []
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from src.database.database import SessionLocal, create_tables
+from src.models.student import RiskEvaluationArchiveDB, RiskEvaluationDB, StudentCreate, StudentDB
+from src.services import compaction_service
+from src.services.compaction_service import CompactionService
+from src.services.student_service import StudentService
+
+
+SCORES = {"LOW": 0, "MEDIUM": 1, "HIGH": 3}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Session trên database dùng chung; trang quét nhỏ để run vắt qua nhiều trang"""
+    monkeypatch.setattr(compaction_service, "COMPACTION_READ_SIZE", 3)
+    create_tables()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def _evaluation(db_id, level, evaluated_at):
+    return RiskEvaluationDB(
+        student_id=db_id, score=SCORES[level], risk_level=level, note=f"Ghi chú {level}", evaluated_at=evaluated_at
+    )
+
+
+def _seed(db, student_id, evaluations):
+    """Sinh viên với các đánh giá (mức rủi ro, thời điểm); latest trỏ tới đánh giá mới nhất"""
+    student = StudentService(db).create_student(StudentCreate(student_id=student_id, student_name="Compact"))
+    rows = [_evaluation(student.id, level, evaluated_at) for level, evaluated_at in evaluations]
+    db.add_all(rows)
+    db.flush()
+    latest = max(rows, key=lambda row: row.evaluated_at)
+    student.latest_evaluation_id = latest.id
+    student.latest_risk_level = latest.risk_level
+    db.commit()
+    return student.id, [row.id for row in rows]
+
+
+def _rows(db, db_id):
+    return [
+        tuple(row)
+        for row in db.execute(
+            select(
+                RiskEvaluationDB.id,
+                RiskEvaluationDB.risk_level,
+                RiskEvaluationDB.repeat_count,
+                RiskEvaluationDB.first_evaluated_at
+            ).where(RiskEvaluationDB.student_id == db_id).order_by(RiskEvaluationDB.evaluated_at)
+        )
+    ]
+
+
+def test_collapse_runs_keeps_last_row_of_each_run(db):
+    """Đánh giá giống nhau liên tiếp gộp vào dòng cuối của run, kể cả run vắt qua ranh giới trang"""
+    start = datetime.utcnow() - timedelta(days=1)
+    levels = ["LOW", "LOW", "LOW", "MEDIUM", "MEDIUM", "LOW", "HIGH", "HIGH", "HIGH", "HIGH"]
+    student, ids = _seed(db, "CMP01", [(level, start + timedelta(hours=i)) for i, level in enumerate(levels)])
+    other, other_ids = _seed(db, "CMP02", [("HIGH", start), ("HIGH", start + timedelta(hours=1))])
+    
+    CompactionService(db).collapse_runs()
+    
+    assert _rows(db, student) == [
+        (ids[2], "LOW", 3, start),
+        (ids[4], "MEDIUM", 2, start + timedelta(hours=3)),
+        (ids[5], "LOW", 1, None),
+        (ids[9], "HIGH", 4, start + timedelta(hours=6)),
+    ]
+    # Run HIGH cuối của CMP01 không bị nối với run HIGH của sinh viên kế tiếp
+    assert _rows(db, other) == [(other_ids[1], "HIGH", 2, start)]
+    
+    # Chạy lại không xoá gì; run đã gộp dài thêm thì repeat_count được cộng dồn
+    assert CompactionService(db).collapse_runs() == 0
+    db.add(_evaluation(other, "HIGH", start + timedelta(hours=5)))
+    db.commit()
+    CompactionService(db).collapse_runs()
+    assert [(count, first) for _, _, count, first in _rows(db, other)] == [(3, start)]
+
+
+def test_archive_keeps_latest_pointer_row(db):
+    """Dòng cũ chuyển sang archive; dòng mà latest_evaluation_id trỏ tới luôn được giữ lại"""
+    old = datetime.utcnow() - timedelta(days=400)
+    now = datetime.utcnow()
+    stale, stale_ids = _seed(db, "CMP03", [
+        ("LOW", old), ("LOW", old + timedelta(hours=1)), ("MEDIUM", old + timedelta(hours=2))
+    ])
+    active, active_ids = _seed(db, "CMP04", [("LOW", old), ("HIGH", old + timedelta(hours=1)), ("LOW", now)])
+    version_before = db.get(StudentDB, stale).data_version or 0
+    
+    summary = CompactionService(db).compact(retention_days=30)
+    assert summary["archived"] >= 3
+    assert summary["remaining"] == db.query(RiskEvaluationDB.id).count()
+    
+    # CMP03: run LOW được gộp rồi chuyển đi; MEDIUM là latest nên ở lại dù đã quá hạn
+    assert [row[0] for row in _rows(db, stale)] == [stale_ids[2]]
+    # CMP04: hai dòng cũ chuyển đi, chỉ còn đánh giá mới
+    assert [row[0] for row in _rows(db, active)] == [active_ids[2]]
+    
+    archived = db.execute(
+        select(RiskEvaluationArchiveDB.id, RiskEvaluationArchiveDB.repeat_count, RiskEvaluationArchiveDB.first_evaluated_at)
+        .where(RiskEvaluationArchiveDB.student_id.in_([stale, active]))
+        .order_by(RiskEvaluationArchiveDB.id)
+    ).all()
+    assert [tuple(row) for row in archived] == [(stale_ids[1], 2, old), (active_ids[0], 1, None), (active_ids[1], 1, None)]
+    
+    db.expire_all()
+    assert db.get(StudentDB, stale).data_version > version_before
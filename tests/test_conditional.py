@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from src.database.database import SessionLocal, create_tables
+from src.models.student import DataVersionDB
+from src.services.version_service import VERSION_NAMES, VersionService
+from src.utils.conditional import http_date, is_not_modified, make_etag
+
+
+@pytest.fixture(scope="module")
+def client():
+    """TestClient với sinh viên ETAG01, ETAG02"""
+    create_tables()
+    client = TestClient(app)
+    for student_id in ("ETAG01", "ETAG02"):
+        response = client.post("/api/students/", json={"student_id": student_id, "student_name": "ETag"})
+        assert response.status_code == 201
+    return client
+
+
+def test_version_rows_are_seeded_and_bumps_do_not_conflict():
+    """Bộ đếm có sẵn sau create_tables; hai writer bump xen kẽ chỉ cần UPDATE, không lỗi trùng khoá"""
+    create_tables()
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        names = {row.name for row in first.query(DataVersionDB)}
+        assert set(VERSION_NAMES) <= names
+        
+        before = VersionService(first).get_version()
+        VersionService(first).bump()
+        first.commit()
+        VersionService(second).bump()
+        second.commit()
+        assert VersionService(first).get_version() == before + 2
+    finally:
+        first.close()
+        second.close()
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('W/"data-7"', True),
+    ('"data-7"', True),
+    ('W/"data-6", W/"data-7"', True),
+    ("*", True),
+    ('W/"data-8"', False),
+    ('W/"config-7"', False),
+])
+def test_if_none_match_uses_weak_comparison(header, expected):
+    """If-None-Match so sánh yếu, nhận danh sách tag và '*'"""
+    assert is_not_modified({"if-none-match": header}, make_etag("data", 7)) is expected
+
+
+def test_if_modified_since_only_without_if_none_match():
+    """If-Modified-Since so theo giây; bị bỏ qua khi có If-None-Match, ngày sai định dạng thì coi như đã đổi"""
+    modified = datetime(2024, 5, 1, 8, 30, 15, 900000)
+    etag = make_etag("data", 3)
+    
+    assert is_not_modified({"if-modified-since": http_date(modified)}, etag, modified)
+    assert not is_not_modified({"if-modified-since": http_date(modified - timedelta(seconds=1))}, etag, modified)
+    assert not is_not_modified({"if-modified-since": "không phải ngày"}, etag, modified)
+    assert not is_not_modified({"if-modified-since": http_date(modified)}, etag, None)
+    assert not is_not_modified(
+        {"if-none-match": make_etag("data", 2), "if-modified-since": http_date(modified)}, etag, modified
+    )
+
+
+@pytest.mark.parametrize("path", [
+    "/api/students/",
+    "/api/dashboard/stats",
+    "/api/risk/high-risk-students",
+    "/api/config",
+    "/api/students/ETAG01/profile",
+    "/api/risk/medium-risk-students",
+])
+def test_matching_etag_returns_304(client, path):
+    """Gửi lại ETag vừa nhận được 304 không có body, kèm lại ETag và Cache-Control: no-cache"""
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+    
+    second = client.get(path, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert second.headers["cache-control"] == "no-cache"
+    
+    if "last-modified" in first.headers:
+        assert client.get(path, headers={"If-Modified-Since": first.headers["last-modified"]}).status_code == 304
+
+
+def test_write_changes_etag(client):
+    """Ghi dữ liệu đổi ETag chung; ETag của sinh viên chỉ đổi khi chính sinh viên đó được ghi"""
+    stats = client.get("/api/dashboard/stats").headers["etag"]
+    first = client.get("/api/students/ETAG01/profile").headers["etag"]
+    second = client.get("/api/students/ETAG02/profile").headers["etag"]
+    
+    response = client.post("/api/students/ETAG01/attendance", json=[{"date": "2024-05-02", "status": "ABSENT"}])
+    assert response.status_code == 200
+    
+    refreshed = client.get("/api/dashboard/stats", headers={"If-None-Match": stats})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != stats
+    assert client.get("/api/students/ETAG01/profile", headers={"If-None-Match": first}).status_code == 200
+    assert client.get("/api/students/ETAG02/profile", headers={"If-None-Match": second}).status_code == 304
+
+
+def test_config_write_changes_config_etag(client):
+    """Lưu cấu hình đổi ETag của /api/config"""
+    current = client.get("/api/config")
+    etag = current.headers["etag"]
+    interval = current.json()["config"]["auto_refresh_interval"]
+    
+    assert client.put("/api/config", json={"auto_refresh_interval": interval}).status_code == 200
+    response = client.get("/api/config", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_unknown_student_is_404_not_304(client):
+    """Sinh viên không tồn tại trả 404 kể cả khi gửi If-None-Match: *"""
+    assert client.get("/api/students/KHONGCO/profile", headers={"If-None-Match": "*"}).status_code == 404
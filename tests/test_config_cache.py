@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from src.database.database import SessionLocal, create_tables
+from src.models.config import ConfigUpdateRequest
+from src.services import config_service
+from src.services.config_service import ConfigService
+from src.services.version_service import CONFIG_VERSION, VersionedCache, VersionService
+
+
+@pytest.fixture
+def db():
+    """Session trên database dùng chung; khôi phục cấu hình ban đầu khi kết thúc"""
+    create_tables()
+    session = SessionLocal()
+    original = ConfigService(session).get_config().model_copy(deep=True)
+    yield session
+    assert ConfigService(session).save_config(original)
+    session.close()
+
+
+def test_versioned_cache_computes_once_per_version():
+    """Giá trị chỉ được tính lại khi phiên bản đổi; nhiều thread cùng lúc chỉ tính một lần"""
+    cache = VersionedCache()
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        time.sleep(0.01)
+        return object()
+    
+    threads = [threading.Thread(target=cache.get, args=("k", 1, compute)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    
+    first = cache.get("k", 1, compute)
+    assert cache.get("k", 1, compute) is first
+    assert cache.get("k", 2, compute) is not first
+    assert len(calls) == 2
+
+
+def test_config_is_parsed_once_until_saved(db, monkeypatch):
+    """Đọc cấu hình nhiều lần chỉ parse một lần; lưu cấu hình tăng phiên bản và lần đọc sau tải lại"""
+    loads = []
+    load_config = ConfigService._load_config
+    
+    def counting_load(self):
+        loads.append(1)
+        return load_config(self)
+    
+    monkeypatch.setattr(ConfigService, "_load_config", counting_load)
+    config_service._config_cache.clear()
+    service = ConfigService(db)
+    
+    version, first = service.get_versioned_config()
+    assert service.get_config() is first
+    other = SessionLocal()
+    try:
+        assert ConfigService(other).get_config() is first
+    finally:
+        other.close()
+    assert len(loads) == 1
+    
+    updated = service.update_config(ConfigUpdateRequest(auto_refresh_interval=first.auto_refresh_interval + 1))
+    assert updated is not None
+    # update_config sửa bản sao, không sửa đối tượng đang nằm trong cache
+    assert first.auto_refresh_interval == updated.auto_refresh_interval - 1
+    
+    new_version, reloaded = service.get_versioned_config()
+    assert new_version == version + 1
+    assert reloaded.auto_refresh_interval == updated.auto_refresh_interval
+    assert len(loads) == 2
+
+
+def test_write_from_other_process_is_seen_on_next_read(db):
+    """Ghi trực tiếp vào database kèm tăng phiên bản (như worker khác) làm cache tải lại"""
+    service = ConfigService(db)
+    config = service.get_config().model_copy(deep=True)
+    config.max_students_per_page = 7 if config.max_students_per_page != 7 else 8
+    service.save_config(config)
+    assert service.get_config().max_students_per_page == config.max_students_per_page
+    
+    other = SessionLocal()
+    try:
+        changed = config.model_copy(update={"max_students_per_page": config.max_students_per_page + 1})
+        other.execute(
+            text("UPDATE system_config SET config_value = :value WHERE config_key = 'system_config'"),
+            {"value": changed.model_dump_json()}
+        )
+        VersionService(other).bump(CONFIG_VERSION)
+        other.commit()
+    finally:
+        other.close()
+    
+    assert service.get_config().max_students_per_page == changed.max_students_per_page
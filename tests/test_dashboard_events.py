@@ -0,0 +1,118 @@
+import asyncio
+import json
+import threading
+from datetime import date
+
+import pytest
+
+from src.database.database import SessionLocal, create_tables
+from src.models.student import Assignment, Attendance, Contact, StudentCreate
+from src.services import dashboard_events
+from src.services.dashboard_events import DashboardEventBroker, format_sse
+from src.services.risk_service import RiskService
+from src.services.student_service import StudentService
+
+
+def _parse(message):
+    """(event, id, data) của một sự kiện SSE"""
+    fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return fields["event"], fields.get("id"), json.loads(fields["data"])
+
+
+def _add_high_risk_student(student_id):
+    db = SessionLocal()
+    try:
+        student_service = StudentService(db)
+        student_service.create_student(StudentCreate(student_id=student_id, student_name=f"Tên {student_id}"))
+        student_service.add_attendance(student_id, [Attendance(date=date(2024, 1, 1), status="ABSENT")])
+        student_service.add_assignments(student_id, [Assignment(date=date(2024, 1, 1), name="Bài 1", submitted=False)])
+        student_service.add_contacts(student_id, [Contact(date=date(2024, 1, day), status="FAILED") for day in (1, 2)])
+        assert RiskService(db).predict_dropout_risk(student_id).risk_level == "HIGH"
+        RiskService(db).rescore_dirty_students()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def broker():
+    create_tables()
+    return DashboardEventBroker(interval=0.01)
+
+
+def test_format_sse():
+    """Mỗi sự kiện gồm id, event, data (JSON một dòng) và kết thúc bằng dòng trống"""
+    assert format_sse("stats", {"tên": "Á", "n": 1}, event_id=7) == 'id: 7\nevent: stats\ndata: {"tên": "Á", "n": 1}\n\n'
+    assert format_sse("ping", {}) == "event: ping\ndata: {}\n\n"
+
+
+def test_poll_emits_each_change_once(broker):
+    """Sau sự kiện đầu, poll chỉ gửi khi dữ liệu đổi: một stats có delta và một high_risk, không lặp lại"""
+    event, event_id, data = _parse(broker.initial_event())
+    assert (event, data["delta"]) == ("stats", None)
+    assert event_id == str(data["version"])
+    assert broker.poll() == []
+    
+    _add_high_risk_student("SSE01")
+    messages = [_parse(message) for message in broker.poll()]
+    assert [event for event, _, _ in messages] == ["stats", "high_risk"]
+    
+    stats = messages[0][2]
+    assert stats["version"] > data["version"]
+    assert stats["delta"]["total_students"] == 1
+    assert stats["delta"]["high_risk_count"] == 1
+    assert [evaluation["student_id"] for evaluation in messages[1][2]["evaluations"]] == ["SSE01"]
+    
+    assert broker.poll() == []
+
+
+def test_initial_event_does_not_replay_history(broker):
+    """Client đầu tiên chỉ nhận trạng thái hiện tại; đánh giá HIGH đã có không được gửi lại"""
+    _add_high_risk_student("SSE02")
+    broker.initial_event()
+    assert broker.poll() == []
+    
+    # Client khác kết nối sau không làm mất mốc của producer
+    broker.initial_event()
+    _add_high_risk_student("SSE03")
+    high_risk = [_parse(message) for message in broker.poll() if "event: high_risk" in message]
+    assert [evaluation["student_id"] for evaluation in high_risk[0][2]["evaluations"]] == ["SSE03"]
+
+
+def test_concurrent_polls_send_one_event(broker):
+    """Nhiều thread poll cùng lúc sau một lần ghi chỉ sinh một bộ sự kiện"""
+    broker.initial_event()
+    _add_high_risk_student("SSE04")
+    
+    results = []
+    barrier = threading.Barrier(8)
+    
+    def poll():
+        barrier.wait()
+        results.extend(broker.poll())
+    
+    threads = [threading.Thread(target=poll) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert sorted(_parse(message)[0] for message in results) == ["high_risk", "stats"]
+
+
+def test_slow_subscriber_drops_oldest_and_last_unsubscribe_resets(broker, monkeypatch):
+    """Hàng đợi đầy thì bỏ sự kiện cũ nhất; client cuối rời đi thì producer quên trạng thái"""
+    monkeypatch.setattr(dashboard_events, "SUBSCRIBER_QUEUE_SIZE", 2)
+    
+    async def scenario():
+        queue = broker.subscribe()
+        for i in range(3):
+            broker.publish(f"m{i}")
+        received = [queue.get_nowait() for _ in range(queue.qsize())]
+        
+        broker.initial_event()
+        broker.unsubscribe(queue)
+        await broker.stop()
+        return received
+    
+    assert asyncio.run(scenario()) == ["m1", "m2"]
+    assert broker._version is None and broker._last_high_id is None
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+
+import pytest
+
+from src.models.student import RiskResult
+from src.utils import data_loader
+from src.utils.data_loader import DataLoader
+
+
+RECORDS = [
+    {
+        "student_id": f"L{i:03d}",
+        "student_name": f"Tên có dấu ']' và ',' số {i}",
+        "attendance": [{"date": "2024-01-02", "status": "ATTEND"}] * (i % 3),
+        "assignments": [{"date": "2024-01-05", "name": "Bài {1}", "submitted": i % 2 == 0}],
+        "contacts": []
+    }
+    for i in range(25)
+]
+
+
+def _read(text):
+    return list(DataLoader.iter_records_from_stream(io.StringIO(text)))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_json_array_matches_json_load(monkeypatch, chunk_size, indent):
+    """Parse tăng dần cho cùng kết quả với json.load, kể cả khi phần tử bị cắt giữa các lần đọc"""
+    monkeypatch.setattr(data_loader, "READ_CHUNK_SIZE", chunk_size)
+    text = "\n  " + json.dumps(RECORDS, ensure_ascii=False, indent=indent) + "\n\n"
+    
+    assert _read(text) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1 << 16])
+def test_ndjson_matches_line_by_line(monkeypatch, chunk_size):
+    """NDJSON (bỏ qua dòng trống) cho cùng bản ghi với json.loads từng dòng"""
+    monkeypatch.setattr(data_loader, "READ_CHUNK_SIZE", chunk_size)
+    text = "\n".join(json.dumps(record, ensure_ascii=False) for record in RECORDS[:10]) + "\n\n"
+    
+    assert _read("  " + text) == RECORDS[:10]
+
+
+@pytest.mark.parametrize("text", ["", "  \n", "[]", " [ ] \n"])
+def test_empty_input_has_no_records(text):
+    """File rỗng hoặc mảng rỗng không sinh bản ghi nào"""
+    assert _read(text) == []
+
+
+@pytest.mark.parametrize("text", [
+    '[{"a": 1},]',
+    '[{"a": 1}] x',
+    '[{"a": 1}]]',
+    '[{"a": 1} {"a": 2}]',
+    '[{"a": 1}, ',
+    '[{"a": 1',
+    '[,]',
+    '{"a": 1}\n{"a": ',
+])
+@pytest.mark.parametrize("chunk_size", [1, 1 << 16])
+def test_malformed_input_is_rejected(monkeypatch, text, chunk_size):
+    """JSON sai (dấu ',' thừa, dữ liệu thừa sau ']', mảng chưa đóng) báo lỗi như json.load"""
+    monkeypatch.setattr(data_loader, "READ_CHUNK_SIZE", chunk_size)
+    with pytest.raises(ValueError, match="File JSON không hợp lệ"):
+        _read(text)
+
+
+def test_iter_students_reports_record_index(tmp_path):
+    """Bản ghi không hợp lệ báo lỗi kèm vị trí; các bản ghi trước đó đã được trả về"""
+    path = tmp_path / "students.json"
+    path.write_text(json.dumps([RECORDS[0], {"student_id": "X"}]), encoding="utf-8")
+    
+    students = DataLoader.iter_students(str(path))
+    assert next(students).student_id == "L000"
+    with pytest.raises(ValueError, match=r"bản ghi 1"):
+        next(students)
+
+
+def test_missing_file_raises():
+    """File không tồn tại báo FileNotFoundError khi bắt đầu đọc"""
+    with pytest.raises(FileNotFoundError):
+        list(DataLoader.iter_records("/nonexistent/students.json"))
+
+
+def test_write_results_to_csv_streams_rows(tmp_path):
+    """Ghi CSV từ generator, trả về số dòng và giữ đúng thứ tự cột"""
+    results = (
+        RiskResult(student_id=f"C{i}", score=i % 4, risk_level="LOW", note=None if i % 2 else "Ghi chú")
+        for i in range(5)
+    )
+    path = tmp_path / "results.csv"
+    
+    assert DataLoader.write_results_to_csv(results, str(path)) == 5
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == data_loader.RESULT_CSV_COLUMNS
+    assert rows[1:3] == [["C0", "0", "LOW", "Ghi chú"], ["C1", "1", "LOW", ""]]
@@ -0,0 +1,111 @@
+import json
+import os
+
+import pytest
+from sqlalchemy import func, select
+
+from src.database.database import SessionLocal, create_tables
+from src.models.student import AttendanceDB, MigrationCheckpointDB, StudentDB, SystemConfigDB
+from src.services.risk_service import RiskService
+from src.services.student_service import StudentService
+from src.utils.data_migration import migrate_json_to_database_bulk
+
+
+def _write_source(path, prefix, count):
+    records = [
+        {
+            "student_id": f"{prefix}{i:03d}",
+            "student_name": f"Migrate {i}",
+            "attendance": [{"date": "2024-03-01", "status": "ATTEND"}, {"date": "2024-03-02", "status": "ABSENT"}],
+            "assignments": [],
+            "contacts": []
+        }
+        for i in range(count)
+    ]
+    path.write_text("\n".join(json.dumps(record) for record in records), encoding="utf-8")
+    return path
+
+
+def _stored(prefix):
+    db = SessionLocal()
+    try:
+        students = db.scalar(select(func.count()).select_from(StudentDB).where(StudentDB.student_id.like(f"{prefix}%")))
+        attendance = db.scalar(
+            select(func.count()).select_from(AttendanceDB).join(StudentDB).where(StudentDB.student_id.like(f"{prefix}%"))
+        )
+        return students, attendance
+    finally:
+        db.close()
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    create_tables()
+    yield
+    db = SessionLocal()
+    try:
+        # Xoá cờ dirty để không ảnh hưởng các test khác dùng chung database
+        RiskService(db).rescore_dirty_students()
+    finally:
+        db.close()
+
+
+def test_resume_continues_after_interrupted_batch(tmp_path, monkeypatch):
+    """Lỗi giữa chừng giữ lại các batch đã commit; chạy lại tiếp tục từ checkpoint, không ghi trùng"""
+    source = _write_source(tmp_path / "students.ndjson", "MIG", 10)
+    ingest_batch = StudentService.ingest_batch
+    calls = []
+    
+    def interrupted_ingest_batch(self, valid, errors):
+        calls.append(len(valid))
+        if len(calls) == 3:
+            raise RuntimeError("mất kết nối")
+        return ingest_batch(self, valid, errors)
+    
+    monkeypatch.setattr(StudentService, "ingest_batch", interrupted_ingest_batch)
+    first = migrate_json_to_database_bulk(str(source), batch_size=3)
+    assert not first["completed"]
+    assert (first["records"], first["students_created"]) == (6, 6)
+    assert _stored("MIG") == (6, 12)
+    
+    monkeypatch.setattr(StudentService, "ingest_batch", ingest_batch)
+    second = migrate_json_to_database_bulk(str(source), batch_size=3)
+    assert second["completed"]
+    assert second["resumed_from"] == 6
+    assert (second["records"], second["students_created"], second["skipped"]) == (10, 4, 0)
+    assert _stored("MIG") == (10, 20)
+
+
+def test_changed_file_starts_over_and_skips_existing(tmp_path):
+    """File nguồn thay đổi (fingerprint khác) thì bỏ checkpoint cũ; sinh viên đã có được bỏ qua"""
+    source = _write_source(tmp_path / "students.ndjson", "MIC", 4)
+    assert migrate_json_to_database_bulk(str(source), batch_size=2)["students_created"] == 4
+    
+    _write_source(source, "MIC", 6)
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    summary = migrate_json_to_database_bulk(str(source), batch_size=2)
+    assert summary["resumed_from"] == 0
+    assert (summary["records"], summary["students_created"], summary["skipped"]) == (6, 2, 4)
+    assert _stored("MIC") == (6, 12)
+    
+    rerun = migrate_json_to_database_bulk(str(source), batch_size=2, resume=False)
+    assert (rerun["resumed_from"], rerun["students_created"], rerun["skipped"]) == (0, 0, 6)
+
+
+def test_checkpoints_live_in_their_own_table(tmp_path):
+    """Checkpoint được lưu trong migration_checkpoints, không lẫn vào system_config"""
+    source = _write_source(tmp_path / "students.ndjson", "MIK", 3)
+    migrate_json_to_database_bulk(str(source), batch_size=2)
+    
+    db = SessionLocal()
+    try:
+        checkpoints = db.scalars(
+            select(MigrationCheckpointDB).where(MigrationCheckpointDB.file_path == str(source.resolve()))
+        ).all()
+        assert [checkpoint.records for checkpoint in checkpoints] == [3]
+        assert db.scalar(
+            select(func.count()).select_from(SystemConfigDB).where(SystemConfigDB.config_key != "system_config")
+        ) == 0
+    finally:
+        db.close()
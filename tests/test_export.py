@@ -0,0 +1,112 @@
+import csv
+import io
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import app
+from src.database.database import SessionLocal, create_tables
+from src.models.student import Attendance, StudentCreate, StudentDB
+from src.services import export_service
+from src.services.export_service import EXPORT_CSV_COLUMNS, ExportService
+from src.services.risk_service import RiskService
+from src.services.student_service import StudentService
+
+
+@pytest.fixture(scope="module")
+def db():
+    """Sinh viên EXP00..EXP04; EXP03, EXP04 chưa được đánh giá"""
+    create_tables()
+    session = SessionLocal()
+    student_service = StudentService(session)
+    risk_service = RiskService(session)
+    for i in range(3):
+        student_id = f"EXP{i:02d}"
+        student_service.create_student(StudentCreate(student_id=student_id, student_name=f"Xuất, \"{i}\""))
+        student_service.add_attendance(student_id, [
+            Attendance(date=date(2024, 4, day), status="ABSENT" if day <= i * 2 else "ATTEND") for day in range(1, 6)
+        ])
+        risk_service.predict_dropout_risk(student_id)
+    # Xoá cờ dirty để không ảnh hưởng các test khác dùng chung database
+    risk_service.rescore_dirty_students()
+    # Sinh viên chưa có sự kiện không bị đánh dấu dirty nên giữ nguyên trạng thái chưa đánh giá
+    for i in range(3, 5):
+        student_service.create_student(StudentCreate(student_id=f"EXP{i:02d}", student_name=f"Xuất {i}"))
+    yield session
+    session.close()
+
+
+def _expected_rows(db):
+    """Dòng CSV dựng từng sinh viên qua RiskService (cách làm cũ, một query mỗi sinh viên)"""
+    risk_service = RiskService(db)
+    rows = []
+    for student in db.query(StudentDB).order_by(StudentDB.id):
+        evaluation = risk_service.get_latest_risk_evaluation(student.student_id)
+        if evaluation is None:
+            rows.append([student.student_id, student.student_name, "N/A", "N/A", "Chưa được đánh giá", "N/A"])
+        else:
+            rows.append([
+                student.student_id,
+                student.student_name,
+                str(evaluation.score),
+                evaluation.risk_level,
+                evaluation.note or "",
+                evaluation.evaluated_at.strftime("%Y-%m-%d %H:%M:%S")
+            ])
+    return rows
+
+
+def _parse(text):
+    return list(csv.reader(io.StringIO(text)))
+
+
+def test_iter_csv_matches_per_student_lookup(db, monkeypatch):
+    """CSV theo chunk khớp với tra cứu đánh giá mới nhất của từng sinh viên"""
+    monkeypatch.setattr(export_service, "EXPORT_READ_SIZE", 2)
+    
+    chunks = list(ExportService(db).iter_csv())
+    rows = _parse("".join(chunks))
+    assert rows[0] == EXPORT_CSV_COLUMNS
+    assert rows[1:] == _expected_rows(db)
+    assert len(chunks) == (len(rows) - 1) // 2 + 1
+    assert {row[0]: row[3] for row in rows[1:]}["EXP04"] == "N/A"
+
+
+def test_iter_rows_uses_one_query(db):
+    """Mọi sinh viên được đọc bằng một câu query JOIN, không phải một query mỗi sinh viên"""
+    statements = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        rows = list(ExportService(db).iter_rows())
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    
+    assert len(rows) >= 5
+    assert len(statements) == 1
+
+
+def test_write_csv_counts_rows(db, tmp_path):
+    """write_csv trả về (tổng số sinh viên, số đã đánh giá) đúng với nội dung file"""
+    path = tmp_path / "export.csv"
+    total, evaluated = ExportService(db).write_csv(str(path))
+    
+    rows = _parse(path.read_text(encoding="utf-8"))[1:]
+    assert total == len(rows) == db.query(StudentDB).count()
+    assert evaluated == sum(row[2] != "N/A" for row in rows)
+
+
+def test_export_endpoint_streams_csv(db):
+    """GET /api/export/csv trả về CSV đính kèm, cùng nội dung với ExportService"""
+    response = TestClient(app).get("/api/export/csv")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"].startswith('attachment; filename="results_')
+    assert _parse(response.text) == _parse("".join(ExportService(db).iter_csv()))
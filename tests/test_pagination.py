@@ -0,0 +1,125 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from app import app
+from src.database.database import SessionLocal, create_tables
+from src.models.student import Assignment, Attendance, Contact, StudentCreate
+from src.services.risk_service import RiskService
+from src.services.student_service import StudentService
+
+
+@pytest.fixture(scope="module")
+def db():
+    """Sinh viên PAGE00..PAGE11 với đủ ba mức rủi ro; PAGE00 có 4 đánh giá"""
+    create_tables()
+    session = SessionLocal()
+    student_service = StudentService(session)
+    risk_service = RiskService(session)
+    for i in range(12):
+        student_id = f"PAGE{i:02d}"
+        student_service.create_student(StudentCreate(student_id=student_id, student_name=f"Trang {i % 4}"))
+        student_service.add_attendance(student_id, [
+            Attendance(date=date(2024, 1, day), status="ABSENT" if day <= i % 3 * 4 else "ATTEND")
+            for day in range(1, 11)
+        ])
+        student_service.add_assignments(student_id, [
+            Assignment(date=date(2024, 1, 10), name="Bài 1", submitted=i % 3 != 2)
+        ])
+        student_service.add_contacts(student_id, [
+            Contact(date=date(2024, 1, day), status="FAILED") for day in range(1, i % 3 * 2 + 1)
+        ])
+        risk_service.predict_dropout_risk(student_id)
+    for day in range(11, 14):
+        student_service.add_attendance("PAGE00", [Attendance(date=date(2024, 1, day), status="ATTEND")])
+        risk_service.predict_dropout_risk("PAGE00")
+    # Xoá cờ dirty để không ảnh hưởng các test khác dùng chung database
+    risk_service.rescore_dirty_students()
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize("sort_by", ["student_id", "student_name", "risk_level"])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_keyset_pages_match_offset_pages(db, sort_by, sort_order):
+    """Đi hết danh sách bằng cursor cho đúng thứ tự của phân trang theo page"""
+    service = StudentService(db)
+    expected, _, _ = service.list_students(sort_by=sort_by, sort_order=sort_order, limit=1000)
+
+    walked = []
+    students, _, after = service.list_students(sort_by=sort_by, sort_order=sort_order, limit=5)
+    walked.extend(students)
+    while after is not None:
+        students, _, after = service.list_students(sort_by=sort_by, sort_order=sort_order, limit=5, after=after)
+        walked.extend(students)
+
+    assert [student.id for student in walked] == [student.id for student in expected]
+    assert {student.latest_risk_rank for student in walked} == {1, 2, 3}
+
+
+@pytest.mark.parametrize("sort_by, index", [
+    ("student_id", "ix_students_student_id"),
+    ("student_name", "ix_students_name_id"),
+    ("risk_level", "ix_students_risk_rank_id")
+])
+def test_keyset_page_seeks_index(db, sort_by, index):
+    """Trang sau cursor là một lần seek trên index (khoá, id), không sắp xếp bằng B-tree tạm"""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        StudentService(db).list_students(sort_by=sort_by, sort_order="desc", limit=5, after=(2, 6))
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    statement, parameters = captured[-1]
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    plan = " | ".join(row[-1] for row in rows)
+    assert f"USING INDEX {index} (" in plan or f"USING COVERING INDEX {index} (" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.parametrize("path", [
+    "/api/students/PAGE00/risk-evaluations",
+    "/api/risk/high-risk-students",
+    "/api/risk/medium-risk-students"
+])
+def test_exactly_full_last_page_has_no_cursor(db, path):
+    """Số dòng chia hết cho limit: trang cuối không có X-Next-Cursor, không dẫn tới trang rỗng"""
+    client = TestClient(app)
+    total = len(client.get(path).json())
+    assert total >= 2
+
+    limit = total // 2 if total % 2 == 0 else total
+    walked, cursor = [], None
+    for _ in range(total):
+        response = client.get(path, params={"limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        walked.extend(response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    assert len(walked) == total
+
+
+def test_cursor_page_past_end_is_empty(db):
+    """Trang sau cursor không còn dòng nào trả về [] thay vì 404"""
+    client = TestClient(app)
+    first = client.get("/api/students/PAGE00/risk-evaluations", params={"limit": 3})
+    cursor = first.headers["x-next-cursor"]
+
+    # Xoá đánh giá còn lại (ví dụ bị nén) giữa hai request
+    last = client.get("/api/students/PAGE00/risk-evaluations").json()[-1]
+    db.execute(text("DELETE FROM risk_evaluations WHERE id = :id"), {"id": last["id"]})
+    db.commit()
+
+    response = client.get("/api/students/PAGE00/risk-evaluations", params={"limit": 3, "cursor": cursor})
+    assert response.status_code == 200
+    assert response.json() == []
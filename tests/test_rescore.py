@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+
+from src.database.database import SessionLocal, create_tables
+from src.models.student import Attendance, Contact, StudentCreate, StudentSignalDB
+from src.services.risk_service import RiskService
+from src.services.student_service import StudentService
+
+
+@pytest.fixture
+def sessions():
+    create_tables()
+    request_db = SessionLocal()
+    worker_db = SessionLocal()
+    yield request_db, worker_db
+    request_db.close()
+    worker_db.close()
+
+
+def test_dirty_flag_survives_concurrent_rescore(sessions):
+    """Worker xoá cờ dirty giữa lúc request nạp dòng tín hiệu và lúc commit: cờ phải được bật lại"""
+    request_db, worker_db = sessions
+    student_service = StudentService(request_db)
+    student = student_service.create_student(StudentCreate(student_id="DIRTY1", student_name="Dirty"))
+    student_service.add_attendance("DIRTY1", [Attendance(date=date(2024, 1, 1), status="ABSENT")])
+    
+    # Request nạp dòng tín hiệu (revision=1, dirty=True) vào identity map
+    signals = request_db.get(StudentSignalDB, student.id)
+    assert (signals.revision, signals.dirty) == (1, True)
+    
+    # Worker đánh giá lại và xoá cờ dirty ở transaction khác
+    assert RiskService(worker_db).rescore_dirty_students() == 1
+    
+    # Request ghi dữ liệu mới dựa trên đối tượng đã nạp trước đó
+    student_service.add_contacts("DIRTY1", [Contact(date=date(2024, 1, 2), status="FAILED")])
+    
+    worker_db.expire_all()
+    signals = worker_db.get(StudentSignalDB, student.id)
+    assert (signals.revision, signals.dirty, signals.failed_contacts) == (2, True, 1)
+    
+    # Lượt sau của worker đánh giá lại với liên lạc mới
+    assert RiskService(worker_db).rescore_dirty_students() == 1
+    worker_db.expire_all()
+    assert worker_db.get(StudentSignalDB, student.id).dirty is False
+
+
+def test_failed_rescore_keeps_students_dirty(sessions, monkeypatch):
+    """Lỗi khi tính toán rollback cả việc nhận batch: sinh viên vẫn dirty cho lượt sau"""
+    request_db, worker_db = sessions
+    student_service = StudentService(request_db)
+    student = student_service.create_student(StudentCreate(student_id="DIRTY2", student_name="Dirty"))
+    student_service.add_attendance("DIRTY2", [Attendance(date=date(2024, 1, 1), status="ABSENT")])
+    
+    def fail(self, db_ids, batch):
+        raise RuntimeError("scoring failed")
+    
+    with monkeypatch.context() as patch:
+        patch.setattr(RiskService, "_record_evaluations", fail)
+        with pytest.raises(RuntimeError):
+            RiskService(worker_db).rescore_dirty_students()
+    
+    worker_db.expire_all()
+    assert worker_db.get(StudentSignalDB, student.id).dirty is True
+    
+    # Batch đã nhận thì không còn dirty: lượt thứ hai không đánh giá trùng
+    assert RiskService(worker_db).rescore_dirty_students() == 1
+    assert RiskService(worker_db).rescore_dirty_students() == 0
+    assert len(RiskService(worker_db).get_all_risk_evaluations("DIRTY2")) == 1
@@ -0,0 +1,101 @@
+from datetime import date
+
+import pytest
+
+from src.database.database import SessionLocal, create_tables
+from src.models.config import RiskThresholdConfig
+from src.models.student import Attendance, Contact, RiskEvaluationDB, StudentCreate
+from src.risk_assessment.config import RiskConfig
+from src.services.config_service import ConfigService
+from src.services.risk_service import RiskService
+from src.services.student_service import StudentService
+
+
+@pytest.fixture
+def db():
+    """Session trên database dùng chung; dọn cờ dirty khi kết thúc"""
+    create_tables()
+    session = SessionLocal()
+    yield session
+    RiskService(session).rescore_dirty_students()
+    session.close()
+
+
+def _create(db, student_id):
+    service = StudentService(db)
+    service.create_student(StudentCreate(student_id=student_id, student_name="Memo"))
+    service.add_attendance(student_id, [
+        Attendance(date=date(2024, 2, day), status="ABSENT" if day % 2 else "ATTEND") for day in range(1, 9)
+    ])
+    service.add_contacts(student_id, [Contact(date=date(2024, 2, 3), status="FAILED")])
+
+
+def _evaluation_count(db, evaluation):
+    return db.query(RiskEvaluationDB).filter(RiskEvaluationDB.student_id == evaluation.student_id).count()
+
+
+def test_unchanged_inputs_return_same_evaluation(db):
+    """Đánh giá lại khi tín hiệu và cấu hình không đổi trả về đúng dòng cũ, không thêm dòng"""
+    _create(db, "MEMO01")
+    service = RiskService(db)
+    
+    first = service.predict_dropout_risk("MEMO01")
+    second = service.predict_dropout_risk("MEMO01")
+    assert second.id == first.id
+    assert second.input_digest == first.input_digest
+    assert _evaluation_count(db, first) == 1
+
+
+def test_signal_change_writes_new_evaluation(db):
+    """Thêm sự kiện làm đổi tín hiệu nên có đánh giá mới và con trỏ latest chuyển sang nó"""
+    _create(db, "MEMO02")
+    service = RiskService(db)
+    first = service.predict_dropout_risk("MEMO02")
+    
+    StudentService(db).add_attendance("MEMO02", [Attendance(date=date(2024, 2, 20), status="ATTEND")])
+    second = service.predict_dropout_risk("MEMO02")
+    assert second.id != first.id
+    assert second.input_digest != first.input_digest
+    assert service.get_latest_risk_evaluation("MEMO02").id == second.id
+    assert service.predict_dropout_risk("MEMO02").id == second.id
+
+
+def test_config_change_writes_new_evaluation(db):
+    """Đổi RiskConfig hoặc ngưỡng mức rủi ro làm đổi digest dù tín hiệu giữ nguyên"""
+    _create(db, "MEMO03")
+    first = RiskService(db).predict_dropout_risk("MEMO03")
+    
+    strict = RiskService(db).predict_dropout_risk("MEMO03", RiskConfig(attendance_threshold=0.9))
+    assert strict.id != first.id
+    
+    config_service = ConfigService(db)
+    original = config_service.get_config().model_copy(deep=True)
+    try:
+        changed = original.model_copy(deep=True)
+        changed.risk_thresholds = RiskThresholdConfig(medium_threshold=1, high_threshold=2)
+        assert config_service.save_config(changed)
+        
+        rethresholded = RiskService(db).predict_dropout_risk("MEMO03", RiskConfig(attendance_threshold=0.9))
+        assert rethresholded.id != strict.id
+        assert rethresholded.config_version > strict.config_version
+    finally:
+        assert config_service.save_config(original)
+    
+    assert _evaluation_count(db, first) == 3
+
+
+def test_batch_evaluation_skips_unchanged_students(db):
+    """evaluate_students chỉ ghi dòng cho sinh viên có digest khác đánh giá gần nhất"""
+    _create(db, "MEMO04")
+    _create(db, "MEMO05")
+    service = RiskService(db)
+    
+    first = service.evaluate_students(["MEMO04", "MEMO05"])
+    assert (first["evaluated"], first["written"]) == (2, 2)
+    
+    assert service.evaluate_students(["MEMO04", "MEMO05"])["written"] == 0
+    
+    StudentService(db).add_contacts("MEMO05", [Contact(date=date(2024, 2, 21), status="FAILED")])
+    third = service.evaluate_students(["MEMO04", "MEMO05"])
+    assert (third["evaluated"], third["written"]) == (2, 1)
+    assert service.predict_dropout_risk("MEMO04").id == service.get_latest_risk_evaluation("MEMO04").id
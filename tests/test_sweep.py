@@ -0,0 +1,104 @@
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from src.database.database import SessionLocal, create_tables
+from src.models.config import RiskThresholdConfig
+from src.risk_assessment.batch import SignalBatch
+from src.risk_assessment.calculator import RiskCalculator
+from src.risk_assessment.sweep import ThresholdSweep, build_grid
+from src.services.config_service import ConfigService
+from src.services.student_service import StudentService
+
+
+# Có cả ngưỡng trùng đúng tỷ lệ (0.5, 0.6...) để kiểm tra biên "<" của tín hiệu
+ATTENDANCE = [0.0, 0.25, 0.5, 0.6, 0.8, 1.0]
+ASSIGNMENT = [0.0, 0.5, 0.6, 2 / 3, 1.0]
+CONTACT = [0, 1, 2, 3, 5]
+
+
+def _brute_force(batch, configs, thresholds=None):
+    """Chạy RiskCalculator cho từng bộ ngưỡng rồi đếm mức rủi ro"""
+    distributions = []
+    for config in configs:
+        calculator = RiskCalculator(config)
+        counts = Counter(result.risk_level for result in calculator.calculate_risks_from_signals(batch, thresholds))
+        distributions.append({level: counts.get(level, 0) for level in ("LOW", "MEDIUM", "HIGH")})
+    return distributions
+
+
+@pytest.mark.parametrize("thresholds", [None, RiskThresholdConfig(medium_threshold=1, high_threshold=3)])
+def test_sweep_matches_brute_force(make_students, thresholds):
+    """Phân bố của ThresholdSweep khớp với chạy lại RiskCalculator cho từng điểm lưới"""
+    batch = SignalBatch.from_students(make_students(400, seed=5))
+    configs = build_grid(ATTENDANCE, ASSIGNMENT, CONTACT)
+    calculator = RiskCalculator()
+    level_table = [calculator.get_risk_level(score, thresholds) for score in range(4)]
+    
+    swept = ThresholdSweep(batch).evaluate(configs, level_table)
+    expected = _brute_force(batch, configs, thresholds)
+    assert [{level: d.get(level, 0) for level in expected[0]} for d in swept] == expected
+
+
+def test_sweep_unsorted_grid_keeps_config_order(make_students):
+    """Thứ tự kết quả theo đúng thứ tự config truyền vào, kể cả khi lưới không sắp xếp"""
+    batch = SignalBatch.from_students(make_students(200, seed=6))
+    configs = list(reversed(build_grid([0.9, 0.3, 0.7], [0.4, 1.0], [4, 0, 2])))
+    level_table = [RiskCalculator().get_risk_level(score) for score in range(4)]
+    
+    swept = ThresholdSweep(batch).evaluate(configs, level_table)
+    expected = _brute_force(batch, configs)
+    assert [{level: d.get(level, 0) for level in expected[0]} for d in swept] == expected
+
+
+def test_sweep_empty_inputs():
+    """Không có config hoặc không có sinh viên vẫn cho kết quả hợp lệ"""
+    level_table = [RiskCalculator().get_risk_level(score) for score in range(4)]
+    empty = SignalBatch.from_students([])
+    
+    assert ThresholdSweep(empty).evaluate([], level_table) == []
+    distributions = ThresholdSweep(empty).evaluate(build_grid([0.5], [0.5], [1]), level_table)
+    assert [sum(distribution.values()) for distribution in distributions] == [0]
+
+
+def test_what_if_endpoint_matches_brute_force():
+    """POST /api/risk/what-if trả về phân bố giống chạy calculator trên số liệu trong database"""
+    create_tables()
+    client = TestClient(app)
+    body = {
+        "attendance_thresholds": [0.5, 0.8],
+        "assignment_thresholds": [0.5, 1.0],
+        "contact_failed_thresholds": [1, 3]
+    }
+    response = client.post("/api/risk/what-if", json=body)
+    assert response.status_code == 200
+    
+    session = SessionLocal()
+    try:
+        batch = StudentService(session).get_signal_batch()
+        thresholds = ConfigService(session).get_risk_thresholds()
+    finally:
+        session.close()
+    configs = build_grid(body["attendance_thresholds"], body["assignment_thresholds"], body["contact_failed_thresholds"])
+    expected = _brute_force(batch, configs, thresholds)
+    
+    results = response.json()
+    assert [
+        (r["attendance_threshold"], r["assignment_threshold"], r["contact_failed_threshold"]) for r in results
+    ] == [(c.attendance_threshold, c.assignment_threshold, c.contact_failed_threshold) for c in configs]
+    assert [{level: r["distribution"].get(level, 0) for level in expected[0]} for r in results] == expected
+
+
+def test_what_if_rejects_oversized_grid(monkeypatch):
+    """Lưới vượt MAX_WHAT_IF_GRID bị từ chối với 400"""
+    from src.api import routes
+    monkeypatch.setattr(routes, "MAX_WHAT_IF_GRID", 3)
+    
+    response = TestClient(app).post("/api/risk/what-if", json={
+        "attendance_thresholds": [0.5, 0.8],
+        "assignment_thresholds": [0.5],
+        "contact_failed_thresholds": [1, 3]
+    })
+    assert response.status_code == 400
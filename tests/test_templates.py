@@ -0,0 +1,76 @@
+import pytest
+from fastapi.testclient import TestClient
+from jinja2 import DictLoader, Environment
+from typer.testing import CliRunner
+
+from app import app
+from src.database.database import SessionLocal, create_tables
+from src.models.student import StudentCreate
+from src.services.student_service import StudentService
+from src.web.templates import (
+    TEMPLATE_SOURCES, _bytecode_cache, create_templates, precompile_templates, templates
+)
+
+
+def test_templates_load_from_memory():
+    """Templates nạp từ DictLoader trong bộ nhớ và được biên dịch trước hết"""
+    assert isinstance(templates.env.loader, DictLoader)
+    assert sorted(templates.env.list_templates()) == sorted(TEMPLATE_SOURCES)
+    assert precompile_templates() == len(TEMPLATE_SOURCES) == 6
+
+
+@pytest.mark.parametrize("path", ["/", "/config", "/students", "/students/TPL01", "/risk/high", "/risk/medium"])
+def test_pages_render_without_templates_directory(path, tmp_path, monkeypatch):
+    """Mọi trang render được khi thư mục làm việc không có templates/"""
+    create_tables()
+    db = SessionLocal()
+    try:
+        service = StudentService(db)
+        if service.get_student_by_id("TPL01") is None:
+            service.create_student(StudentCreate(student_id="TPL01", student_name="Template"))
+    finally:
+        db.close()
+    monkeypatch.chdir(tmp_path)
+    
+    response = TestClient(app).get(path)
+    assert response.status_code == 200
+    assert response.text.startswith("<!DOCTYPE html>")
+    assert not (tmp_path / "templates").exists()
+
+
+def test_bytecode_cache_is_shared_on_disk(tmp_path, monkeypatch):
+    """Bytecode cache ghi vào TEMPLATE_CACHE_DIR; môi trường khác (worker khác) nạp lại từ đó"""
+    monkeypatch.setenv("TEMPLATE_CACHE_DIR", str(tmp_path / "cache"))
+    loader = DictLoader({name: create() for name, create in TEMPLATE_SOURCES.items()})
+    
+    Environment(loader=loader, bytecode_cache=_bytecode_cache()).get_template("dashboard.html")
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+    
+    def compile_again(*args, **kwargs):
+        raise AssertionError("template được biên dịch lại thay vì nạp từ cache")
+    
+    monkeypatch.setattr(Environment, "compile", compile_again)
+    second = Environment(loader=loader, bytecode_cache=_bytecode_cache())
+    assert second.get_template("dashboard.html").name == "dashboard.html"
+
+
+def test_unwritable_cache_dir_falls_back_to_memory(tmp_path, monkeypatch):
+    """Không tạo được thư mục cache thì không dùng bytecode cache trên đĩa"""
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setenv("TEMPLATE_CACHE_DIR", str(blocker / "cache"))
+    assert _bytecode_cache() is None
+
+
+def test_generate_templates_writes_sources(tmp_path):
+    """Lệnh generate-templates xuất đúng nội dung các template ra file HTML"""
+    from main import app as cli
+    output = tmp_path / "out"
+    
+    result = CliRunner().invoke(cli, ["generate-templates", "--output", str(output)])
+    assert result.exit_code == 0, result.output
+    assert sorted(path.name for path in output.iterdir()) == sorted(TEMPLATE_SOURCES)
+    for name, create in TEMPLATE_SOURCES.items():
+        assert (output / name).read_text(encoding="utf-8") == create()
+    
+    assert create_templates(str(tmp_path / "again")) == len(TEMPLATE_SOURCES)
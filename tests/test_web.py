@@ -0,0 +1,60 @@
+from datetime import date
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import app
+from src.database.database import SessionLocal, create_tables, read_engine
+from src.models.student import Assignment, Attendance, Contact, StudentCreate
+from src.services.risk_service import RiskService
+from src.services.student_service import StudentService
+
+
+def _add_high_risk_students(prefix: str, count: int):
+    """Tạo count sinh viên có rủi ro cao (đủ ba tín hiệu)"""
+    db = SessionLocal()
+    try:
+        student_service = StudentService(db)
+        risk_service = RiskService(db)
+        for i in range(count):
+            student_id = f"{prefix}{i}"
+            student_service.create_student(StudentCreate(student_id=student_id, student_name=f"Tên {student_id}"))
+            student_service.add_attendance(student_id, [Attendance(date=date(2024, 1, 1), status="ABSENT")])
+            student_service.add_assignments(student_id, [Assignment(date=date(2024, 1, 1), name="Bài 1", submitted=False)])
+            student_service.add_contacts(student_id, [
+                Contact(date=date(2024, 1, day), status="FAILED") for day in (1, 2)
+            ])
+            assert risk_service.predict_dropout_risk(student_id).risk_level == "HIGH"
+        risk_service.rescore_dirty_students()
+    finally:
+        db.close()
+
+
+def _count_queries(client: TestClient, path: str) -> int:
+    """Số câu SQL chạy trên engine đọc khi render một trang"""
+    statements = []
+    
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(read_engine, "before_cursor_execute", count)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(read_engine, "before_cursor_execute", count)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_high_risk_page_loads_students_in_one_query():
+    """Trang rủi ro cao không truy vấn thêm một lần cho mỗi sinh viên"""
+    create_tables()
+    client = TestClient(app)
+    
+    _add_high_risk_students("WEBA", 2)
+    before = _count_queries(client, "/risk/high")
+    _add_high_risk_students("WEBB", 3)
+    assert _count_queries(client, "/risk/high") == before
+    
+    page = client.get("/risk/high").text
+    assert "Tên WEBA0" in page and "Tên WEBB2" in page
@@ -0,0 +1,133 @@
+import random
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.database.database import SessionLocal, create_tables
+from src.models.student import StudentCreate
+from src.risk_assessment.config import RiskConfig
+from src.risk_assessment.windows import EventSeries, StudentEvents, window_bounds
+from src.services.risk_service import RiskService
+from src.services.student_service import StudentService
+
+
+WINDOWED = RiskConfig(attendance_window_days=30, assignment_window_days=45, contact_window_days=10)
+
+
+def _batch_columns(batch):
+    return (
+        batch.attended_sessions.tolist(),
+        batch.total_sessions.tolist(),
+        batch.submitted_assignments.tolist(),
+        batch.total_assignments.tolist(),
+        batch.failed_contacts.tolist()
+    )
+
+
+def test_counts_match_brute_force():
+    """Hai lần binary search trên tổng tiền tố cho đúng số đếm của lọc từng sự kiện"""
+    rng = random.Random(8)
+    size = 40
+    events = [
+        (rng.randrange(size), 738000 + rng.randrange(200), rng.random() < 0.5)
+        for _ in range(1500)
+    ]
+    series = EventSeries.from_arrays(size, *zip(*events))
+    
+    for start_day, end_day in [(None, None), (738050, 738120), (738000, 738000), (738150, None), (None, 738010), (738120, 738050)]:
+        totals, hits = series.counts(start_day, end_day)
+        
+        expected_totals, expected_hits = np.zeros(size, dtype=int), np.zeros(size, dtype=int)
+        for index, day, hit in events:
+            if (start_day is None or day >= start_day) and (end_day is None or day <= end_day):
+                expected_totals[index] += 1
+                expected_hits[index] += hit
+        assert totals.tolist() == expected_totals.tolist()
+        assert hits.tolist() == expected_hits.tolist()
+
+
+def test_window_bounds_include_both_ends():
+    """Cửa sổ N ngày kết thúc tại as_of gồm đúng N ngày, tính cả as_of"""
+    start, end = window_bounds(7, date(2024, 3, 10))
+    assert (start, end) == (date(2024, 3, 4).toordinal(), date(2024, 3, 10).toordinal())
+    assert window_bounds(1, date(2024, 3, 10)) == (end, end)
+
+
+def test_signal_batch_matches_filtered_events(make_students):
+    """signal_batch đếm mỗi tín hiệu trong cửa sổ riêng của nó như lọc trực tiếp trên Student"""
+    students = make_students(150, seed=8)
+    as_of = date(2024, 3, 20)
+    batch = StudentEvents.from_students(students).signal_batch(WINDOWED, as_of)
+    
+    def in_window(events, window_days):
+        start, end = window_bounds(window_days, as_of)
+        return [e for e in events if start <= e.date.toordinal() <= end]
+    
+    expected = ([], [], [], [], [])
+    for student in students:
+        attendance = in_window(student.attendance, WINDOWED.attendance_window_days)
+        assignments = in_window(student.assignments, WINDOWED.assignment_window_days)
+        contacts = in_window(student.contacts, WINDOWED.contact_window_days)
+        expected[0].append(sum(a.status == "ATTEND" for a in attendance))
+        expected[1].append(len(attendance))
+        expected[2].append(sum(a.submitted for a in assignments))
+        expected[3].append(len(assignments))
+        expected[4].append(sum(c.status == "FAILED" for c in contacts))
+    
+    assert batch.student_ids == [s.student_id for s in students]
+    assert _batch_columns(batch) == expected
+
+
+def test_signal_batch_without_windows_counts_full_history(make_students):
+    """Config không đặt cửa sổ cho cùng số liệu với SignalBatch.from_students"""
+    from src.risk_assessment.batch import SignalBatch
+    students = make_students(80, seed=9)
+    
+    windowed = StudentEvents.from_students(students).signal_batch(RiskConfig(), date(2024, 3, 20))
+    assert _batch_columns(windowed) == _batch_columns(SignalBatch.from_students(students))
+
+
+@pytest.fixture
+def stored_students(make_students):
+    """Lưu một nhóm sinh viên ngẫu nhiên vào database dùng chung"""
+    create_tables()
+    students = make_students(30, seed=10)
+    session = SessionLocal()
+    service = StudentService(session)
+    for student in students:
+        student.student_id = f"WIN{student.student_id}"
+        service.create_student(StudentCreate(student_id=student.student_id, student_name=student.student_name))
+        service.add_attendance(student.student_id, student.attendance)
+        service.add_assignments(student.student_id, student.assignments)
+        service.add_contacts(student.student_id, student.contacts)
+    # Xoá cờ dirty để không ảnh hưởng các test khác dùng chung database
+    RiskService(session).rescore_dirty_students()
+    yield session, students
+    session.close()
+
+
+def test_load_events_matches_from_students(stored_students):
+    """Lịch sử đọc từ database (chỉ cột ngày, trạng thái) cho cùng tín hiệu theo cửa sổ"""
+    session, students = stored_students
+    service = StudentService(session)
+    db_ids, batch = service.load_signals([s.student_id for s in students])
+    as_of = date(2024, 3, 20)
+    
+    loaded = service.load_events(db_ids, batch.student_ids).signal_batch(WINDOWED, as_of)
+    by_id = {s.student_id: s for s in students}
+    expected = StudentEvents.from_students([by_id[i] for i in batch.student_ids]).signal_batch(WINDOWED, as_of)
+    assert sorted(batch.student_ids) == sorted(by_id)
+    assert _batch_columns(loaded) == _batch_columns(expected)
+
+
+def test_window_longer_than_calendar_does_not_count_previous_student():
+    """Cửa sổ bắt đầu trước ngày ordinal 0 chỉ đếm sự kiện của chính sinh viên đó"""
+    late = date(2024, 1, 1).toordinal()
+    series = EventSeries.from_arrays(2, [0, 0, 1], [late, late - 1, 5], [1, 1, 0])
+    
+    start, end = window_bounds(4000000, date(2, 1, 1))
+    assert start < 0
+    totals, hits = series.counts(start, end)
+    assert totals.tolist() == [0, 1]
+    assert hits.tolist() == [0, 0]